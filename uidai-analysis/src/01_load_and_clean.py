@@ -1,17 +1,36 @@
-import pandas as pd
-enrol_df = pd.read_csv("../data/enrolment.csv")
-enrol_df.columns = enrol_df.columns.str.lower()
-enrol_df.columns = enrol_df.columns.str.replace(" ", "_")
-enrol_df["date"] = pd.to_datetime(enrol_df["date"], dayfirst=True)
-enrol_df["total_enrolments"] = (
-    enrol_df["age_0_5"]
-    + enrol_df["age_5_17"]
-    + enrol_df["age_18_greater"]
+import argparse
+from uidai_pipeline import ingest, instrument, paths, sketch, store, validate
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--input",
+    default=paths.RAW_ENROLMENT,
+    help="raw enrolment CSV, a directory of CSV shards, or a glob pattern",
 )
-enrol_df = enrol_df[
-    ["date", "state", "district", "pincode", "total_enrolments"]
-]
+parser.add_argument("--csv", action="store_true", help="also export enrolment_cleaned.csv")
+parser.add_argument(
+    "--reject-duplicates",
+    action="store_true",
+    help="reject rows repeating an earlier (date, pincode), for sources that deliver one row per key",
+)
+parser.add_argument(
+    "--reject-limits",
+    default=validate.DEFAULT_LIMITS,
+    help="fail when the reject rate exceeds these, overall (total=) or per reason, e.g. total=0.05,bad_date=0.001",
+)
+args = parser.parse_args()
+instrument.begin("load")
+
+validator = validate.start(
+    "enrolment", ingest.ENROLMENT_COUNTS, args.reject_limits, reject_duplicates=args.reject_duplicates
+)
+enrol_df = ingest.read_raw(args.input, ingest.as_text(ingest.ENROLMENT_DTYPES))
+enrol_df = validate.check(validator, enrol_df)
+validate.finish(validator)
+enrol_df = ingest.clean_enrolment(enrol_df)
 enrol_df = enrol_df.sort_values("date")
-enrol_df.to_csv("../data/enrolment_cleaned.csv", index=False)
+store.write(enrol_df, "enrolment_cleaned", csv=args.csv)
+sketch.save(sketch.sketch(enrol_df))
+instrument.metric(columns=list(enrol_df.columns))
 print("Enrolment dataset cleaned and saved successfully.")
 print(enrol_df.head())
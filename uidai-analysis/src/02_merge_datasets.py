@@ -1,20 +1,131 @@
-import pandas as pd
+import argparse
+from uidai_pipeline import incremental, ingest, instrument, join, partition, paths, sketch, store, validate
 
-df = pd.read_csv("../data/enrolment_cleaned.csv")
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="aggregate the raw enrolment file in chunks without enrolment_cleaned",
+)
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="fold only rows newer than the stored watermark into enrolment_monthly",
+)
+parser.add_argument(
+    "--input",
+    default=paths.RAW_ENROLMENT,
+    help="raw file, directory of CSV shards or glob pattern for --stream/--incremental",
+)
+parser.add_argument("--chunksize", type=int, default=ingest.DEFAULT_CHUNKSIZE)
+parser.add_argument(
+    "--join",
+    action="store_true",
+    help="also join enrolment with the biometric and demographic monthly tables into monthly_facts",
+)
+parser.add_argument(
+    "--reject-duplicates",
+    action="store_true",
+    help="reject rows repeating an earlier (date, pincode), for sources that deliver one row per key",
+)
+parser.add_argument(
+    "--reject-limits",
+    default=validate.DEFAULT_LIMITS,
+    help="reject rate limits for the raw rows read by --stream/--incremental (see 01_load_and_clean.py)",
+)
+parser.add_argument("--partitions", type=int, default=None,
+                    help="aggregate enrolment_cleaned as this many state partitions in parallel")
+parser.add_argument("--workers", type=int, default=None, help="partition processes (default: one per core)")
+parser.add_argument("--csv", action="store_true", help="also export enrolment_monthly.csv")
+args = parser.parse_args()
+instrument.begin("merge")
 
-df["date"] = pd.to_datetime(df["date"])
+if args.incremental or args.stream:
+    validator = validate.start(
+        "enrolment", ingest.ENROLMENT_COUNTS, args.reject_limits, reject_duplicates=args.reject_duplicates
+    )
 
-df["month"] = df["date"].dt.to_period("M").dt.to_timestamp()
+    def check(chunk):
+        return validate.check(validator, chunk)
 
-monthly_df = (
-    df
-    .groupby(["month", "state", "district", "pincode"], as_index=False)
-    .agg({"total_enrolments": "sum"})
-)
+    def observe(part):
+        global sketches
+        sketches = sketch.update(sketches, part)
+
+offsets = None
+if args.incremental:
+    watermark = incremental.load_watermark()
+    offsets = incremental.load_offsets()
+    sketches = sketch.load()
+    if sketches is None:
+        sketches = sketch.sketch(store.read("enrolment_monthly"))
+    # With recorded offsets only the appended bytes are read; otherwise the
+    # whole input is read once and filtered on the watermark date.
+    since = None if offsets else watermark
+    offsets = offsets or {}
+    new_monthly, latest = ingest.stream_monthly(
+        args.input, chunksize=args.chunksize, since=since, check=check, observe=observe, offsets=offsets
+    )
+    validate.finish(validator)
+    latest = latest if latest is not None else watermark
+    print(f"Rows after watermark {watermark}: {new_monthly['total_enrolments'].sum()} enrolments "
+          f"in {len(new_monthly)} pincode-months")
+    monthly_df = incremental.merge_monthly(store.read("enrolment_monthly"), new_monthly)
+    delta_df = new_monthly
+elif args.stream:
+    sketches = sketch.empty()
+    offsets = {}
+    monthly_df, latest = ingest.stream_monthly(
+        args.input, chunksize=args.chunksize, check=check, observe=observe, offsets=offsets
+    )
+    validate.finish(validator)
+    delta_df = monthly_df
+elif args.partitions:
+    monthly_df, latest = partition.monthly(args.partitions, args.workers)
+    monthly_df = monthly_df.sort_values("month", kind="stable")
+    delta_df = monthly_df
+else:
+    df = store.read("enrolment_cleaned")
+
+    monthly_df = ingest.aggregate_monthly(df)
 
-monthly_df = monthly_df.sort_values("month")
+    monthly_df = monthly_df.sort_values("month")
+    latest = df["date"].max()
+    delta_df = monthly_df
 
-monthly_df.to_csv("../data/enrolment_monthly.csv", index=False)
+store.write(monthly_df, "enrolment_monthly", csv=args.csv)
+store.write(delta_df, "monthly_delta")
+if latest is not None:
+    incremental.save_watermark(latest, offsets=offsets)
+if args.incremental or args.stream:
+    sketch.save(sketches)
+instrument.metric(
+    months=int(monthly_df["month"].nunique()),
+    pincodes=int(monthly_df["pincode"].nunique()),
+    delta_cells=len(delta_df),
+    enrolment_total=int(monthly_df["total_enrolments"].sum()),
+)
 
 print("Monthly enrolment dataset created successfully.")
 print(monthly_df.head())
+
+if args.join:
+    facts_df = join.monthly_facts(monthly_df)
+    store.write(facts_df, "monthly_facts", csv=args.csv)
+    totals = {
+        column: int(facts_df[column].sum())
+        for column in ["total_enrolments", "biometric_updates", "demographic_updates"]
+    }
+    coverage = {
+        dataset: int(facts_df.loc[facts_df[f"{dataset}_month_covered"], "month"].nunique())
+        for dataset in ["enrolment", "biometric", "demographic"]
+    }
+    instrument.metric(fact_totals=totals, months_covered=coverage)
+
+    print(f"\nMonthly fact table: {len(facts_df)} pincode-months, "
+          f"{facts_df['month'].nunique()} months, {facts_df['pincode'].nunique()} pincodes")
+    print("Months covered per dataset:", coverage)
+    print(facts_df.groupby("month")[[
+        "total_enrolments", "biometric_updates", "demographic_updates"
+    ]].sum())
+    print(facts_df[["biometric_per_enrolment", "demographic_per_enrolment"]].describe())
@@ -1,72 +1,51 @@
-import pandas as pd
-import numpy as np
-
-monthly_df = pd.read_csv("../data/enrolment_monthly.csv")
-monthly_df["month"] = pd.to_datetime(monthly_df["month"])
-
-features_df = monthly_df.copy()
-
-features_df = features_df.sort_values(["pincode", "month"]).reset_index(drop=True)
-
-features_df["enrolments_mom_growth"] = (
-    features_df.groupby("pincode")["total_enrolments"]
-    .pct_change()
-    .fillna(0)
-    * 100
-)
-
-features_df["rolling_3m_avg"] = (
-    features_df.groupby("pincode")["total_enrolments"]
-    .transform(lambda x: x.rolling(window=3, min_periods=1).mean())
-)
-
-district_totals = (
-    features_df.groupby(["month", "district"])["total_enrolments"]
-    .sum()
-    .reset_index()
-    .rename(columns={"total_enrolments": "district_total"})
-)
-
-state_totals = (
-    features_df.groupby(["month", "state"])["total_enrolments"]
-    .sum()
-    .reset_index()
-    .rename(columns={"total_enrolments": "state_total"})
+import argparse
+from uidai_pipeline import cube, features, incremental, instrument, partition, store
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="recompute only the cells touched by the last 02_merge_datasets.py run",
+)
+parser.add_argument("--partitions", type=int, default=None,
+                    help="build the features of this many state partitions in parallel")
+parser.add_argument("--workers", type=int, default=None, help="partition processes (default: one per core)")
+parser.add_argument("--csv", action="store_true", help="also export enrolment_features.csv")
+args = parser.parse_args()
+instrument.begin("features")
+
+if args.incremental:
+    delta_df, pincodes, months = incremental.read_changed_cells("monthly_delta")
+    pincode_rows = store.read("enrolment_monthly", filters=[("pincode", "in", pincodes)])
+    month_rows = store.read("enrolment_monthly", filters=[("month", "in", months)])
+    features_df, delta_df = features.update_features(
+        store.read("enrolment_features"), pincode_rows, month_rows
+    )
+    print(f"Recomputed features for {len(delta_df)} pincode-months "
+          f"({len(pincodes)} pincodes, {len(months)} months)")
+elif args.partitions:
+    features_df = partition.build_features(args.partitions, args.workers)
+    delta_df = features_df
+else:
+    monthly_df = store.read("enrolment_monthly")
+    features_df = features.build_features(monthly_df)
+    delta_df = features_df
+
+store.write(features_df, "enrolment_features", csv=args.csv)
+store.write(delta_df, "features_delta")
+with instrument.step("cube"):
+    enrolment_cube = cube.build(features_df)
+    cube.save(enrolment_cube)
+
+monthly_total = cube.monthly(enrolment_cube)
+instrument.metric(
+    pincodes=len(enrolment_cube["pincodes"]),
+    cube_shape=list(enrolment_cube["counts"].shape),
+    growth_min=float(features_df["enrolments_mom_growth"].min()),
+    growth_max=float(features_df["enrolments_mom_growth"].max()),
+    monthly_total={month.strftime("%Y-%m-%d"): int(total) for month, total in monthly_total.items()},
 )
 
-features_df = features_df.merge(
-    district_totals, on=["month", "district"], how="left"
-)
-features_df = features_df.merge(
-    state_totals, on=["month", "state"], how="left"
-)
-
-features_df["enrolment_share_district"] = (
-    (features_df["total_enrolments"] / features_df["district_total"] * 100)
-    .fillna(0)
-)
-
-features_df["enrolment_share_state"] = (
-    (features_df["total_enrolments"] / features_df["state_total"] * 100)
-    .fillna(0)
-)
-
-features_df = features_df[
-    [
-        "month",
-        "state",
-        "district",
-        "pincode",
-        "total_enrolments",
-        "enrolments_mom_growth",
-        "rolling_3m_avg",
-        "enrolment_share_district",
-        "enrolment_share_state",
-    ]
-]
-
-features_df.to_csv("../data/enrolment_features.csv", index=False)
-
 print("Feature engineering completed successfully.")
 print(features_df.head(10))
 print("\nFeature summary statistics:")
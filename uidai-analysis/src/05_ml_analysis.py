@@ -1,41 +1,66 @@
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import IsolationForest
-from scipy import stats
 import os
+from uidai_pipeline import flags, incremental, instrument, model, online, partition, paths, store
 
-features_df = pd.read_csv("../data/enrolment_features.csv")
-features_df["month"] = pd.to_datetime(features_df["month"])
-
-os_dir = "../outputs"
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="score and re-flag only the cells recomputed by the last 03_feature_engineering.py run",
+)
+parser.add_argument("--z-threshold", type=float, default=2.5)
+parser.add_argument("--zscore-decay", type=float, default=None,
+                    help="exponentially weight the per-pincode z-score statistics (0-1, per month)")
+parser.add_argument("--contamination", type=float, default=0.05)
+parser.add_argument("--refit", action="store_true", help="refit the Isolation Forest even if the saved one is current")
+parser.add_argument(
+    "--score-only",
+    action="store_true",
+    help="never refit; score against the saved Isolation Forest and fail if there is none",
+)
+parser.add_argument("--refit-days", type=int, default=model.DEFAULT_REFIT_DAYS,
+                    help="refit once the saved model is this many days old")
+parser.add_argument("--sample-size", type=int, default=None,
+                    help="fit on a state-stratified sample of this many cells instead of all of them")
+parser.add_argument("--batch-size", type=int, default=model.DEFAULT_BATCH_SIZE)
+parser.add_argument("--jobs", type=int, default=None, help="parallel scoring workers (-1 for all cores)")
+parser.add_argument("--partitions", type=int, default=None,
+                    help="run the per-pincode steps on this many state partitions in parallel")
+parser.add_argument("--workers", type=int, default=None, help="partition processes (default: one per core)")
+parser.add_argument("--csv", action="store_true", help="also export flagged_records.csv")
+args = parser.parse_args()
+instrument.begin("ml")
+
+if args.incremental:
+    z_anomalies = incremental.update_zscores(args.z_threshold)
+    print(f"Found {len(z_anomalies)} anomalous changed records (Z-score > {args.z_threshold})")
+    reemitted = incremental.update_flags(csv=args.csv)
+    print(f"Re-emitted {len(reemitted)} flagged records for changed pincodes")
+    raise SystemExit(0)
+
+features_df = store.read("enrolment_features")
+
+os_dir = paths.OUTPUT_DIR
 os.makedirs(os_dir, exist_ok=True)
 
 print("=" * 80)
 print("FORECASTING & ANOMALY DETECTION")
 print("=" * 80)
 
+# The running z-score statistics are rebuilt from the full history; later
+# --incremental runs fold only new months into them.
+if args.partitions:
+    local = partition.per_pincode(args.partitions, args.workers, zscore_decay=args.zscore_decay)
+else:
+    local = flags.per_pincode(features_df, zscore_decay=args.zscore_decay)
+online.save(local["zscore_stats"])
+
 print("\n1. SIMPLE ROLLING AVERAGE FORECAST")
 print("-" * 80)
 
-forecast_df = features_df.copy()
-forecast_df = forecast_df.sort_values(["pincode", "month"]).reset_index(drop=True)
-
-forecast_df["forecast_3m"] = (
-    forecast_df.groupby("pincode")["total_enrolments"]
-    .transform(lambda x: x.rolling(window=3, min_periods=1).mean().shift(1))
-)
-
-forecast_df["forecast_error"] = (
-    forecast_df["total_enrolments"] - forecast_df["forecast_3m"]
-)
-
-forecast_df["forecast_error_pct"] = (
-    (forecast_df["forecast_error"] / forecast_df["forecast_3m"] * 100)
-    .fillna(0)
-    .replace([np.inf, -np.inf], 0)
-)
-
+forecast_df = local["forecast"]
 valid_forecast = forecast_df[forecast_df["forecast_3m"].notna()].copy()
 
 print(f"Forecast MAE: {valid_forecast['forecast_error'].abs().mean():.2f}")
@@ -54,19 +79,9 @@ print(forecast_summary.nlargest(10, "avg_forecast_error_pct"))
 print("\n2. Z-SCORE ANOMALY DETECTION")
 print("-" * 80)
 
-anomaly_df = features_df.copy()
-
-anomaly_df["z_score_enrolments"] = (
-    anomaly_df.groupby("pincode")["total_enrolments"]
-    .transform(lambda x: np.abs(stats.zscore(x, nan_policy="omit")))
-)
-
-anomaly_df["z_score_growth"] = (
-    anomaly_df.groupby("pincode")["enrolments_mom_growth"]
-    .transform(lambda x: np.abs(stats.zscore(x, nan_policy="omit")))
-)
+anomaly_df = local["zscores"]
 
-z_threshold = 2.5
+z_threshold = args.z_threshold
 z_anomalies = anomaly_df[
     (anomaly_df["z_score_enrolments"] > z_threshold) |
     (anomaly_df["z_score_growth"] > z_threshold)
@@ -90,59 +105,44 @@ iso_df = features_df[[
     "enrolment_share_district", "enrolment_share_state"
 ]].copy()
 
-iso_df = iso_df.fillna(0)
-
-features_for_iso = iso_df[[
-    "total_enrolments", "enrolments_mom_growth",
-    "rolling_3m_avg", "enrolment_share_state"
-]].copy()
-
-scaler = StandardScaler()
-scaled_features = scaler.fit_transform(features_for_iso)
-
-iso_forest = IsolationForest(contamination=0.05, random_state=42)
-iso_df["anomaly_score"] = iso_forest.fit_predict(scaled_features)
-iso_df["anomaly_flag"] = (iso_df["anomaly_score"] == -1).astype(int)
+iso_df = iso_df.replace([np.inf, -np.inf], 0).fillna(0)
+
+saved = model.load()
+if args.score_only:
+    if saved is None:
+        instrument.fail("--score-only needs a saved model; run without it once to fit one")
+    reason = None
+elif args.refit:
+    reason = "--refit"
+else:
+    reason = model.refit_reason(saved, iso_df, flags.ISO_FEATURES, args.contamination, args.refit_days)
+if reason:
+    saved = model.fit(iso_df, flags.ISO_FEATURES, args.contamination, args.sample_size, previous=saved)
+    model.save(saved)
+    print(f"Fitted Isolation Forest v{saved['version']} on {saved['train_rows']} cells ({reason})")
+else:
+    print(f"Scoring with saved Isolation Forest v{saved['version']} fitted {saved['fitted']}")
+
+iso_df[["anomaly_score", "anomaly_flag"]] = model.score(saved, iso_df, args.batch_size, args.jobs)
+store.write(iso_df, "anomaly_scores")
+instrument.metric(model_version=saved["version"], model_refit=reason)
 
 anomaly_count = (iso_df["anomaly_flag"] == 1).sum()
-print(f"Isolation Forest identified {anomaly_count} anomalous records (~5% of data)")
+print(f"Isolation Forest identified {anomaly_count} anomalous records (~{args.contamination:.0%} of data)")
 
-iso_anomalies = iso_df[iso_df["anomaly_flag"] == 1].sort_values("total_enrolments", ascending=False)
+iso_anomalies = iso_df[iso_df["anomaly_flag"] == 1].sort_values("anomaly_score")
 print("\nTop 15 Isolation Forest Anomalies:")
 print(iso_anomalies[[
     "month", "state", "district", "pincode", "total_enrolments",
-    "enrolments_mom_growth"
+    "enrolments_mom_growth", "anomaly_score"
 ]].head(15))
 
 print("\n4. HIGH-DEMAND & HIGH-RISK AREAS")
 print("-" * 80)
 
-high_demand = features_df.groupby("pincode").agg({
-    "total_enrolments": ["mean", "sum", "count"],
-    "enrolments_mom_growth": "mean"
-}).reset_index()
-
-high_demand.columns = ["pincode", "avg_enrolments", "total_enrolments", "num_months", "avg_growth"]
-
-high_demand = high_demand[high_demand["num_months"] >= 2]
-high_demand = high_demand.sort_values("avg_enrolments", ascending=False)
-
-high_demand["demand_level"] = pd.qcut(
-    high_demand["avg_enrolments"],
-    q=3,
-    labels=["Low", "Medium", "High"],
-    duplicates="drop"
-)
-
-high_demand["risk_level"] = "Normal"
-high_demand.loc[
-    (high_demand["avg_growth"] > 50) | (high_demand["avg_growth"] < -30),
-    "risk_level"
-] = "High"
-high_demand.loc[
-    (high_demand["avg_growth"] > 25) & (high_demand["avg_growth"] <= 50),
-    "risk_level"
-] = "Medium"
+pincode_demand = local["demand"]
+store.write(pincode_demand, "pincode_demand")
+high_demand = flags.assign_levels(pincode_demand)
 
 high_demand_flag = high_demand[
     (high_demand["demand_level"] == "High") | (high_demand["risk_level"] == "High")
@@ -168,37 +168,17 @@ print(high_dm[[
 print("\n5. EXPORT FLAGGED RECORDS")
 print("-" * 80)
 
-final_flags = features_df.merge(
-    iso_df[["month", "pincode", "anomaly_flag"]],
-    on=["month", "pincode"],
-    how="left"
-).fillna(0)
+flagged_records = flags.compose_flags(features_df, iso_df, high_demand)
 
-final_flags = final_flags.merge(
-    high_demand[["pincode", "demand_level", "risk_level"]],
-    on="pincode",
-    how="left"
+store.write(flagged_records, "flagged_records", csv=args.csv)
+instrument.metric(
+    feature_rows=len(features_df),
+    z_anomalies=len(z_anomalies),
+    iso_anomalies=int(anomaly_count),
+    **flags.summarize(flagged_records),
 )
 
-final_flags["flag_reason"] = ""
-final_flags.loc[final_flags["anomaly_flag"] == 1, "flag_reason"] = "Isolation Forest Anomaly"
-final_flags.loc[final_flags["risk_level"] == "High", "flag_reason"] += " | High-Risk Growth"
-final_flags.loc[final_flags["demand_level"] == "High", "flag_reason"] += " | High-Demand Area"
-
-flagged_records = final_flags[
-    (final_flags["anomaly_flag"] == 1) |
-    (final_flags["risk_level"] == "High") |
-    (final_flags["demand_level"] == "High")
-].copy()
-
-flagged_records = flagged_records.sort_values("total_enrolments", ascending=False)
-
-flagged_records[[
-    "month", "state", "district", "pincode", "total_enrolments",
-    "enrolments_mom_growth", "demand_level", "risk_level", "flag_reason"
-]].to_csv(f"{os_dir}/flagged_records.csv", index=False)
-
-print(f"\nFlagged {len(flagged_records)} records exported to flagged_records.csv")
+print(f"\nFlagged {len(flagged_records)} records exported to flagged_records")
 print("\nSample of Flagged Records:")
 print(flagged_records[[
     "month", "state", "district", "pincode", "total_enrolments",
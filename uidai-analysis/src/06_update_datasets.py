@@ -0,0 +1,86 @@
+import argparse
+from uidai_pipeline import flags, ingest, instrument, store, updates, validate
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dataset", required=True, choices=sorted(ingest.UPDATE_DATASETS))
+parser.add_argument(
+    "--input",
+    default=None,
+    help="raw CSV, directory of CSV shards or glob pattern (default: the dataset's file in data/)",
+)
+parser.add_argument("--z-threshold", type=float, default=2.5)
+parser.add_argument("--contamination", type=float, default=0.05)
+parser.add_argument(
+    "--reject-duplicates",
+    action="store_true",
+    help="reject rows repeating an earlier (date, pincode), for sources that deliver one row per key",
+)
+parser.add_argument(
+    "--reject-limits",
+    default=validate.DEFAULT_LIMITS,
+    help="fail when the reject rate exceeds these (see 01_load_and_clean.py)",
+)
+parser.add_argument("--csv", action="store_true", help="also export the monthly, rollup and flagged tables as CSV")
+args = parser.parse_args()
+instrument.begin(args.dataset)
+dataset = args.dataset
+
+print("=" * 80)
+print(f"{dataset.upper()} UPDATES")
+print("=" * 80)
+
+print("\n1. LOAD AND CLEAN")
+print("-" * 80)
+validator = validate.start(
+    dataset, ingest.UPDATE_DATASETS[dataset]["counts"], args.reject_limits, reject_duplicates=args.reject_duplicates
+)
+cleaned_df = updates.load(dataset, validator, args.input)
+store.write(cleaned_df, f"{dataset}_cleaned")
+print(f"{len(cleaned_df)} rows, {cleaned_df['date'].min():%Y-%m-%d} to {cleaned_df['date'].max():%Y-%m-%d}")
+
+print("\n2. MONTHLY AGGREGATION")
+print("-" * 80)
+monthly_df = updates.aggregate_monthly(cleaned_df, dataset)
+store.write(monthly_df, f"{dataset}_monthly", csv=args.csv)
+print(monthly_df.groupby("month")[updates.VALUE].sum())
+
+print("\n3. FEATURES AND ROLLUPS")
+print("-" * 80)
+features_df = updates.build_features(monthly_df)
+store.write(features_df, f"{dataset}_features")
+district_df = updates.rollup(features_df, dataset, "district")
+state_df = updates.rollup(features_df, dataset, "state")
+store.write(district_df, f"{dataset}_district_monthly", csv=args.csv)
+store.write(state_df, f"{dataset}_state_monthly", csv=args.csv)
+print(features_df[[updates.GROWTH, "rolling_3m_avg"]].describe())
+print(f"\n{len(district_df)} district-months, {len(state_df)} state-months")
+
+print("\n4. ANOMALIES AND FLAGS")
+print("-" * 80)
+z_anomalies = updates.zscore_anomalies(features_df, args.z_threshold)
+print(f"Found {len(z_anomalies)} anomalous records (Z-score > {args.z_threshold})")
+
+iso_df = updates.score_anomalies(features_df, args.contamination)
+print(f"Isolation Forest identified {iso_df['anomaly_flag'].sum()} anomalous records "
+      f"(~{args.contamination:.0%} of data)")
+
+summary_df = updates.pincode_summary(features_df)
+store.write(summary_df, f"{dataset}_pincode_summary", csv=args.csv)
+
+flagged_df = updates.compose_flags(features_df, iso_df, summary_df)
+store.write(flagged_df, f"{dataset}_flagged", csv=args.csv)
+print(f"\nFlagged {len(flagged_df)} records exported to {dataset}_flagged")
+print(flagged_df[[
+    "month", "pincode", updates.VALUE, updates.GROWTH, "demand_level", "risk_level", "flag_reason"
+]].head(20))
+
+monthly_total = features_df.groupby("month")[updates.VALUE].sum().sort_index()
+instrument.metric(
+    months=int(features_df["month"].nunique()),
+    pincodes=int(features_df["pincode"].nunique()),
+    z_anomalies=len(z_anomalies),
+    iso_anomalies=int(iso_df["anomaly_flag"].sum()),
+    monthly_total={month.strftime("%Y-%m-%d"): int(total) for month, total in monthly_total.items()},
+    state_total=int(state_df[updates.VALUE].sum()),
+    **flags.summarize(flagged_df),
+)
@@ -0,0 +1,25 @@
+import argparse
+from uidai_pipeline import export, instrument, paths
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--out", default=paths.EXPORT_DIR, help="dashboard data directory")
+args = parser.parse_args()
+instrument.begin("export")
+
+manifest, removed = export.export_all(args.out)
+
+files = [
+    (name, part)
+    for name, entry in manifest["views"].items()
+    for part in entry.get("partitions", {"": entry}).values()
+]
+compressed = sum(part["bytes"] for _, part in files)
+raw = sum(part["raw_bytes"] for _, part in files)
+print(f"Exported {len(manifest['views'])} views in {len(files)} files to {args.out}")
+print(f"{raw / 1024:.1f} KB of JSON, {compressed / 1024:.1f} KB gzipped; {removed} stale files removed")
+for name, entry in manifest["views"].items():
+    if "partitions" in entry:
+        print(f"  {name:<32} {len(entry['partitions'])} {entry['partitioned_by']} partitions")
+    else:
+        print(f"  {name:<32} {entry['rows']} rows  {entry['file']}")
+instrument.metric(views=len(manifest["views"]), files=len(files), bytes=compressed, raw_bytes=raw)
@@ -0,0 +1,73 @@
+import argparse
+import numpy as np
+from uidai_pipeline import cube, forecast, instrument, store
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--horizon", type=int, default=3, help="months to forecast past the last month")
+parser.add_argument(
+    "--model",
+    default="auto",
+    choices=["auto"] + forecast.MODELS,
+    help="forecast every pincode with one model, or pick each pincode's best by backtest MAE",
+)
+parser.add_argument("--min-train", type=int, default=3, help="months of history before the first backtest origin")
+parser.add_argument("--csv", action="store_true", help="also export the forecast and accuracy tables as CSV")
+args = parser.parse_args()
+instrument.begin("forecast")
+
+features_df = store.read("enrolment_features", columns=["month", "state", "district", "pincode", "total_enrolments"])
+attributes = features_df.groupby("pincode")[["state", "district"]].first().reset_index()
+
+print("=" * 80)
+print("ENROLMENT FORECASTS")
+print("=" * 80)
+
+# Written by 03_feature_engineering.py; rebuilt here if it is missing.
+enrolment_cube = cube.load()
+if enrolment_cube is None:
+    enrolment_cube = cube.build(features_df)
+with instrument.step("matrix"):
+    pincodes, months, matrix = cube.pincode_months(enrolment_cube)
+print(f"{len(pincodes)} pincodes x {len(months)} months "
+      f"({months[0]:%Y-%m} to {months[-1]:%Y-%m}, {int(np.isnan(matrix).all(axis=0).sum())} months without data)")
+
+print("\n1. ROLLING-ORIGIN BACKTEST")
+print("-" * 80)
+scores = forecast.backtest(matrix, args.horizon, args.min_train)
+if args.model == "auto":
+    chosen = forecast.select(scores)
+else:
+    chosen = np.full(len(pincodes), forecast.MODELS.index(args.model))
+
+accuracy_df = forecast.accuracy_frame(pincodes, attributes, scores, chosen)
+district_df = forecast.district_accuracy(accuracy_df)
+by_model = forecast.model_accuracy(accuracy_df)
+print(f"{scores['origins']} origins, horizon {args.horizon}; 'selected' is --model {args.model}")
+print(by_model[["mae", "mape", "points"]])
+
+print("\nLeast accurate districts (selected models):")
+district_selected = district_df[district_df["model"] == "selected"]
+print(district_selected.nlargest(10, "mae")[["state", "district", "pincodes", "mae", "mape"]])
+
+print("\n2. FORECASTS")
+print("-" * 80)
+with instrument.step("forecast"):
+    forecasts = forecast.predict(matrix, args.horizon)
+forecast_df = forecast.forecast_frame(pincodes, months, attributes, forecasts, chosen)
+monthly_forecast = forecast_df.groupby("month")["forecast"].sum()
+print(monthly_forecast.round(0))
+print("\nModels chosen:", forecast_df.drop_duplicates("pincode")["model"].value_counts().to_dict())
+
+store.write(forecast_df, "enrolment_forecast", csv=args.csv)
+store.write(accuracy_df, "forecast_accuracy", csv=args.csv)
+store.write(district_df, "forecast_district_accuracy", csv=args.csv)
+
+instrument.metric(
+    pincodes=len(pincodes),
+    months=len(months),
+    horizon=args.horizon,
+    origins=scores["origins"],
+    model_mae={name: round(float(value), 4) for name, value in by_model["mae"].items()},
+    models_chosen={name: int(count) for name, count in forecast_df.drop_duplicates("pincode")["model"].value_counts().items()},
+    forecast_total={month.strftime("%Y-%m-%d"): round(float(total), 1) for month, total in monthly_forecast.items()},
+)
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+from uidai_pipeline import devices, instrument, paths, store
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--input", default=None, help=f"transaction log CSV (default {paths.RAW_DEVICE_LOGS})")
+parser.add_argument("--chunksize", type=int, default=1_000_000, help="log rows read per chunk")
+parser.add_argument("--top", type=int, default=10, help="devices per month in the published-format CSV")
+parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the failure-rate intervals")
+parser.add_argument("--csv", action="store_true", help="also export the daily and monthly tables as CSV")
+args = parser.parse_args()
+instrument.begin("devices")
+log_path = args.input or paths.RAW_DEVICE_LOGS
+
+print("=" * 80)
+print("BIOMETRIC DEVICE PERFORMANCE")
+print("=" * 80)
+
+if not os.path.exists(log_path):
+    print(f"No transaction log at {log_path}; nothing to aggregate")
+    sys.exit(0)
+
+print("\n1. DAILY COUNTS BY STATE AND DEVICE")
+print("-" * 80)
+daily_df = devices.add_rates(devices.stream_daily(log_path, chunksize=args.chunksize), args.confidence)
+store.write(daily_df, "device_daily", csv=args.csv)
+print(f"{daily_df['total_trans'].sum()} transactions in {len(daily_df)} day x state x device groups, "
+      f"{daily_df['date'].min():%Y-%m-%d} to {daily_df['date'].max():%Y-%m-%d}")
+
+print("\n2. MONTHLY DEVICE PERFORMANCE")
+print("-" * 80)
+monthly_df = devices.monthly(daily_df, args.confidence)
+store.write(monthly_df, "device_monthly", csv=args.csv)
+published_df = devices.published(monthly_df, args.top)
+os.makedirs(os.path.dirname(devices.PUBLISHED_PATH), exist_ok=True)
+published_df.to_csv(devices.PUBLISHED_PATH, index=False)
+latest = monthly_df[monthly_df["month"] == monthly_df["month"].max()].sort_values("failed_perc", ascending=False)
+print(f"Failure rates for {latest['month'].max():%b %Y} ({args.confidence:.0%} intervals):")
+print(latest[["deviceproviderid", "modelid", "dev_level", "total_trans", "failed_perc",
+              "failed_ci_low", "failed_ci_high"]].round(2).to_string(index=False))
+print(f"\nTop {args.top} devices per month written to {devices.PUBLISHED_PATH}")
+
+instrument.metric(
+    transactions=int(daily_df["total_trans"].sum()),
+    groups=len(daily_df),
+    devices=int(monthly_df[devices.DEVICE].drop_duplicates().shape[0]),
+    months=int(monthly_df["month"].nunique()),
+    failed_perc=round(float(daily_df["failed_trans"].sum() / daily_df["total_trans"].sum() * 100), 4),
+)
@@ -0,0 +1,82 @@
+import argparse
+from fractions import Fraction
+import numpy as np
+from uidai_pipeline import instrument, model, online, store, sweep
+
+parser = argparse.ArgumentParser()
+for detector, parameter in sweep.PARAMETERS.items():
+    parser.add_argument(
+        f"--{parameter.replace('_', '-')}",
+        dest=detector,
+        default=None,
+        help=f"comma-separated grid (default {','.join(f'{value:g}' for value in sweep.DEFAULT_GRID[detector])})",
+    )
+parser.add_argument("--csv", action="store_true", help="also export the sweep tables as CSV")
+args = parser.parse_args()
+instrument.begin("sweep")
+
+grid = {
+    detector: [float(Fraction(value)) for value in getattr(args, detector).split(",")]
+    for detector in sweep.PARAMETERS if getattr(args, detector)
+}
+
+features_df = store.read("enrolment_features")
+if not store.exists("anomaly_scores"):
+    instrument.fail("No anomaly scores; run 05_ml_analysis.py first")
+zscore_stats = online.load()
+if zscore_stats is None:
+    zscore_stats, _ = online.update(online.empty(), features_df)
+saved = model.load()
+
+print("=" * 80)
+print("THRESHOLD SWEEP")
+print("=" * 80)
+
+with instrument.step("scores"):
+    cells = sweep.scores(features_df, store.read("anomaly_scores"), store.read("pincode_demand"), zscore_stats)
+tables = sweep.sweep(cells, grid, contamination=saved["contamination"] if saved else None)
+for name, table in [("threshold_sweep", tables["combinations"]), ("detector_sweep", tables["detectors"]),
+                    ("detector_overlap", tables["overlap"])]:
+    store.write(table, name, csv=args.csv)
+
+keys = [sweep.PARAMETERS[detector] for detector in sweep.FLAGGED]
+totals = tables["combinations"].groupby(keys)["flagged"].sum()
+print(f"\n1. FLAGGED RECORDS OVER {len(totals)} THRESHOLD COMBINATIONS")
+print("-" * 80)
+print(f"{len(cells)} cells in {tables['combinations'][['state', 'district']].drop_duplicates().shape[0]} districts")
+for detector in sweep.FLAGGED:
+    # One threshold moved at a time, the others at their current values.
+    others = {sweep.PARAMETERS[other]: sweep.CURRENT[other] for other in sweep.FLAGGED if other != detector}
+    line = sweep.select(totals.reset_index(), **others)
+    print(f"\n{keys[sweep.FLAGGED.index(detector)]}:")
+    print(line.set_index(sweep.PARAMETERS[detector])["flagged"].sort_index().to_string())
+
+current = {sweep.PARAMETERS[detector]: sweep.CURRENT[detector] for detector in sweep.FLAGGED}
+current_rows = sweep.select(tables["combinations"], **current)
+print("\nFlagged records per state at the current thresholds:")
+print(sweep.by_state(current_rows, keys).sort_values("flagged", ascending=False)[["state", "flagged"]]
+      .head(10).to_string(index=False))
+
+print("\n2. SINGLE RULES")
+print("-" * 80)
+single = tables["detectors"].groupby(["detector", "threshold"], observed=True)["flagged"].sum()
+print(single.to_string())
+
+print("\n3. OVERLAP BETWEEN RULES AT THE CURRENT THRESHOLDS")
+print("-" * 80)
+overlap = tables["overlap"]
+current_overlap = overlap[
+    np.isclose(overlap["threshold_a"], overlap["detector_a"].map(sweep.CURRENT).astype(float))
+    & np.isclose(overlap["threshold_b"], overlap["detector_b"].map(sweep.CURRENT).astype(float))
+]
+print(current_overlap[["detector_a", "detector_b", "flagged_a", "flagged_b", "both", "jaccard"]]
+      .round(3).to_string(index=False))
+
+instrument.metric(
+    combinations=len(totals),
+    current_flagged=int(current_rows["flagged"].sum()),
+    current_single={
+        detector: int(sweep.select(single.loc[detector].reset_index(), threshold=value)["flagged"].sum())
+        for detector, value in sweep.CURRENT.items()
+    },
+)
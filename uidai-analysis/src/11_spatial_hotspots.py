@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+from uidai_pipeline import cube, hotspots, instrument, paths, store
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--centroids", default=None,
+                    help=f"pincode centroid CSV with pincode, latitude, longitude (default {paths.PINCODE_CENTROIDS})")
+parser.add_argument("--radius-km", type=float, default=hotspots.DEFAULT_RADIUS_KM,
+                    help="pincodes within this distance are neighbours and can share a cluster")
+parser.add_argument("--neighbours", type=int, default=hotspots.DEFAULT_NEIGHBOURS,
+                    help="nearest pincodes always in a pincode's Gi* neighbourhood")
+parser.add_argument("--alpha", type=float, default=hotspots.DEFAULT_ALPHA, help="Gi* significance level")
+parser.add_argument("--min-cluster", type=int, default=hotspots.DEFAULT_MIN_CLUSTER,
+                    help="fewest flagged pincodes that make a cluster")
+parser.add_argument("--csv", action="store_true", help="also export the hotspot tables as CSV")
+args = parser.parse_args()
+instrument.begin("hotspots")
+centroid_path = args.centroids or paths.PINCODE_CENTROIDS
+
+print("=" * 80)
+print("SPATIAL HOTSPOTS")
+print("=" * 80)
+
+if not os.path.exists(centroid_path):
+    print(f"No pincode centroids at {centroid_path}; nothing to cluster")
+    sys.exit(0)
+
+features_df = store.read("enrolment_features", columns=["month", "state", "district", "pincode", "total_enrolments"])
+flagged_df = store.read("flagged_records", columns=["month", "pincode"])
+centroids = hotspots.read_centroids(centroid_path)
+# Written by 03_feature_engineering.py; rebuilt here if it is missing.
+enrolment_cube = cube.load()
+if enrolment_cube is None:
+    enrolment_cube = cube.build(features_df)
+
+print("\n1. NEIGHBOURHOODS AND GETIS-ORD GI*")
+print("-" * 80)
+cells_df, clusters_df = hotspots.hotspots(
+    features_df, flagged_df, centroids, radius_km=args.radius_km, nearest=args.neighbours,
+    alpha=args.alpha, min_size=args.min_cluster, enrolment_cube=enrolment_cube,
+)
+store.write(cells_df, "pincode_hotspots", csv=args.csv)
+store.write(clusters_df, "hotspot_clusters", csv=args.csv)
+located = cells_df["pincode"].nunique()
+print(f"{located} of {features_df['pincode'].nunique()} pincodes located; "
+      f"{cells_df.drop_duplicates('pincode')['neighbours'].mean():.1f} neighbours each on average")
+latest = cells_df[cells_df["month"] == cells_df["month"].max()]
+print(f"\n{latest['month'].max():%b %Y}: {int((latest['hotspot'] == 'Hot').sum())} hot and "
+      f"{int((latest['hotspot'] == 'Cold').sum())} cold pincodes (p < {args.alpha})")
+print(latest.sort_values("gi_star", ascending=False)[[
+    "state", "district", "pincode", "total_enrolments", "neighbourhood_growth", "gi_star", "gi_p"
+]].head(10).round(3).to_string(index=False))
+
+print("\n2. CLUSTERS OF FLAGGED PINCODES")
+print("-" * 80)
+print(f"{len(clusters_df)} clusters of {args.min_cluster}+ flagged pincodes within {args.radius_km:g} km "
+      f"across {clusters_df['month'].nunique()} months; "
+      f"{int(cells_df['flagged'].sum() - (cells_df['cluster'] >= 0).sum())} flagged cells stand alone")
+print(clusters_df.sort_values(["pincodes", "total_enrolments"], ascending=False).head(15).round(
+    {"growth": 1, "mean_gi_star": 2, "latitude": 4, "longitude": 4, "radius_km": 1}
+).to_string(index=False))
+
+instrument.metric(
+    cells=len(cells_df),
+    hot_cells=int((cells_df["hotspot"] == "Hot").sum()),
+    cold_cells=int((cells_df["hotspot"] == "Cold").sum()),
+    clusters=len(clusters_df),
+    clustered_cells=int((cells_df["cluster"] >= 0).sum()),
+    flagged_cells=int(cells_df["flagged"].sum()),
+)
@@ -0,0 +1,3 @@
+from uidai_pipeline.runner import main
+
+main()
@@ -0,0 +1,108 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+
+from uidai_pipeline import instrument, runner
+from uidai_pipeline.paths import DATA_DIR, OUTPUT_DIR, ROOT_DIR, SRC_DIR
+
+BENCH_DIR = os.path.join(ROOT_DIR, "benchmarks")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.jsonl")
+DEFAULT_STAGES = [
+    "load", "merge", "features", "analysis", "ml", "sweep", "hotspots", "forecast", "biometric", "demographic",
+    "devices",
+]
+
+
+def dataset_dir(rows, pincodes, seed):
+    return os.path.join(BENCH_DIR, "data", f"rows{rows}_pin{pincodes}_seed{seed}")
+
+
+def _rebase(path, data_dir, output_dir):
+    # Stage declarations use the default data/ and outputs/ directories;
+    # benchmarks run the same stages against a generated dataset.
+    for default, target in ((DATA_DIR, data_dir), (OUTPUT_DIR, output_dir)):
+        if path.startswith(default + os.sep):
+            return os.path.join(target, os.path.relpath(path, default))
+    return path
+
+
+def count_rows(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_metadata(path).num_rows
+    if path.endswith(".csv"):
+        with open(path, "rb") as f:
+            return max(sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 24), b"")) - 1, 0)
+    return None
+
+
+def run_stage(name, params, data_dir, output_dir):
+    stage = runner.STAGES[name]
+    inputs = [_rebase(p, data_dir, output_dir) for p in runner._resolve(stage["inputs"], params)]
+    input_rows = sum(count_rows(p) or 0 for p in inputs if os.path.exists(p))
+
+    env = dict(os.environ, UIDAI_DATA_DIR=data_dir, UIDAI_OUTPUT_DIR=output_dir,
+               UIDAI_EXPORT_DIR=os.path.join(output_dir, "export"))
+    command = [sys.executable, stage["script"]] + runner._argv(params)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    manifest = instrument.load_manifest(os.path.join(output_dir, os.path.basename(instrument.MANIFEST_PATH)))
+    record = manifest["stages"].get(name, {})
+
+    return {
+        "stage": name,
+        "exit_code": process.returncode,
+        "input_rows": input_rows,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "rows_per_s": round(input_rows / wall) if wall > 0 else None,
+        "steps": record.get("steps", {}),
+    }
+
+
+def bench(scales, stages=DEFAULT_STAGES, pincodes=19_000, seed=0, overrides=(), results_path=RESULTS_PATH):
+    from uidai_pipeline import synth
+
+    params = runner.stage_params(list(overrides))
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    results = []
+    for rows in scales:
+        data_dir = dataset_dir(rows, pincodes, seed)
+        output_dir = os.path.join(data_dir, "outputs")
+        if not os.path.exists(os.path.join(data_dir, "synthetic_meta.json")):
+            print(f"Generating {rows} rows x {pincodes} pincodes in {data_dir}")
+            synth.generate_all(data_dir, rows, pincodes=pincodes, seed=seed, device_rows=rows)
+        device_log = os.path.join(data_dir, "device_transactions.csv")
+        if "devices" in stages and not os.path.exists(device_log):
+            # Datasets generated before device logs existed.
+            synth.generate_device_logs(device_log, rows, synth.make_geography(pincodes, seed=seed), seed=seed)
+        centroids = os.path.join(data_dir, "pincode_centroids.csv")
+        if "hotspots" in stages and not os.path.exists(centroids):
+            synth.generate_centroids(centroids, synth.make_geography(pincodes, seed=seed), seed=seed)
+
+        for name in stages:
+            result = run_stage(name, params[name], data_dir, output_dir)
+            result.update({
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "rows": rows,
+                "pincodes": pincodes,
+                "params": params[name],
+            })
+            results.append(result)
+            with open(results_path, "a") as f:
+                f.write(json.dumps(result) + "\n")
+            print(f"{rows:>12} {name:<10} {result['wall_s']:>9.2f}s {result['peak_rss_mb']:>9.1f} MB "
+                  f"{result['rows_per_s'] or 0:>12} rows/s")
+            if result["exit_code"] != 0:
+                print(f"Stage {name} failed at {rows} rows; skipping the remaining stages")
+                break
+    return results
@@ -0,0 +1,270 @@
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import cube, instrument
+
+# Every chart is split into an aggregate step, which reduces the features
+# table (or, for enrolment totals, the cube) to the small table actually
+# plotted, and a draw step that only sees that table. Aggregates are
+# computed once in the parent process; drawing happens in worker processes
+# on the Agg backend, and a PNG is redrawn only when the hash of its
+# aggregate (plus its drawing code and dpi) changes.
+
+CACHE_NAME = ".render_cache.json"
+DATA_DIR_NAME = "chart_data"
+
+
+def _histogram(values, bins=50):
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({"left": edges[:-1], "right": edges[1:], "count": counts})
+
+
+def aggregate_time_trend(features_df, enrolment_cube):
+    return cube.monthly(enrolment_cube).to_frame()
+
+
+def aggregate_distributions(features_df, enrolment_cube):
+    return {
+        "total_enrolments": _histogram(features_df["total_enrolments"].to_numpy(dtype=float)),
+        "enrolments_mom_growth": _histogram(features_df["enrolments_mom_growth"].to_numpy(dtype=float)),
+    }
+
+
+def aggregate_state_totals(features_df, enrolment_cube):
+    return cube.totals(enrolment_cube, "state").sort_values(ascending=False).to_frame()
+
+
+def aggregate_scatter(features_df, enrolment_cube):
+    return features_df[[
+        "rolling_3m_avg", "enrolments_mom_growth", "enrolment_share_state", "total_enrolments"
+    ]].reset_index(drop=True)
+
+
+def aggregate_state_heatmap(features_df, enrolment_cube):
+    return cube.pivot(enrolment_cube, "state")
+
+
+def aggregate_district_hotspots(features_df, enrolment_cube):
+    district_state_month = cube.pivot(enrolment_cube, ["state", "district"])
+    if len(district_state_month) <= 20:
+        return district_state_month
+    top_10_districts = cube.totals(enrolment_cube, "district").nlargest(10).index
+    district_month = cube.pivot(enrolment_cube, "district")
+    return district_month[district_month.index.isin(top_10_districts)]
+
+
+def aggregate_top_states_trend(features_df, enrolment_cube):
+    top_states = cube.row_counts(enrolment_cube, "state").sort_values(ascending=False, kind="stable").head(5).index
+    return cube.pivot(enrolment_cube, "state").T[list(top_states)]
+
+
+def aggregate_growth_by_state(features_df, enrolment_cube):
+    return (
+        features_df.groupby("state", observed=True)["enrolments_mom_growth"]
+        .mean()
+        .sort_values(ascending=False)
+        .to_frame()
+    )
+
+
+def draw_time_trend(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(12, 5))
+    data["total_enrolments"].plot(ax=ax, linewidth=2)
+    ax.set_title("Total Enrolments Over Time (Univariate Trend)", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Total Enrolments")
+    ax.grid(alpha=0.3)
+    return fig
+
+
+def draw_distributions(data, plt, sns):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    panels = [
+        ("total_enrolments", "Distribution of Monthly Enrolments", "Total Enrolments", None),
+        ("enrolments_mom_growth", "Distribution of MoM Growth Rate (%)", "Growth Rate (%)", "orange"),
+    ]
+    for ax, (column, title, xlabel, color) in zip(axes, panels):
+        bins = data[column]
+        ax.bar(bins["left"], bins["count"], width=bins["right"] - bins["left"], align="edge",
+               edgecolor="black", alpha=0.7, color=color)
+        ax.set_title(title, fontsize=12, fontweight="bold")
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel("Frequency")
+    return fig
+
+
+def draw_state_totals(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    data["total_enrolments"].plot(kind="barh", ax=ax, color="steelblue")
+    ax.set_title("Total Enrolments by State", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Total Enrolments")
+    return fig
+
+
+def draw_scatter(data, plt, sns):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+
+    axes[0].scatter(data["rolling_3m_avg"], data["enrolments_mom_growth"], alpha=0.5, s=20)
+    axes[0].set_xlabel("3-Month Rolling Average")
+    axes[0].set_ylabel("MoM Growth Rate (%)")
+    axes[0].set_title("Growth Rate vs Rolling Average", fontsize=12, fontweight="bold")
+    axes[0].grid(alpha=0.3)
+
+    axes[1].scatter(data["enrolment_share_state"], data["total_enrolments"], alpha=0.5, s=20, color="orange")
+    axes[1].set_xlabel("Enrolment Share (State %)")
+    axes[1].set_ylabel("Total Enrolments")
+    axes[1].set_title("Enrolments vs State Share", fontsize=12, fontweight="bold")
+    axes[1].grid(alpha=0.3)
+    return fig
+
+
+def draw_state_heatmap(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(16, 6))
+    sns.heatmap(data, cmap="YlGnBu", ax=ax, cbar_kws={"label": "Total Enrolments"})
+    ax.set_title("State-wise Enrolments Over Time (Bivariate Heatmap)", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("State")
+    return fig
+
+
+def draw_top_states_trend(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(14, 6))
+    for state in data.columns:
+        state_data = data[state].dropna()
+        ax.plot(state_data.index, state_data.values, marker="o", label=state, linewidth=2)
+
+    ax.set_title("Top 5 States - Enrolment Trends Over Time", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Total Enrolments")
+    ax.legend()
+    ax.grid(alpha=0.3)
+    return fig
+
+
+def draw_district_hotspots(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(16, 8))
+    sns.heatmap(data, cmap="RdYlGn", ax=ax, cbar_kws={"label": "Total Enrolments"})
+    ax.set_title("District-Month Enrolment Hotspots (Trivariate Heatmap)", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("District")
+    return fig
+
+
+def draw_growth_by_state(data, plt, sns):
+    fig, ax = plt.subplots(figsize=(12, 8))
+    data["enrolments_mom_growth"].plot(kind="barh", ax=ax, color="steelblue")
+    ax.set_title("Average MoM Growth Rate by State", fontsize=14, fontweight="bold")
+    ax.set_xlabel("Average Growth Rate (%)")
+    return fig
+
+
+CHARTS = {
+    "01_univariate_time_trend": (aggregate_time_trend, draw_time_trend),
+    "02_univariate_distributions": (aggregate_distributions, draw_distributions),
+    "03_univariate_state_totals": (aggregate_state_totals, draw_state_totals),
+    "04_bivariate_scatter": (aggregate_scatter, draw_scatter),
+    "05_bivariate_state_heatmap": (aggregate_state_heatmap, draw_state_heatmap),
+    "06_bivariate_top_states_trend": (aggregate_top_states_trend, draw_top_states_trend),
+    "07_trivariate_district_hotspots": (aggregate_district_hotspots, draw_district_hotspots),
+    "08_trivariate_growth_by_state": (aggregate_growth_by_state, draw_growth_by_state),
+}
+
+
+def to_json(aggregate):
+    if isinstance(aggregate, dict):
+        return {key: to_json(value) for key, value in aggregate.items()}
+    frame = aggregate.copy()
+    frame.index = frame.index.map(str)
+    frame.columns = frame.columns.map(str)
+    return json.loads(frame.to_json(orient="split", double_precision=15))
+
+
+def aggregate_hash(name, payload, dpi):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(payload, sort_keys=True).encode())
+    digest.update(inspect.getsource(CHARTS[name][1]).encode())
+    digest.update(str(dpi).encode())
+    return digest.hexdigest()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style("whitegrid")
+    plt.rcParams["figure.figsize"] = (14, 6)
+
+
+def _render(name, aggregate, path, dpi):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = CHARTS[name][1](aggregate, plt, sns)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return name
+
+
+def _load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def render_all(features_df, out_dir, dpi=300, workers=None, data_only=False, force=False, enrolment_cube=None):
+    with instrument.step("aggregate"):
+        if enrolment_cube is None:
+            enrolment_cube = cube.build(features_df)
+        aggregates = {name: aggregate(features_df, enrolment_cube) for name, (aggregate, _) in CHARTS.items()}
+        payloads = {name: to_json(aggregate) for name, aggregate in aggregates.items()}
+
+    if data_only:
+        data_dir = os.path.join(out_dir, DATA_DIR_NAME)
+        os.makedirs(data_dir, exist_ok=True)
+        for name, payload in payloads.items():
+            with open(os.path.join(data_dir, f"{name}.json"), "w") as f:
+                json.dump(payload, f)
+        return {"written": list(payloads), "skipped": []}
+
+    cache_path = os.path.join(out_dir, CACHE_NAME)
+    cache = _load_cache(cache_path)
+    pending = []
+    skipped = []
+    for name, payload in payloads.items():
+        path = os.path.join(out_dir, f"{name}.png")
+        digest = aggregate_hash(name, payload, dpi)
+        if not force and cache.get(name) == digest and os.path.exists(path):
+            skipped.append(name)
+        else:
+            pending.append((name, path, digest))
+
+    with instrument.step("render"):
+        if pending and (workers == 1 or len(pending) == 1):
+            _init_worker()
+            for name, path, _ in pending:
+                _render(name, aggregates[name], path, dpi)
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_render, name, aggregates[name], path, dpi)
+                    for name, path, _ in pending
+                ]
+                for future in futures:
+                    future.result()
+
+    for name, _, digest in pending:
+        cache[name] = digest
+    with open(cache_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    return {"written": [name for name, _, _ in pending], "skipped": skipped}
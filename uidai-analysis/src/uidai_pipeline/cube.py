@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import instrument, store
+
+# Enrolment counts as a dense rows x months array instead of a long table.
+# A cube row is one (state, district, pincode) combination; rows are sorted
+# by state, district and pincode, and every row carries the integer code of
+# its pincode, district and state, so rollups, shares and pivots are a
+# bincount over codes rather than a groupby and merge. `present` marks the
+# cells that had at least one record, which is what pandas pivots treat as
+# observed. The cube is saved as one .npy file per array so other stages,
+# or a long-running process, can memory-map a single copy; meta.json is
+# written last and carries a digest of the counts.
+
+CUBE_DIR = os.path.join(store.DATA_DIR, "enrolment_cube")
+META_NAME = "meta.json"
+META_PATH = os.path.join(CUBE_DIR, META_NAME)
+ARRAYS = [
+    "months", "pincodes", "districts", "states",
+    "pincode_code", "district_code", "state_code", "district_state",
+    "counts", "present",
+]
+LEVELS = {"pincode": "pincode_code", "district": "district_code", "state": "state_code"}
+LABELS = {"pincode": "pincodes", "district": "districts", "state": "states"}
+
+
+def _factorize(values):
+    # Sorted labels and the code of each value; categoricals are coded
+    # through their category table instead of hashing every string. A
+    # missing label (categorical code -1) has no cube row to go to, so it
+    # fails here rather than landing on the last label.
+    if values.isna().any():
+        raise ValueError(f"{int(values.isna().sum())} rows have no {values.name}; the cube needs every label")
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        used, inverse = np.unique(values.cat.codes.to_numpy(), return_inverse=True)
+        labels = np.asarray(values.cat.categories[used], dtype=str)
+        order = np.argsort(labels, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return labels[order], rank[inverse]
+    labels, codes = np.unique(values.to_numpy(), return_inverse=True)
+    # String labels as a fixed-width array, so the saved cube can be mapped.
+    return (labels.astype(str) if labels.dtype == object else labels), codes
+
+
+def from_frame(df, value="total_enrolments"):
+    # The cube of df[value] plus, for every row of df, its cube row and
+    # month column.
+    months, columns = _factorize(df["month"])
+    pincodes, pincode_code = _factorize(df["pincode"])
+    districts, district_code = _factorize(df["district"])
+    states, state_code = _factorize(df["state"])
+
+    keys = (state_code.astype(np.int64) * len(districts) + district_code) * len(pincodes) + pincode_code
+    row_keys, rows = np.unique(keys, return_inverse=True)
+    rest, row_pincode = np.divmod(row_keys, len(pincodes))
+    row_state, row_district = np.divmod(rest, len(districts))
+    first = np.unique(row_district, return_index=True)[1]
+
+    shape = (len(row_keys), len(months))
+    flat = rows * len(months) + columns
+    counts = np.bincount(flat, weights=df[value].to_numpy(np.float64), minlength=shape[0] * shape[1])
+    present = np.bincount(flat, minlength=shape[0] * shape[1]) > 0
+    cube = {
+        "value": value,
+        "months": months.astype("datetime64[D]"),
+        "pincodes": pincodes.astype(np.int32),
+        "districts": districts,
+        "states": states,
+        "pincode_code": row_pincode.astype(np.int32),
+        "district_code": row_district.astype(np.int32),
+        "state_code": row_state.astype(np.int32),
+        # A district's state is that of its first row; rollups always go
+        # through the per-row codes, so a pincode filed under a district of
+        # another state still counts towards its own state.
+        "district_state": row_state[first].astype(np.int32),
+        "counts": np.rint(counts).astype(np.int64).reshape(shape),
+        "present": present.reshape(shape),
+    }
+    return cube, rows, columns
+
+
+def build(df, value="total_enrolments"):
+    return from_frame(df, value)[0]
+
+
+def digest(cube):
+    hashed = hashlib.sha256()
+    for name in ARRAYS:
+        hashed.update(np.ascontiguousarray(cube[name]).tobytes())
+    return hashed.hexdigest()
+
+
+def save(cube, path=CUBE_DIR):
+    # Written to a sibling directory and swapped in, so a reader never sees
+    # half a cube; processes that have the old arrays mapped keep them.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    stale = f"{path}.{os.getpid()}.old"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for name in ARRAYS:
+        np.save(os.path.join(temporary, f"{name}.npy"), cube[name])
+    with open(os.path.join(temporary, META_NAME), "w") as f:
+        json.dump({
+            "value": cube["value"],
+            "shape": list(cube["counts"].shape),
+            "months": [str(month) for month in cube["months"]],
+            "pincodes": len(cube["pincodes"]),
+            "districts": len(cube["districts"]),
+            "states": len(cube["states"]),
+            "digest": digest(cube),
+        }, f, indent=2)
+    if os.path.exists(path):
+        os.replace(path, stale)
+    os.replace(temporary, path)
+    shutil.rmtree(stale, ignore_errors=True)
+
+
+def load(path=CUBE_DIR, mmap=True):
+    meta_path = os.path.join(path, META_NAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with instrument.step("cube_load"):
+        cube = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+    cube["value"] = meta["value"]
+    return cube
+
+
+def _group(cube, levels):
+    # Group code of every cube row and the label arrays of the groups; a
+    # single level groups by its own codes, several by their observed
+    # combinations.
+    if isinstance(levels, str):
+        return cube[LEVELS[levels]], pd.Index(cube[LABELS[levels]], name=levels)
+    combined = np.zeros(len(cube["counts"]), dtype=np.int64)
+    for level in levels:
+        combined = combined * len(cube[LABELS[level]]) + cube[LEVELS[level]]
+    keys, codes = np.unique(combined, return_inverse=True)
+    labels = []
+    for level in reversed(levels):
+        keys, code = np.divmod(keys, len(cube[LABELS[level]]))
+        labels.append(cube[LABELS[level]][code])
+    return codes, pd.MultiIndex.from_arrays(labels[::-1], names=list(levels))
+
+
+def _sum(codes, size, values):
+    months = values.shape[1]
+    flat = (np.asarray(codes, dtype=np.int64)[:, None] * months + np.arange(months)).ravel()
+    sums = np.bincount(flat, weights=np.asarray(values, dtype=np.float64).ravel(), minlength=size * months)
+    return sums.reshape(size, months)
+
+
+def rollup(cube, levels):
+    # Group x month totals and the number of present cells behind each.
+    codes, index = _group(cube, levels)
+    totals = np.rint(_sum(codes, len(index), cube["counts"])).astype(np.int64)
+    cells = np.rint(_sum(codes, len(index), cube["present"])).astype(np.int64)
+    return index, totals, cells
+
+
+def month_index(cube):
+    return pd.DatetimeIndex(np.asarray(cube["months"]), name="month")
+
+
+def monthly(cube):
+    return pd.Series(np.asarray(cube["counts"]).sum(axis=0), index=month_index(cube), name=cube["value"])
+
+
+def totals(cube, levels):
+    index, sums, cells = rollup(cube, levels)
+    observed = cells.sum(axis=1) > 0
+    return pd.Series(sums.sum(axis=1)[observed], index=index[observed], name=cube["value"])
+
+
+def row_counts(cube, levels):
+    # Cells with a record per group; value_counts on the long table gives
+    # the same when there is one record per pincode and month.
+    index, _, cells = rollup(cube, levels)
+    observed = cells.sum(axis=1) > 0
+    return pd.Series(cells.sum(axis=1)[observed], index=index[observed], name="count")
+
+
+def pivot(cube, levels):
+    # Group x month table; NaN where no row of the group has a record that
+    # month, and groups without any record dropped, as in pivot_table.
+    index, sums, cells = rollup(cube, levels)
+    observed = cells.sum(axis=1) > 0
+    table = np.where(cells > 0, sums, np.nan)[observed]
+    return pd.DataFrame(table, index=index[observed], columns=month_index(cube))
+
+
+def expand(cube, levels):
+    # Each cube cell's group total at `levels`, in the cube's rows x months
+    # shape.
+    codes, index = _group(cube, levels)
+    return _sum(codes, len(index), cube["counts"])[codes]
+
+
+def pincode_months(cube, pincodes=None):
+    # Pincode x calendar month totals, for the forecasts and hotspots:
+    # columns run from the first month to the last, NaN in months without
+    # any record and before a pincode's first record, and zero in a covered
+    # month a started pincode has no record for. Rows are the sorted
+    # pincodes, or those of them in `pincodes`.
+    labels = np.asarray(cube["pincodes"])
+    sums = _sum(cube["pincode_code"], len(labels), cube["counts"])
+    cells = _sum(cube["pincode_code"], len(labels), cube["present"]) > 0
+    if pincodes is not None:
+        keep = np.isin(labels, pincodes)
+        labels, sums, cells = labels[keep], sums[keep], cells[keep]
+    observed = month_index(cube)
+    columns = ((observed.year - observed[0].year) * 12 + observed.month - observed[0].month).to_numpy()
+    months = pd.date_range(observed[0], periods=int(columns[-1]) + 1, freq="MS") if len(columns) else observed
+    matrix = np.full((len(labels), len(months)), np.nan)
+    matrix[:, columns] = sums
+    starts = columns[np.argmax(cells, axis=1)] if len(columns) else np.zeros(len(labels), dtype=np.int64)
+    started = np.arange(len(months))[None, :] >= starts[:, None]
+    return labels, months, np.where(started, matrix, np.nan)
+
+
+def hierarchy(cube):
+    return pd.DataFrame({
+        "pincode": cube["pincodes"][cube["pincode_code"]],
+        "district": cube["districts"][cube["district_code"]],
+        "state": cube["states"][cube["state_code"]],
+    })
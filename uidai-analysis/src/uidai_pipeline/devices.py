@@ -0,0 +1,144 @@
+import os
+import statistics
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import instrument, paths
+
+# Device performance from the raw authentication-transaction logs, one row
+# per transaction, instead of the pre-aggregated monthly summary UIDAI
+# publishes. The log is read in chunks; each chunk is folded into success,
+# failure and biometric-failure counts per (day, state, device) and the
+# partials are re-folded as they grow, as in ingest.stream_monthly, so
+# memory follows the number of groups and not the log size. Days are
+# grouped on the timestamp's date text and parsed once per group.
+#
+# Failure rates carry Wilson score intervals, which stay inside [0, 100]
+# and behave for the small day x state groups. They treat transactions as
+# independent; retries from the same resident make real intervals wider.
+
+LOG_DTYPES = {
+    "timestamp": "str",
+    "state": "category",
+    "deviceproviderid": "category",
+    "modelid": "category",
+    "dev_level": "category",
+    "auth_result": "category",
+    "error_type": "category",
+}
+SUCCESS = "Y"
+BIO_ERROR = "bio"
+
+DEVICE = ["deviceproviderid", "modelid", "dev_level"]
+DAILY_KEYS = ["date", "state"] + DEVICE
+MONTHLY_KEYS = ["month"] + DEVICE
+COUNTS = ["total_trans", "success_trans", "failed_trans", "bio_failure"]
+
+# Column order of the published "Top 10 Aadhaar Biometric Device
+# Performance" file, which the dashboard's device page was built on.
+PUBLISHED_COLUMNS = [
+    "Month", "deviceproviderid", "modelid", "dev_level",
+    "total_trans", "success_trans", "success_perc", "failed_trans", "failed_perc",
+    "bio_failure", "bio_failure_perc",
+]
+PUBLISHED_PATH = os.path.join(paths.OUTPUT_DIR, "device_performance_top.csv")
+
+
+def _fold(partials, keys):
+    with instrument.step("groupby"):
+        return pd.concat(partials, ignore_index=True).groupby(keys, as_index=False, sort=False, observed=True)[
+            COUNTS
+        ].sum()
+
+
+def _chunk_counts(chunk):
+    failed = chunk["auth_result"] != SUCCESS
+    counts = pd.DataFrame({
+        "date": chunk["timestamp"].str.slice(0, 10),
+        "state": chunk["state"],
+        "deviceproviderid": chunk["deviceproviderid"],
+        "modelid": chunk["modelid"],
+        "dev_level": chunk["dev_level"],
+        "total_trans": np.ones(len(chunk), dtype=np.int64),
+        "success_trans": (~failed).to_numpy(np.int64),
+        "failed_trans": failed.to_numpy(np.int64),
+        "bio_failure": (failed & (chunk["error_type"] == BIO_ERROR)).to_numpy(np.int64),
+    })
+    return _fold([counts], DAILY_KEYS)
+
+
+def stream_daily(path=None, chunksize=1_000_000):
+    # (day, state, device) counts of every transaction in the log.
+    path = path or paths.RAW_DEVICE_LOGS
+    name = os.path.basename(path)
+    reader = pd.read_csv(path, usecols=list(LOG_DTYPES), dtype=LOG_DTYPES, chunksize=chunksize)
+    partials = []
+    pending = 0
+    folded = 0
+    chunks = iter(reader)
+    while True:
+        with instrument.step("read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        instrument.rows_in(name, len(chunk))
+        part = _chunk_counts(chunk)
+        partials.append(part)
+        pending += len(part)
+        if len(partials) > 1 and pending > max(chunksize, 2 * folded):
+            partials = [_fold(partials, DAILY_KEYS)]
+            folded = pending = len(partials[0])
+
+    if not partials:
+        return pd.DataFrame(columns=DAILY_KEYS + COUNTS)
+    daily_df = _fold(partials, DAILY_KEYS)
+    with instrument.step("parse_dates"):
+        daily_df["date"] = pd.to_datetime(daily_df["date"], format="%Y-%m-%d")
+    for column in DAILY_KEYS[1:]:
+        daily_df[column] = daily_df[column].astype("category")
+    return daily_df.sort_values(DAILY_KEYS, ignore_index=True)
+
+
+def wilson(events, trials, confidence=0.95):
+    # Wilson score interval for events / trials, in percent.
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    trials = np.asarray(trials, dtype=np.float64)
+    safe = np.maximum(trials, 1)
+    rate = np.asarray(events, dtype=np.float64) / safe
+    denominator = 1 + z * z / safe
+    centre = (rate + z * z / (2 * safe)) / denominator
+    half = z * np.sqrt(rate * (1 - rate) / safe + z * z / (4 * safe * safe)) / denominator
+    low = np.where(trials > 0, centre - half, np.nan)
+    high = np.where(trials > 0, centre + half, np.nan)
+    return np.clip(low, 0, 1) * 100, np.clip(high, 0, 1) * 100
+
+
+def add_rates(df, confidence=0.95):
+    total = df["total_trans"].to_numpy(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for column, rate in (("success_trans", "success_perc"), ("failed_trans", "failed_perc"),
+                             ("bio_failure", "bio_failure_perc")):
+            df[rate] = df[column].to_numpy(np.float64) / total * 100
+    df["failed_ci_low"], df["failed_ci_high"] = wilson(df["failed_trans"], total, confidence)
+    df["bio_ci_low"], df["bio_ci_high"] = wilson(df["bio_failure"], total, confidence)
+    return df
+
+
+def monthly(daily_df, confidence=0.95):
+    # Device x month counts across all states, with rates and intervals.
+    monthly_df = daily_df.assign(month=daily_df["date"].dt.to_period("M").dt.to_timestamp())
+    with instrument.step("groupby"):
+        monthly_df = monthly_df.groupby(MONTHLY_KEYS, as_index=False, observed=True)[COUNTS].sum()
+    return add_rates(monthly_df, confidence)
+
+
+def published(monthly_df, top=10):
+    # The `top` devices by transactions each month, in the published file's
+    # columns: "Apr-25" months and percentages to two decimals.
+    ranked = monthly_df.sort_values(["month", "total_trans"], ascending=[True, False])
+    table = ranked.groupby("month", sort=False).head(top).copy()
+    table["Month"] = table["month"].dt.strftime("%b-%y")
+    for column in ["success_perc", "failed_perc", "bio_failure_perc"]:
+        table[column] = table[column].round(2)
+    return table[PUBLISHED_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import flags, ingest, instrument, store, updates
+from uidai_pipeline.paths import EXPORT_DIR
+
+# Dashboard views are written as small gzipped, column-oriented JSON files
+# whose names carry a hash of their content, so the web server can let
+# browsers cache them forever. manifest.json is the only file that has to be
+# revalidated: it maps each view (and, for pincode-level views, each state
+# partition) to its current file. Files with unchanged content keep their
+# name across pipeline runs. Files listed by neither the new manifest nor
+# the one it replaces are removed, so a page still holding the previous
+# manifest can fetch its files until the export after next.
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+FLAGGED_TOP = 200
+HASH_LENGTH = 12
+
+
+def slug(value):
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-") or "unknown"
+
+
+def _column(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime("%Y-%m").tolist()
+    if pd.api.types.is_float_dtype(values):
+        rounded = values.replace([np.inf, -np.inf], np.nan).round(2)
+        return [None if pd.isna(value) else value for value in rounded.tolist()]
+    if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values.tolist()
+    return [None if pd.isna(value) else str(value) for value in values.tolist()]
+
+
+def encode(df):
+    table = {
+        "columns": list(df.columns),
+        "rows": len(df),
+        "data": [_column(df[column]) for column in df.columns],
+    }
+    return json.dumps(table, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def write_view(out_dir, stem, df):
+    payload = encode(df)
+    digest = hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]
+    name = f"{stem}.{digest}.json.gz"
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # mtime=0 keeps the compressed bytes identical across runs.
+        with open(path, "wb") as f:
+            f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+    return {"file": name, "rows": len(df), "bytes": os.path.getsize(path), "raw_bytes": len(payload)}
+
+
+def write_partitioned(out_dir, name, df, key="state"):
+    partitions = {}
+    for value, part in df.groupby(key, observed=True, sort=True):
+        entry = write_view(out_dir, f"{name}/{slug(value)}", part.drop(columns=key))
+        partitions[str(value)] = entry
+    return {"partitioned_by": key, "partitions": partitions}
+
+
+def _month_totals(df, value, extra=()):
+    aggregations = {column: "sum" for column in list(extra) + [value]}
+    aggregations["pincode"] = "nunique"
+    totals = df.groupby("month").agg(aggregations).rename(columns={"pincode": "pincodes"})
+    previous = totals[value].shift(1)
+    totals["mom_growth"] = ((totals[value] / previous - 1) * 100).where(previous > 0, 0)
+    return totals.reset_index()
+
+
+def _area_totals(df, keys, value, extra=()):
+    aggregations = {column: "sum" for column in list(extra) + [value]}
+    aggregations["pincode"] = "nunique"
+    if "district" not in keys:
+        aggregations["district"] = "nunique"
+    totals = (
+        df.groupby(keys, observed=True)
+        .agg(aggregations)
+        .rename(columns={"pincode": "pincodes", "district": "districts"})
+        .reset_index()
+    )
+    return totals.sort_values(value, ascending=False)
+
+
+def enrolment_views(out_dir):
+    features_df = store.read("enrolment_features", columns=["month", "state", "district", "pincode", "total_enrolments"])
+    flagged_df = store.read("flagged_records")[flags.FLAGGED_COLUMNS]
+    flagged_df = flagged_df.sort_values("total_enrolments", ascending=False)
+
+    summary = pd.DataFrame([{
+        "total_enrolments": int(features_df["total_enrolments"].sum()),
+        "months": int(features_df["month"].nunique()),
+        "states": int(features_df["state"].nunique()),
+        "districts": int(features_df["district"].nunique()),
+        "pincodes": int(features_df["pincode"].nunique()),
+        "flagged_records": len(flagged_df),
+        "flagged_pincodes": int(flagged_df["pincode"].nunique()),
+        "high_risk_records": int((flagged_df["risk_level"] == "High").sum()),
+    }])
+    views = forecast_views(out_dir, features_df) if store.exists("enrolment_forecast") else {}
+    return {
+        **views,
+        "enrolment/summary": write_view(out_dir, "enrolment/summary", summary),
+        "enrolment/monthly_totals": write_view(
+            out_dir, "enrolment/monthly_totals", _month_totals(features_df, "total_enrolments")
+        ),
+        "enrolment/state_totals": write_view(
+            out_dir, "enrolment/state_totals", _area_totals(features_df, ["state"], "total_enrolments")
+        ),
+        "enrolment/flagged_top": write_view(out_dir, "enrolment/flagged_top", flagged_df.head(FLAGGED_TOP)),
+        "enrolment/flagged": write_partitioned(out_dir, "enrolment/flagged", flagged_df),
+    }
+
+
+def forecast_views(out_dir, features_df):
+    forecast_df = store.read("enrolment_forecast")
+    accuracy_df = store.read("forecast_accuracy", filters=[("selected", "==", True)])
+    districts_df = store.read("forecast_district_accuracy", filters=[("model", "==", "selected")])
+
+    history = features_df.groupby("month")["total_enrolments"].sum().rename("actual")
+    future = forecast_df.groupby("month")["forecast"].sum()
+    totals = pd.concat([history, future], axis=1).rename_axis("month").reset_index()
+
+    latest = features_df.sort_values("month").groupby("pincode")["total_enrolments"].last().rename("last_actual")
+    wide = forecast_df.pivot(index="pincode", columns="horizon", values="forecast")
+    wide.columns = [f"forecast_h{horizon}" for horizon in wide.columns]
+    pincodes = (
+        forecast_df[forecast_df["horizon"] == 1][["pincode", "state", "district", "model"]]
+        .merge(wide.reset_index(), on="pincode")
+        .merge(latest.reset_index(), on="pincode", how="left")
+        .merge(accuracy_df[["pincode", "mae", "mape"]], on="pincode", how="left")
+    )
+    previous = pincodes["last_actual"].where(pincodes["last_actual"] > 0)
+    pincodes["growth_pct"] = (pincodes["forecast_h1"] / previous - 1) * 100
+    pincodes = pincodes.sort_values("forecast_h1", ascending=False)
+
+    return {
+        "enrolment/forecast_totals": write_view(out_dir, "enrolment/forecast_totals", totals),
+        "enrolment/forecast_top": write_view(out_dir, "enrolment/forecast_top", pincodes.head(FLAGGED_TOP)),
+        "enrolment/forecast_districts": write_view(
+            out_dir, "enrolment/forecast_districts",
+            districts_df[["state", "district", "pincodes", "mae", "mape"]].sort_values("mae", ascending=False),
+        ),
+    }
+
+
+def record_stats(cleaned_df, counts):
+    # Per pincode-month counts of daily records that look like capture
+    # problems: far below the average record, empty, or with one age band
+    # empty while the other is not.
+    totals = cleaned_df[updates.VALUE]
+    low_threshold = totals.mean() * 0.1 if len(totals) else 0
+    one_band_empty = (cleaned_df[counts] == 0).sum(axis=1).between(1, len(counts) - 1)
+    stats = cleaned_df.assign(
+        month=cleaned_df["date"].dt.to_period("M").dt.to_timestamp(),
+        records=1,
+        low_records=(totals < low_threshold).astype("int32"),
+        zero_records=(totals == 0).astype("int32"),
+        split_records=one_band_empty.astype("int32"),
+    )
+    return stats.groupby(["month", "pincode"], as_index=False).agg({
+        "records": "sum", "low_records": "sum", "zero_records": "sum", "split_records": "sum"
+    })
+
+
+def update_views(out_dir, dataset):
+    counts = ingest.UPDATE_DATASETS[dataset]["counts"]
+    value = updates.VALUE
+    features_df = store.read(f"{dataset}_features")
+    cleaned_df = store.read(f"{dataset}_cleaned", columns=["date", "pincode"] + counts + [value])
+    summary_df = store.read(f"{dataset}_pincode_summary")
+    flagged_df = store.read(f"{dataset}_flagged").sort_values(value, ascending=False)
+
+    pincode_monthly = features_df[["month", "state", "district", "pincode"] + counts + [value]].merge(
+        record_stats(cleaned_df, counts), on=["month", "pincode"], how="left"
+    )
+
+    summary = pd.DataFrame([{
+        **{column: int(features_df[column].sum()) for column in counts + [value]},
+        "records": len(cleaned_df),
+        "months": int(features_df["month"].nunique()),
+        "states": int(features_df["state"].nunique()),
+        "districts": int(features_df["district"].nunique()),
+        "pincodes": int(features_df["pincode"].nunique()),
+        "flagged_records": len(flagged_df),
+        "flagged_pincodes": int(flagged_df["pincode"].nunique()),
+    }])
+    return {
+        f"{dataset}/summary": write_view(out_dir, f"{dataset}/summary", summary),
+        f"{dataset}/monthly_totals": write_view(
+            out_dir, f"{dataset}/monthly_totals", _month_totals(features_df, value, counts)
+        ),
+        f"{dataset}/state_totals": write_view(
+            out_dir, f"{dataset}/state_totals", _area_totals(features_df, ["state"], value, counts)
+        ),
+        f"{dataset}/district_totals": write_view(
+            out_dir, f"{dataset}/district_totals", _area_totals(features_df, ["state", "district"], value, counts)
+        ),
+        f"{dataset}/pincode_summary": write_partitioned(out_dir, f"{dataset}/pincode_summary", summary_df),
+        f"{dataset}/pincode_monthly": write_partitioned(out_dir, f"{dataset}/pincode_monthly", pincode_monthly),
+        f"{dataset}/flagged": write_partitioned(out_dir, f"{dataset}/flagged", flagged_df),
+    }
+
+
+def _files(views):
+    for entry in views.values():
+        for part in entry.get("partitions", {"": entry}).values():
+            yield part["file"]
+
+
+def prune(out_dir, keep):
+    removed = 0
+    for root, _, names in os.walk(out_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, out_dir).replace(os.sep, "/")
+            if name.endswith(".json.gz") and relative not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def export_all(out_dir=EXPORT_DIR, datasets=("biometric", "demographic")):
+    os.makedirs(out_dir, exist_ok=True)
+    with instrument.step("export"):
+        views = enrolment_views(out_dir)
+        for dataset in datasets:
+            if store.exists(f"{dataset}_features"):
+                views.update(update_views(out_dir, dataset))
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f).get("views", {})
+    manifest = {"version": FORMAT_VERSION, "views": views}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    removed = prune(out_dir, set(_files(views)) | set(_files(previous)))
+    return manifest, removed
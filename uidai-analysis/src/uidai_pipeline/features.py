@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import cube, instrument, kernels
+
+KEYS = ["month", "state", "district", "pincode"]
+WINDOW_COLUMNS = ["enrolments_mom_growth", "rolling_3m_avg"]
+SHARE_COLUMNS = ["enrolment_share_district", "enrolment_share_state"]
+FEATURE_COLUMNS = KEYS + ["total_enrolments"] + WINDOW_COLUMNS + SHARE_COLUMNS
+
+
+def add_window_features(features_df, value="total_enrolments", growth_column="enrolments_mom_growth"):
+    features_df = features_df.sort_values(["pincode", "month"]).reset_index(drop=True)
+    totals = features_df[value].to_numpy()
+    starts = kernels.group_starts(features_df["pincode"].to_numpy())
+
+    with instrument.step("window"):
+        growth = kernels.pct_change(totals, starts)
+        features_df[growth_column] = np.where(np.isnan(growth), 0, growth) * 100
+
+        features_df["rolling_3m_avg"] = kernels.rolling_mean(totals, starts, window=3, min_periods=1)
+    return features_df
+
+
+def add_share_features(features_df, value="total_enrolments", prefix="enrolment_share"):
+    with instrument.step("cube"):
+        enrolment_cube, rows, columns = cube.from_frame(features_df, value)
+
+    values = features_df[value].to_numpy(np.float64)
+    with instrument.step("shares"):
+        # District names repeat across states, so districts are (state, district).
+        for level, levels in (("district", ["state", "district"]), ("state", "state")):
+            totals = cube.expand(enrolment_cube, levels)[rows, columns]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                features_df[f"{prefix}_{level}"] = np.where(totals != 0, values / totals * 100, 0.0)
+    return features_df
+
+
+def build_features(monthly_df):
+    features_df = add_window_features(monthly_df.copy())
+    features_df = add_share_features(features_df)
+    return features_df[FEATURE_COLUMNS]
+
+
+def update_features(features_df, pincode_rows, month_rows):
+    # A changed (month, pincode) cell moves the growth and rolling window of
+    # every later month of that pincode, and the district/state shares of
+    # every pincode in that month. pincode_rows holds the full monthly series
+    # of the changed pincodes, month_rows every pincode in the changed months;
+    # all other cells keep their stored features.
+    pincodes = pincode_rows["pincode"].unique()
+    months = month_rows["month"].unique()
+
+    windows = add_window_features(pincode_rows.copy())[KEYS + WINDOW_COLUMNS]
+    shares = add_share_features(month_rows.copy())[KEYS + SHARE_COLUMNS]
+
+    changed_pincode = features_df["pincode"].isin(pincodes)
+    changed_month = features_df["month"].isin(months)
+    windows = pd.concat(
+        [windows, features_df.loc[changed_month & ~changed_pincode, KEYS + WINDOW_COLUMNS]]
+    )
+    shares = pd.concat(
+        [shares, features_df.loc[changed_pincode & ~changed_month, KEYS + SHARE_COLUMNS]]
+    )
+
+    cells = (
+        pd.concat([pincode_rows, month_rows])
+        .drop_duplicates(KEYS)[KEYS + ["total_enrolments"]]
+    )
+    cells = _with_plain_keys(cells)
+    with instrument.step("merge"):
+        cells = cells.merge(_with_plain_keys(windows), on=KEYS, how="left")
+        cells = cells.merge(_with_plain_keys(shares), on=KEYS, how="left")
+
+    unchanged = _with_plain_keys(features_df[~changed_pincode & ~changed_month])
+    updated = pd.concat([unchanged, cells[FEATURE_COLUMNS]], ignore_index=True)
+    updated = updated.sort_values(["pincode", "month"]).reset_index(drop=True)
+    return updated, cells[FEATURE_COLUMNS]
+
+
+def _with_plain_keys(df):
+    # Categorical keys from different reads carry different category sets;
+    # plain strings keep merges and concatenation well defined.
+    return df.astype({"state": str, "district": str})
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import join, kernels, online
+
+ISO_FEATURES = [
+    "total_enrolments", "enrolments_mom_growth",
+    "rolling_3m_avg", "enrolment_share_state"
+]
+
+FLAGGED_COLUMNS = [
+    "month", "state", "district", "pincode", "total_enrolments",
+    "enrolments_mom_growth", "demand_level", "risk_level", "flag_reason"
+]
+
+
+def pincode_demand(features_df):
+    high_demand = features_df.groupby("pincode").agg({
+        "total_enrolments": ["mean", "sum", "count"],
+        "enrolments_mom_growth": "mean"
+    }).reset_index()
+
+    high_demand.columns = ["pincode", "avg_enrolments", "total_enrolments", "num_months", "avg_growth"]
+    return high_demand
+
+
+def forecast_errors(features_df):
+    # Last-three-months average as the forecast of each month.
+    forecast_df = features_df.sort_values(["pincode", "month"]).reset_index(drop=True)
+    forecast_df["forecast_3m"] = kernels.shifted_rolling_mean(
+        forecast_df["total_enrolments"].to_numpy(),
+        kernels.group_starts(forecast_df["pincode"].to_numpy()),
+        window=3,
+        min_periods=1,
+    )
+    forecast_df["forecast_error"] = forecast_df["total_enrolments"] - forecast_df["forecast_3m"]
+    forecast_df["forecast_error_pct"] = (
+        (forecast_df["forecast_error"] / forecast_df["forecast_3m"] * 100)
+        .fillna(0)
+        .replace([np.inf, -np.inf], 0)
+    )
+    return forecast_df
+
+
+def per_pincode(features_df, zscore_decay=None):
+    # Everything 05_ml_analysis.py derives from a pincode's own months:
+    # forecast errors, running z-score statistics and the z-scores against
+    # them, and the demand summary the tertiles are cut from.
+    zscore_stats, _ = online.update(online.empty(decay=zscore_decay), features_df)
+    zscores_df = features_df.copy()
+    zscores_df["z_score_enrolments"] = np.abs(online.zscores(zscore_stats, zscores_df, "total_enrolments"))
+    zscores_df["z_score_growth"] = np.abs(online.zscores(zscore_stats, zscores_df, "enrolments_mom_growth"))
+    return {
+        "forecast": forecast_errors(features_df),
+        "zscores": zscores_df,
+        "zscore_stats": zscore_stats,
+        "demand": pincode_demand(features_df),
+    }
+
+
+def assign_levels(high_demand, volume="avg_enrolments"):
+    high_demand = high_demand[high_demand["num_months"] >= 2]
+    high_demand = high_demand.sort_values(volume, ascending=False)
+
+    high_demand["demand_level"] = pd.qcut(
+        high_demand[volume],
+        q=3,
+        labels=["Low", "Medium", "High"],
+        duplicates="drop"
+    )
+
+    high_demand["risk_level"] = "Normal"
+    high_demand.loc[
+        (high_demand["avg_growth"] > 50) | (high_demand["avg_growth"] < -30),
+        "risk_level"
+    ] = "High"
+    high_demand.loc[
+        (high_demand["avg_growth"] > 25) & (high_demand["avg_growth"] <= 50),
+        "risk_level"
+    ] = "Medium"
+    return high_demand
+
+
+def compose_flags(features_df, iso_df, high_demand, sort_by="total_enrolments"):
+    anomalies = join.lookup_values(features_df, iso_df[["month", "pincode", "anomaly_flag"]])
+    final_flags = features_df.assign(anomaly_flag=anomalies["anomaly_flag"]).fillna(0)
+
+    final_flags = final_flags.merge(
+        high_demand[["pincode", "demand_level", "risk_level"]],
+        on="pincode",
+        how="left"
+    )
+
+    final_flags["flag_reason"] = ""
+    final_flags.loc[final_flags["anomaly_flag"] == 1, "flag_reason"] = "Isolation Forest Anomaly"
+    final_flags.loc[final_flags["risk_level"] == "High", "flag_reason"] += " | High-Risk Growth"
+    final_flags.loc[final_flags["demand_level"] == "High", "flag_reason"] += " | High-Demand Area"
+
+    flagged_records = final_flags[
+        (final_flags["anomaly_flag"] == 1) |
+        (final_flags["risk_level"] == "High") |
+        (final_flags["demand_level"] == "High")
+    ].copy()
+
+    return flagged_records.sort_values(sort_by, ascending=False)
+
+
+def summarize(flagged_records):
+    return {
+        "flagged_records": len(flagged_records),
+        "flagged_pincodes": int(flagged_records["pincode"].nunique()),
+        "demand_levels": {
+            str(level): int(count)
+            for level, count in flagged_records["demand_level"].value_counts().items() if count > 0
+        },
+        "risk_levels": {
+            str(level): int(count)
+            for level, count in flagged_records["risk_level"].value_counts().items() if count > 0
+        },
+    }
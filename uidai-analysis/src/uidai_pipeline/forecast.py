@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import instrument
+
+# Every pincode is forecast at once from the enrolment cube's pincode x
+# month matrix (cube.pincode_months): each model walks the month columns and
+# updates all pincodes in one vectorized step, so the cost grows with the
+# number of months, not the number of series. Months that a pincode has not
+# started yet, and months missing from the data altogether, are NaN; a
+# covered month without a record for a pincode that has started is a
+# zero. Smoothing parameters are picked per pincode from a small grid by
+# in-sample one-step error, and the rolling-origin backtest refits every
+# model on each prefix of the months.
+
+MODELS = ["mean3", "ses", "holt", "snaive_drift"]
+DEFAULT_MODEL = "ses"
+SES_ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+HOLT_ALPHAS = np.array([0.2, 0.5, 0.8])
+HOLT_BETAS = np.array([0.05, 0.2, 0.5])
+HOLT_DAMPING = 0.9
+SEASON = 12
+
+
+def last_observed(matrix):
+    # Last non-NaN value and its column per row (NaN / -1 for empty rows).
+    observed = ~np.isnan(matrix)
+    last = matrix.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    has = observed.any(axis=1)
+    values = np.where(has, matrix[np.arange(len(matrix)), last], np.nan)
+    return values, np.where(has, last, -1)
+
+
+def first_observed(matrix):
+    observed = ~np.isnan(matrix)
+    first = np.argmax(observed, axis=1)
+    has = observed.any(axis=1)
+    return np.where(has, matrix[np.arange(len(matrix)), first], np.nan), np.where(has, first, -1)
+
+
+def _pick(candidates, sse):
+    # candidates and sse are (grid, pincodes); the first grid point wins ties.
+    best = np.argmin(sse, axis=0)
+    return candidates[best, np.arange(candidates.shape[1])]
+
+
+def forecast_mean3(matrix, horizon):
+    # The 3-month rolling mean 05_ml_analysis.py reports, as a baseline.
+    recent = matrix[:, -3:]
+    count = (~np.isnan(recent)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, np.nansum(recent, axis=1) / count, last_observed(matrix)[0])
+    return np.repeat(mean[:, None], horizon, axis=1)
+
+
+def forecast_ses(matrix, horizon):
+    alphas = SES_ALPHAS[:, None]
+    level = np.full((len(alphas), len(matrix)), np.nan)
+    sse = np.zeros_like(level)
+    for t in range(matrix.shape[1]):
+        y = matrix[:, t]
+        observed = ~np.isnan(y)
+        started = ~np.isnan(level)
+        error = np.where(observed & started, y - level, 0.0)
+        sse += error * error
+        level = np.where(started, level + alphas * error, np.where(observed, y, np.nan))
+    return np.repeat(_pick(level, sse)[:, None], horizon, axis=1)
+
+
+def forecast_holt(matrix, horizon):
+    # Damped additive trend in error-correction form; a missing month moves
+    # the level along the damped trend without correcting it.
+    alphas = np.repeat(HOLT_ALPHAS, len(HOLT_BETAS))[:, None]
+    betas = np.tile(HOLT_BETAS, len(HOLT_ALPHAS))[:, None]
+    level = np.full((len(alphas), len(matrix)), np.nan)
+    trend = np.full_like(level, np.nan)
+    sse = np.zeros_like(level)
+    for t in range(matrix.shape[1]):
+        y = matrix[:, t]
+        observed = ~np.isnan(y)
+        started = ~np.isnan(level)
+        expected = level + HOLT_DAMPING * trend
+        error = np.where(observed & started, y - expected, 0.0)
+        sse += error * error
+        level = np.where(started, expected + alphas * error, np.where(observed, y, np.nan))
+        trend = np.where(started, HOLT_DAMPING * trend + alphas * betas * error, np.where(observed, 0.0, np.nan))
+    damping = np.cumsum(HOLT_DAMPING ** np.arange(1, horizon + 1))
+    return _pick(level, sse)[:, None] + _pick(trend, sse)[:, None] * damping[None, :]
+
+
+def forecast_snaive_drift(matrix, horizon, season=SEASON):
+    # Seasonal naive plus the average change per month since the first
+    # observation; with less than a season of history it is naive + drift.
+    last, last_column = last_observed(matrix)
+    first, first_column = first_observed(matrix)
+    span = last_column - first_column
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drift = np.where(span > 0, (last - first) / span, 0.0)
+    steps = np.arange(1, horizon + 1)
+    base = np.repeat(last[:, None], horizon, axis=1)
+    columns = matrix.shape[1]
+    if columns >= season:
+        lagged = columns - 1 + steps - season * ((steps - 1) // season + 1)
+        seasonal = matrix[:, lagged]
+        base = np.where(np.isnan(seasonal), base, seasonal)
+        drift_steps = steps
+    else:
+        drift_steps = steps + (columns - 1 - last_column)[:, None]
+    return base + drift[:, None] * drift_steps
+
+
+FORECASTERS = {
+    "mean3": forecast_mean3,
+    "ses": forecast_ses,
+    "holt": forecast_holt,
+    "snaive_drift": forecast_snaive_drift,
+}
+
+
+def predict(matrix, horizon, models=MODELS):
+    return {name: np.maximum(FORECASTERS[name](matrix, horizon), 0) for name in models}
+
+
+def backtest(matrix, horizon, min_train=3, models=MODELS):
+    # Rolling origin: for every origin from min_train months on, fit on the
+    # months before it and score the next `horizon` months that have data.
+    shape = (len(models), len(matrix))
+    abs_error, pct_error = np.zeros(shape), np.zeros(shape)
+    points, pct_points = np.zeros(shape), np.zeros(shape)
+    origins = range(min_train, matrix.shape[1])
+    with instrument.step("backtest"):
+        for origin in origins:
+            actual = matrix[:, origin:origin + horizon]
+            forecasts = predict(matrix[:, :origin], actual.shape[1], models)
+            for index, name in enumerate(models):
+                scored = ~np.isnan(actual) & ~np.isnan(forecasts[name])
+                error = np.where(scored, np.abs(forecasts[name] - actual), 0.0)
+                positive = scored & (actual > 0)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    pct = np.where(positive, error / actual * 100, 0.0)
+                abs_error[index] += error.sum(axis=1)
+                pct_error[index] += pct.sum(axis=1)
+                points[index] += scored.sum(axis=1)
+                pct_points[index] += positive.sum(axis=1)
+    return {
+        "abs_error": abs_error, "pct_error": pct_error,
+        "points": points, "pct_points": pct_points, "origins": len(origins),
+    }
+
+
+def select(scores, models=MODELS, default=DEFAULT_MODEL):
+    # Per pincode, the model with the lowest backtest MAE.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mae = np.where(scores["points"] > 0, scores["abs_error"] / scores["points"], np.inf)
+    best = np.argmin(mae, axis=0)
+    return np.where(np.isinf(mae.min(axis=0)), models.index(default), best)
+
+
+def accuracy_frame(pincodes, attributes, scores, chosen, models=MODELS):
+    frames = []
+    for index, name in enumerate(models):
+        frames.append(pd.DataFrame({
+            "pincode": pincodes,
+            "model": name,
+            "abs_error": scores["abs_error"][index],
+            "pct_error": scores["pct_error"][index],
+            "points": scores["points"][index].astype(np.int32),
+            "pct_points": scores["pct_points"][index].astype(np.int32),
+            "selected": chosen == index,
+        }))
+    accuracy = pd.concat(frames, ignore_index=True).merge(attributes, on="pincode", how="left")
+    return _rates(accuracy)
+
+
+def _rates(df):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df["mae"] = np.where(df["points"] > 0, df["abs_error"] / df["points"], np.nan)
+        df["mape"] = np.where(df["pct_points"] > 0, df["pct_error"] / df["pct_points"], np.nan)
+    return df
+
+
+def _totals(accuracy, keys):
+    return accuracy.groupby(keys, observed=True, sort=False).agg(
+        abs_error=("abs_error", "sum"),
+        pct_error=("pct_error", "sum"),
+        points=("points", "sum"),
+        pct_points=("pct_points", "sum"),
+        pincodes=("pincode", "nunique"),
+    ).reset_index()
+
+
+def district_accuracy(accuracy):
+    # Per district and model, plus model "selected" for the forecasts that
+    # were actually published.
+    per_model = _totals(accuracy, ["state", "district", "model"])
+    selected = _totals(accuracy[accuracy["selected"]], ["state", "district"]).assign(model="selected")
+    return _rates(pd.concat([per_model, selected], ignore_index=True))
+
+
+def model_accuracy(accuracy):
+    selected = _totals(accuracy[accuracy["selected"]].assign(model="selected"), ["model"])
+    return _rates(pd.concat([_totals(accuracy, ["model"]), selected], ignore_index=True)).set_index("model")
+
+
+def forecast_frame(pincodes, months, attributes, forecasts, chosen, models=MODELS):
+    horizon = next(iter(forecasts.values())).shape[1]
+    stacked = np.stack([forecasts[name] for name in models])
+    values = stacked[chosen, np.arange(len(pincodes))]
+    future = pd.date_range(months[-1], periods=horizon + 1, freq="MS")[1:]
+    frame = pd.DataFrame({
+        "pincode": np.repeat(pincodes, horizon).astype(np.int32),
+        "month": np.tile(future, len(pincodes)),
+        "horizon": np.tile(np.arange(1, horizon + 1, dtype=np.int32), len(pincodes)),
+        "forecast": values.reshape(-1),
+        "model": np.repeat(np.array(models)[chosen], horizon),
+    })
+    frame = frame.merge(attributes, on="pincode", how="left")
+    return frame[frame["forecast"].notna()]
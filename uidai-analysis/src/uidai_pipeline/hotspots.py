@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
+
+from uidai_pipeline import cube, instrument, online
+
+# Spatial hotspots of enrolment growth. Pincode centroids come from a local
+# lookup file (the India Post pincode directory has one row per post office
+# with its latitude and longitude; offices are averaged per pincode) and go
+# into a KD-tree on unit-sphere coordinates, where a great-circle radius is
+# a fixed chord length, so neighbour queries stay index-backed and exact.
+#
+# Each pincode's neighbourhood is every pincode within `radius_km`, plus its
+# `nearest` closest ones so that sparse rural pincodes are not left alone; the
+# pincode itself is included, as Getis-Ord Gi* requires. Gi* is computed
+# for every month at once, as a sparse product of the binary weights with
+# the pincode x month matrix of log growth, log((1 + this month) / (1 + the
+# last)), so months with zero enrolments stay finite; the counts are the
+# enrolment cube's pincode x month slice (cube.pincode_months). Flagged cells
+# that are within `radius_km` of each other form clusters, per month: the
+# connected components of the distance-band graph restricted to flagged
+# pincodes, numbered from the largest. The nearest-neighbour links are left
+# out of clustering, so two far-apart villages never join one cluster.
+#
+# Gi* p-values are per pincode, without a multiple-testing correction; read
+# them as a ranking of hot and cold neighbourhoods more than as tests.
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 10.0
+DEFAULT_NEIGHBOURS = 5
+DEFAULT_ALPHA = 0.05
+DEFAULT_MIN_CLUSTER = 3
+ALIASES = {"lat": "latitude", "lon": "longitude", "long": "longitude", "pin": "pincode"}
+LEVELS = ["Hot", "Cold", "Not significant"]
+
+
+def read_centroids(path):
+    # One (pincode, latitude, longitude) row per pincode, averaged over its
+    # offices; rows without usable coordinates are dropped.
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    raw.columns = [ALIASES.get(name.strip().lower(), name.strip().lower()) for name in raw.columns]
+    missing = {"pincode", "latitude", "longitude"} - set(raw.columns)
+    if missing:
+        raise ValueError(f"{path} has no {sorted(missing)} column")
+    df = pd.DataFrame({column: pd.to_numeric(raw[column].str.strip(), errors="coerce")
+                       for column in ["pincode", "latitude", "longitude"]})
+    usable = (
+        df.notna().all(axis=1)
+        & df["latitude"].between(-90, 90)
+        & df["longitude"].between(-180, 180)
+        & ((df["latitude"] != 0) | (df["longitude"] != 0))
+    )
+    instrument.metric(centroid_rows=len(df), centroid_rows_dropped=int((~usable).sum()))
+    centroids = df[usable].groupby("pincode", as_index=False)[["latitude", "longitude"]].mean()
+    centroids["pincode"] = centroids["pincode"].astype(np.int64)
+    return centroids
+
+
+def unit_vectors(latitude, longitude):
+    latitude = np.radians(np.asarray(latitude, dtype=np.float64))
+    longitude = np.radians(np.asarray(longitude, dtype=np.float64))
+    return np.column_stack([
+        np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude), np.sin(latitude)
+    ])
+
+
+def chord(km):
+    return 2 * np.sin(np.asarray(km, dtype=np.float64) / (2 * EARTH_RADIUS_KM))
+
+
+def arc_km(chords):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chords) / 2, 0, 1))
+
+
+def _adjacency(rows, columns, size):
+    # Symmetric boolean CSR matrix with the given links in both directions.
+    links = sparse.coo_matrix(
+        (np.ones(2 * len(rows), dtype=bool), (np.r_[rows, columns], np.r_[columns, rows])), shape=(size, size)
+    )
+    return links.tocsr().astype(bool)
+
+
+def neighbours(points, radius_km=DEFAULT_RADIUS_KM, nearest=DEFAULT_NEIGHBOURS):
+    # The distance-band graph, and the Gi* weights: the band, each point's
+    # `nearest` neighbours and the point itself, as a 0/1 CSR matrix.
+    size = len(points)
+    tree = cKDTree(points)
+    with instrument.step("neighbours"):
+        pairs = tree.query_pairs(chord(radius_km), output_type="ndarray")
+        band = _adjacency(pairs[:, 0], pairs[:, 1], size)
+        links = band
+        nearest = min(nearest, size - 1)
+        if nearest > 0:
+            _, found = tree.query(points, k=nearest + 1)
+            rows = np.repeat(np.arange(size), nearest + 1)
+            found = found.ravel()
+            other = found != rows
+            links = links + _adjacency(rows[other], found[other], size)
+        weights = (links + sparse.identity(size, dtype=bool, format="csr")).astype(np.float64)
+    return band, weights.tocsr()
+
+
+def gi_star(weights, values):
+    # Getis-Ord Gi* z-scores of values (pincodes x months, NaN where a
+    # pincode has no value) with binary weights that include each pincode.
+    # Pincodes without a value neither count towards nor get a score.
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    n = valid.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = x.sum(axis=0) / n
+        spread = np.sqrt(np.maximum((x * x).sum(axis=0) / n - mean * mean, 0))
+        local = weights @ x
+        weight = weights @ valid.astype(np.float64)
+        denominator = spread * np.sqrt((n * weight - weight * weight) / (n - 1))
+        z = (local - mean * weight) / denominator
+    z[~valid | ~np.isfinite(z)] = np.nan
+    return z
+
+
+def clusters(band, flagged, min_size=DEFAULT_MIN_CLUSTER):
+    # Cluster number per pincode and month (-1 outside any cluster): the
+    # connected components of `band` among the pincodes flagged that month,
+    # of at least min_size pincodes, numbered 1, 2, ... from the largest.
+    labels = np.full(flagged.shape, -1, dtype=np.int32)
+    for month in range(flagged.shape[1]):
+        members = np.flatnonzero(flagged[:, month])
+        if len(members) < min_size:
+            continue
+        _, component = csgraph.connected_components(band[members][:, members], directed=False)
+        sizes = np.bincount(component)
+        ranked = np.argsort(-sizes, kind="stable")
+        number = np.full(len(sizes), -1, dtype=np.int32)
+        large = ranked[sizes[ranked] >= min_size]
+        number[large] = np.arange(1, len(large) + 1)
+        labels[members, month] = number[component]
+    return labels
+
+
+def hotspots(features_df, flagged_df, centroids, radius_km=DEFAULT_RADIUS_KM, nearest=DEFAULT_NEIGHBOURS,
+             alpha=DEFAULT_ALPHA, min_size=DEFAULT_MIN_CLUSTER, enrolment_cube=None):
+    # Per cell: neighbourhood enrolments and growth, Gi* and its hot/cold
+    # label, and the cluster of flagged pincodes it belongs to; and one row
+    # per cluster and month. enrolment_cube is the cube of features_df.
+    if enrolment_cube is None:
+        enrolment_cube = cube.build(features_df)
+    located = features_df[features_df["pincode"].isin(centroids["pincode"])]
+    pincodes, months, matrix = cube.pincode_months(enrolment_cube, centroids["pincode"].to_numpy())
+    position = centroids.set_index("pincode").loc[pincodes]
+    points = unit_vectors(position["latitude"], position["longitude"])
+    band, weights = neighbours(points, radius_km, nearest)
+
+    with instrument.step("gi_star"):
+        logs = np.log1p(matrix)
+        growth = np.full_like(matrix, np.nan)
+        growth[:, 1:] = logs[:, 1:] - logs[:, :-1]
+        z = gi_star(weights, growth)
+        p = 2 * stats.norm.sf(np.abs(z))
+        counts = np.nan_to_num(matrix)
+        local = weights @ counts
+        previous = np.full_like(local, np.nan)
+        previous[:, 1:] = local[:, :-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            local_growth = np.where(previous > 0, (local / previous - 1) * 100, np.nan)
+
+    rows = np.searchsorted(pincodes, located["pincode"].to_numpy())
+    columns = online.month_number(located["month"]) - online.month_number(months[:1])[0]
+    flagged = np.zeros(matrix.shape, dtype=bool)
+    marked = flagged_df[flagged_df["pincode"].isin(pincodes)]
+    flagged[
+        np.searchsorted(pincodes, marked["pincode"].to_numpy()),
+        online.month_number(marked["month"]) - online.month_number(months[:1])[0],
+    ] = True
+    with instrument.step("clusters"):
+        labels = clusters(band, flagged, min_size)
+
+    cell_z = z[rows, columns]
+    significant = p[rows, columns] < alpha
+    cells = located[["month", "state", "district", "pincode", "total_enrolments"]].reset_index(drop=True)
+    cells["latitude"] = position["latitude"].to_numpy()[rows]
+    cells["longitude"] = position["longitude"].to_numpy()[rows]
+    cells["neighbours"] = np.diff(weights.indptr)[rows] - 1
+    cells["neighbourhood_enrolments"] = local[rows, columns].astype(np.int64)
+    cells["neighbourhood_growth"] = local_growth[rows, columns]
+    cells["gi_star"] = cell_z
+    cells["gi_p"] = p[rows, columns]
+    cells["hotspot"] = pd.Categorical(
+        np.where(significant & (cell_z > 0), "Hot", np.where(significant & (cell_z < 0), "Cold", "Not significant")),
+        categories=LEVELS,
+    )
+    cells["flagged"] = flagged[rows, columns]
+    cells["cluster"] = labels[rows, columns]
+    cells["previous_enrolments"] = np.where(columns > 0, counts[rows, np.maximum(columns - 1, 0)], np.nan)
+
+    instrument.metric(
+        located_pincodes=len(pincodes),
+        unlocated_pincodes=int(features_df["pincode"].nunique() - len(pincodes)),
+        band_links=int(band.nnz // 2),
+        mean_neighbours=round(float(np.diff(weights.indptr).mean() - 1), 2) if len(pincodes) else 0.0,
+    )
+    return cells, summarize_clusters(cells)
+
+
+CLUSTER_COLUMNS = [
+    "month", "cluster", "state", "pincodes", "hot_pincodes", "total_enrolments", "growth", "mean_gi_star",
+    "latitude", "longitude", "radius_km",
+]
+
+
+def summarize_clusters(cells):
+    members = cells[cells["cluster"] >= 0].copy()
+    if members.empty:
+        return pd.DataFrame({column: [] for column in CLUSTER_COLUMNS})
+    keys = ["month", "cluster"]
+    vectors = unit_vectors(members["latitude"], members["longitude"])
+    members[["x", "y", "z"]] = vectors
+    members["hot"] = members["hotspot"] == "Hot"
+    summary = members.groupby(keys, sort=True).agg(
+        pincodes=("pincode", "size"),
+        hot_pincodes=("hot", "sum"),
+        total_enrolments=("total_enrolments", "sum"),
+        previous_enrolments=("previous_enrolments", "sum"),
+        mean_gi_star=("gi_star", "mean"),
+        x=("x", "sum"),
+        y=("y", "sum"),
+        z=("z", "sum"),
+    ).reset_index()
+
+    # Centre of each cluster on the sphere, and the distance to its
+    # farthest member.
+    centre = summary[["x", "y", "z"]].to_numpy()
+    centre = centre / np.linalg.norm(centre, axis=1, keepdims=True)
+    summary["latitude"] = np.degrees(np.arcsin(np.clip(centre[:, 2], -1, 1)))
+    summary["longitude"] = np.degrees(np.arctan2(centre[:, 1], centre[:, 0]))
+    member_centre = centre[summary.set_index(keys).index.get_indexer(pd.MultiIndex.from_frame(members[keys]))]
+    members["distance"] = arc_km(np.linalg.norm(vectors - member_centre, axis=1))
+    summary["radius_km"] = members.groupby(keys, sort=True)["distance"].max().to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        summary["growth"] = np.where(
+            summary["previous_enrolments"] > 0,
+            (summary["total_enrolments"] / summary["previous_enrolments"] - 1) * 100,
+            np.nan,
+        )
+
+    # The state holding most of a cluster's enrolments names it.
+    states = members.groupby(keys + ["state"], observed=True)["total_enrolments"].sum().reset_index()
+    states = states.sort_values(keys + ["total_enrolments"], ascending=[True, True, False]).drop_duplicates(keys)
+    summary = summary.merge(states[keys + ["state"]], on=keys, how="left")
+    summary["total_enrolments"] = summary["total_enrolments"].astype(np.int64)
+    return summary[CLUSTER_COLUMNS]
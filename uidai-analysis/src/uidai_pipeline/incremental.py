@@ -0,0 +1,155 @@
+import json
+import os
+
+import pandas as pd
+
+from uidai_pipeline import flags, ingest, instrument, model, online, store
+
+WATERMARK_PATH = os.path.join(store.DATA_DIR, "watermark.json")
+
+KEYS = ["month", "state", "district", "pincode"]
+
+
+# The watermark is the last ingested date per dataset, plus, when the raw
+# shards were streamed, the bytes and rows read from each (ingest.read_raw
+# offsets), so the next incremental run reads only what was appended.
+# Only that parse is proportional to the appended rows: the monthly table,
+# the feature table and the cube are each one artifact, so an incremental
+# 02/03 still reads and rewrites them whole, and 02 regroups every
+# pincode-month (03 recomputes features only for the changed pincodes and
+# months).
+
+
+def _marks():
+    if not os.path.exists(WATERMARK_PATH):
+        return {}
+    with open(WATERMARK_PATH) as f:
+        return json.load(f)
+
+
+def load_watermark(dataset="enrolment"):
+    value = _marks().get(dataset)
+    return pd.Timestamp(value) if value else None
+
+
+def load_offsets(dataset="enrolment"):
+    return _marks().get(f"{dataset}_offsets")
+
+
+def save_watermark(value, dataset="enrolment", offsets=None):
+    # Offsets not given are dropped: a merge that did not stream the shards
+    # cannot say how far it read them.
+    marks = _marks()
+    marks[dataset] = pd.Timestamp(value).strftime("%Y-%m-%d")
+    marks.pop(f"{dataset}_offsets", None)
+    if offsets is not None:
+        marks[f"{dataset}_offsets"] = offsets
+    with open(WATERMARK_PATH, "w") as f:
+        json.dump(marks, f, indent=2)
+
+
+def upsert(existing, updates, keys):
+    stale = existing.merge(
+        updates[keys].drop_duplicates(), on=keys, how="left", indicator=True
+    )["_merge"].eq("both").to_numpy()
+    return pd.concat([existing[~stale], updates], ignore_index=True)
+
+
+def merge_monthly(monthly_df, new_monthly):
+    combined = pd.concat(
+        [monthly_df.astype({"state": str, "district": str}),
+         new_monthly.astype({"state": str, "district": str})],
+        ignore_index=True,
+    )
+    return ingest.aggregate_monthly(combined).sort_values("month")
+
+
+def read_changed_cells(delta_name):
+    delta = store.read(delta_name)
+    pincodes = delta["pincode"].unique().tolist()
+    months = delta["month"].unique().tolist()
+    return delta, pincodes, months
+
+
+def update_zscores(z_threshold):
+    # Folds the feature cells stage 03 recomputed into the running z-score
+    # statistics and scores them. New months are merged in directly; a
+    # pincode whose earlier months were revised is refolded from its stored
+    # history instead.
+    stats = online.load()
+    if stats is None:
+        instrument.fail("No z-score statistics; run 05_ml_analysis.py without --incremental first")
+    delta, pincodes, _ = read_changed_cells("features_delta")
+    if delta.empty:
+        return delta
+
+    history = store.read(
+        "enrolment_features", columns=["month", "pincode"] + online.series_of(stats),
+        filters=[("pincode", "in", pincodes)],
+    ).sort_values(["pincode", "month"])
+    cells = history.merge(delta[["month", "pincode"]], on=["month", "pincode"])
+    with instrument.step("zscore_update"):
+        stats, revised = online.update(stats, cells)
+        if len(revised):
+            stats, _ = online.update(online.reset(stats, revised), history[history["pincode"].isin(revised)])
+    online.save(stats)
+    instrument.metric(zscore_cells=len(cells), zscore_refolded=len(revised))
+    return online.anomalies(stats, cells, z_threshold)
+
+
+def update_flags(csv=False):
+    # Scores only the feature cells that stage 03 recomputed, against the
+    # model fitted by the last full run, then re-emits the flagged records of
+    # every pincode whose cells or pincode-level demand/risk changed.
+    delta, pincodes, months = read_changed_cells("features_delta")
+    if delta.empty:
+        reemitted = pd.DataFrame(columns=flags.FLAGGED_COLUMNS)
+        store.write(reemitted, "flagged_delta")
+        anomalies = store.read("anomaly_scores", columns=["anomaly_flag"])
+        instrument.metric(
+            iso_anomalies=int((anomalies["anomaly_flag"] == 1).sum()), **flags.summarize(store.read("flagged_records"))
+        )
+        return reemitted
+
+    changed_features = store.read("enrolment_features", filters=[("pincode", "in", pincodes)])
+    cells = changed_features.merge(delta[["month", "pincode"]], on=["month", "pincode"])
+
+    saved = model.load()
+    if saved is None:
+        instrument.fail("No saved Isolation Forest; run 05_ml_analysis.py without --incremental first")
+    cells[["anomaly_score", "anomaly_flag"]] = model.score(saved, cells)
+    anomalies = upsert(
+        store.read("anomaly_scores"), cells[["month", "pincode", "anomaly_score", "anomaly_flag"]],
+        ["month", "pincode"],
+    )
+
+    demand = store.read("pincode_demand")
+    old_levels = flags.assign_levels(demand)
+    demand = upsert(demand, flags.pincode_demand(changed_features), ["pincode"])
+    levels = flags.assign_levels(demand)
+
+    compared = old_levels.merge(levels, on="pincode", how="outer", suffixes=("_old", ""))
+    moved = (
+        compared["demand_level_old"].astype(str).ne(compared["demand_level"].astype(str))
+        | compared["risk_level_old"].astype(str).ne(compared["risk_level"].astype(str))
+    )
+    reemit = sorted(set(pincodes) | set(compared.loc[moved, "pincode"].tolist()))
+
+    reemit_features = store.read("enrolment_features", filters=[("pincode", "in", reemit)])
+    reemitted = flags.compose_flags(
+        reemit_features, anomalies[anomalies["pincode"].isin(reemit)], levels
+    )
+
+    flagged = store.read("flagged_records")
+    flagged = pd.concat(
+        [flagged[~flagged["pincode"].isin(reemit)].astype({"state": str, "district": str}),
+         reemitted[flags.FLAGGED_COLUMNS].astype({"state": str, "district": str})],
+        ignore_index=True,
+    ).sort_values("total_enrolments", ascending=False)
+
+    store.write(anomalies, "anomaly_scores")
+    store.write(demand, "pincode_demand")
+    store.write(flagged, "flagged_records", csv=csv)
+    instrument.metric(iso_anomalies=int((anomalies["anomaly_flag"] == 1).sum()), **flags.summarize(flagged))
+    store.write(reemitted, "flagged_delta")
+    return reemitted
@@ -0,0 +1,275 @@
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from uidai_pipeline import instrument, paths
+
+# Raw sources may be one CSV or many shards (paths.shards). Whole-file
+# reads go through pyarrow's multithreaded CSV parser, one shard per
+# thread on top of its own block parallelism; the shard tables are
+# concatenated without copying and converted to pandas once, releasing
+# the arrow buffers as each column is converted. Chunked reads
+# (--stream) walk the shards in order with the pandas reader. Rows from a
+# multi-shard source carry the shard's file name in SOURCE and are indexed
+# by their position within it, so rejects can point back at a shard line.
+# Chunked reads can resume: given the bytes and rows already read from each
+# shard, they seek past them and parse only what was appended since, up to
+# the last complete line the shard had when its read began.
+
+DATE_FORMAT = "%d-%m-%Y"
+DEFAULT_CHUNKSIZE = 1_000_000
+SOURCE = "source"
+ARROW_TYPES = {"object": pa.string(), "str": pa.string(), "int32": pa.int32()}
+
+ENROLMENT_DTYPES = {
+    "date": "object",
+    "state": "object",
+    "district": "object",
+    "pincode": "int32",
+    "age_0_5": "int32",
+    "age_5_17": "int32",
+    "age_18_greater": "int32",
+}
+
+BIOMETRIC_DTYPES = {
+    "date": "object",
+    "state": "object",
+    "district": "object",
+    "pincode": "int32",
+    "bio_age_5_17": "int32",
+    "bio_age_17_": "int32",
+}
+
+DEMOGRAPHIC_DTYPES = {
+    "date": "object",
+    "state": "object",
+    "district": "object",
+    "pincode": "int32",
+    "demo_age_5_17": "int32",
+    "demo_age_17_": "int32",
+}
+
+# Update datasets keep their per-age counts next to the total, since the
+# dashboard splits every rollup by age band.
+UPDATE_DATASETS = {
+    "biometric": {
+        "raw": paths.RAW_BIOMETRIC,
+        "dtypes": BIOMETRIC_DTYPES,
+        "counts": ["bio_age_5_17", "bio_age_17_"],
+    },
+    "demographic": {
+        "raw": paths.RAW_DEMOGRAPHIC,
+        "dtypes": DEMOGRAPHIC_DTYPES,
+        "counts": ["demo_age_5_17", "demo_age_17_"],
+    },
+}
+
+ENROLMENT_COUNTS = ["age_0_5", "age_5_17", "age_18_greater"]
+
+MONTHLY_KEYS = ["month", "state", "district", "pincode"]
+
+
+def as_text(dtypes):
+    # Validated reads take the integer columns as text; validate.check parses
+    # them and quarantines the fields that are not integers.
+    return {name: "str" if dtype == "int32" else dtype for name, dtype in dtypes.items()}
+
+
+def normalize_columns(columns):
+    return columns.str.lower().str.replace(" ", "_")
+
+
+def _header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def _columns(path, dtypes):
+    # Normalized name -> the name as spelled in this file's header, for the
+    # columns in dtypes, so the dtypes apply at parse time.
+    header = _header(path)
+    raw_names = dict(zip(normalize_columns(pd.Index(header)), header))
+    return {name: raw_names[name] for name in dtypes if name in raw_names}
+
+
+class _Window(io.RawIOBase):
+    # An open file read up to `end`, so rows appended while a shard is read
+    # are left for the next run.
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(max(0, min(len(buffer), self.end - self.f.tell())))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _line_end(f, start, end, block=1 << 16):
+    # Just past the last newline in [start, end), or start if there is none:
+    # a line a writer is still appending is left for the next run rather
+    # than parsed with its fields cut short.
+    position = end
+    while position > start:
+        size = min(block, position - start)
+        f.seek(position - size)
+        found = f.read(size).rfind(b"\n")
+        if found >= 0:
+            return position - size + found + 1
+        position -= size
+    return start
+
+
+def _read_shard(path, dtypes):
+    columns = _columns(path, dtypes)
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+        include_columns=list(columns.values()),
+        column_types={raw: ARROW_TYPES[dtypes[name]] for name, raw in columns.items()},
+        strings_can_be_null=True,
+    ))
+    return table.rename_columns(list(columns))
+
+
+def read_raw(path, dtypes, chunksize=None, offsets=None):
+    # offsets (chunked reads only) maps shard names to the bytes and rows
+    # already read from them, and is advanced as each shard is finished.
+    sources = paths.shards(path)
+    if chunksize is not None:
+        return _timed_chunks(sources, dtypes, chunksize, offsets)
+
+    with instrument.step("read"):
+        with ThreadPoolExecutor(max_workers=min(len(sources), os.cpu_count() or 1)) as pool:
+            tables = list(pool.map(lambda source: _read_shard(source, dtypes), sources))
+        rows = [table.num_rows for table in tables]
+        table = pa.concat_tables(tables)
+        tables.clear()
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+    for source, count in zip(sources, rows):
+        instrument.rows_in(os.path.basename(source), count)
+    if len(sources) > 1:
+        df[SOURCE] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(sources)), rows), [os.path.basename(source) for source in sources]
+        )
+        df.index = np.concatenate([np.arange(count) for count in rows])
+    return df
+
+
+def _timed_chunks(sources, dtypes, chunksize, offsets=None):
+    for source in sources:
+        name = os.path.basename(source)
+        done = (offsets or {}).get(name, {"bytes": 0, "rows": 0})
+        end = os.path.getsize(source)
+        if end < done["bytes"]:
+            raise ValueError(
+                f"{source} is shorter than the {done['bytes']} bytes already ingested; "
+                "it was rewritten, so run a full merge instead"
+            )
+        rows = done["rows"]
+        if offsets is not None and end > done["bytes"]:
+            with open(source, "rb") as f:
+                end = _line_end(f, done["bytes"], end)
+        if end > done["bytes"]:
+            columns = _columns(source, dtypes)
+            # Past the header the column names have to be given.
+            resume = {"header": None, "names": _header(source)} if done["bytes"] else {}
+            with open(source, "rb", buffering=0) as f:
+                f.seek(done["bytes"])
+                reader = pd.read_csv(
+                    io.BufferedReader(_Window(f, end)), usecols=list(columns.values()),
+                    dtype={raw: dtypes[name] for name, raw in columns.items()}, chunksize=chunksize, **resume,
+                )
+                chunks = iter(reader)
+                while True:
+                    with instrument.step("read"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    instrument.rows_in(name, len(chunk))
+                    chunk = _normalized(chunk)
+                    chunk.index = np.arange(rows, rows + len(chunk))
+                    rows += len(chunk)
+                    if len(sources) > 1:
+                        chunk[SOURCE] = pd.Categorical.from_codes(np.zeros(len(chunk), np.int8), [name])
+                    yield chunk
+        if offsets is not None:
+            offsets[name] = {"bytes": end, "rows": rows}
+
+
+def _normalized(chunk):
+    chunk.columns = normalize_columns(chunk.columns)
+    return chunk
+
+
+def clean_enrolment(df):
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        with instrument.step("parse_dates"):
+            df["date"] = pd.to_datetime(df["date"], format=DATE_FORMAT)
+    df["total_enrolments"] = df["age_0_5"] + df["age_5_17"] + df["age_18_greater"]
+    return df[["date", "state", "district", "pincode", "total_enrolments"]]
+
+
+def clean_updates(df, counts):
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        with instrument.step("parse_dates"):
+            df["date"] = pd.to_datetime(df["date"], format=DATE_FORMAT)
+    df["total_updates"] = df[counts].sum(axis=1).astype("int32")
+    return df[["date", "state", "district", "pincode"] + counts + ["total_updates"]]
+
+
+def aggregate_monthly(df, sort=True, values=("total_enrolments",)):
+    if "month" not in df:
+        df = df.assign(month=df["date"].dt.to_period("M").dt.to_timestamp())
+    with instrument.step("groupby"):
+        return df.groupby(MONTHLY_KEYS, as_index=False, sort=sort, observed=True).agg(
+            {value: "sum" for value in values}
+        )
+
+
+def stream_monthly(path, chunksize=DEFAULT_CHUNKSIZE, since=None, check=None, observe=None, offsets=None):
+    # Each chunk is folded into partial monthly sums straight away. Partials
+    # are re-folded whenever they double in size, so the working set stays
+    # proportional to the number of distinct (month, pincode) cells rather
+    # than to the raw row count. With `offsets` (see read_raw) only the rows
+    # appended since the last run are read; without them, rows dated on or
+    # before `since` were already ingested by an earlier run and are skipped
+    # after the read. `check` (validate.check bound to a validator) filters
+    # each raw chunk before it is cleaned; `observe` is called with each
+    # chunk's monthly sums, e.g. to fold them into the sketches.
+    partials = []
+    pending = 0
+    folded = 0
+    latest = since
+    dtypes = ENROLMENT_DTYPES if check is None else as_text(ENROLMENT_DTYPES)
+    for chunk in read_raw(path, dtypes, chunksize=chunksize, offsets=offsets):
+        if check is not None:
+            chunk = check(chunk)
+        chunk = clean_enrolment(chunk)
+        if since is not None:
+            chunk = chunk[chunk["date"] > since]
+        if chunk.empty:
+            continue
+        chunk_latest = chunk["date"].max()
+        latest = chunk_latest if latest is None else max(latest, chunk_latest)
+        part = aggregate_monthly(chunk, sort=False)
+        if observe is not None:
+            observe(part)
+        partials.append(part)
+        pending += len(part)
+        if len(partials) > 1 and pending > max(chunksize, 2 * folded):
+            partials = [aggregate_monthly(pd.concat(partials, ignore_index=True), sort=False)]
+            folded = pending = len(partials[0])
+
+    if not partials:
+        return pd.DataFrame(columns=MONTHLY_KEYS + ["total_enrolments"]), latest
+    monthly_df = aggregate_monthly(pd.concat(partials, ignore_index=True))
+    return monthly_df.sort_values("month"), latest
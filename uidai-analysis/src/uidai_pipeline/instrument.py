@@ -0,0 +1,148 @@
+import atexit
+import contextlib
+import datetime
+import json
+import os
+import resource
+import sys
+import time
+
+from uidai_pipeline.paths import OUTPUT_DIR
+
+# Every stage script calls begin() once. From then on store reads and writes,
+# raw CSV parsing and the timed sub-steps are accumulated in memory, and at
+# interpreter exit the stage's record replaces its previous entry in the run
+# manifest. Standard library only, like the runner, so importing it costs
+# nothing in processes that never call begin().
+
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "run_manifest.json")
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+
+_record = None
+_steps = {}
+_started = None
+_profiler = None
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def begin(stage):
+    global _record, _started, _profiler
+    _steps.clear()
+    _record = {
+        "stage": stage,
+        "run_id": os.environ.get("UIDAI_RUN_ID"),
+        "started": _now(),
+        "argv": sys.argv[1:],
+        "status": "ok",
+        "inputs": {},
+        "outputs": {},
+        "metrics": {},
+    }
+    _started = (time.perf_counter(), time.process_time())
+    if os.environ.get("UIDAI_PROFILE"):
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+    previous_hook = sys.excepthook
+
+    def excepthook(kind, value, traceback):
+        _record["status"] = "error"
+        _record["error"] = f"{kind.__name__}: {value}"
+        previous_hook(kind, value, traceback)
+
+    sys.excepthook = excepthook
+    atexit.register(finish)
+
+
+@contextlib.contextmanager
+def step(name):
+    # Steps accumulate, so a stage that parses dates once per chunk reports
+    # the total time and the number of calls.
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = _steps.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += time.perf_counter() - started
+        entry["calls"] += 1
+
+
+def rows_in(name, rows):
+    if _record is not None:
+        _record["inputs"][name] = _record["inputs"].get(name, 0) + int(rows)
+
+
+def rows_out(name, rows):
+    if _record is not None:
+        _record["outputs"][name] = int(rows)
+
+
+def metric(**values):
+    if _record is not None:
+        _record["metrics"].update(values)
+
+
+def fail(message):
+    # Ends the stage with a non-zero exit. A bare SystemExit never reaches
+    # sys.excepthook, so without this the record would still say "ok".
+    if _record is not None:
+        _record["status"] = "error"
+        _record["error"] = f"SystemExit: {message}"
+    raise SystemExit(message)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"stages": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(temporary, path)
+
+
+def finish():
+    global _record, _profiler
+    if _record is None:
+        return
+    wall = time.perf_counter() - _started[0]
+    cpu = time.process_time() - _started[1]
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    record = dict(_record)
+    record.update({
+        "finished": _now(),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "children_cpu_s": round(children.ru_utime + children.ru_stime, 3),
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": round(own.ru_maxrss / 1024, 1),
+        "children_peak_rss_mb": round(children.ru_maxrss / 1024, 1),
+        "steps": {
+            name: {"seconds": round(entry["seconds"], 4), "calls": entry["calls"]}
+            for name, entry in _steps.items()
+        },
+    })
+
+    if _profiler is not None:
+        _profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        record["profile"] = os.path.join(PROFILE_DIR, f"{record['stage']}.prof")
+        _profiler.dump_stats(record["profile"])
+        _profiler = None
+
+    manifest = load_manifest()
+    manifest["stages"][record["stage"]] = record
+    save_manifest(manifest)
+    _record = None
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import ingest, instrument, kernels, store
+
+# Joins on (month, pincode) are done on a single int64 key instead of pandas
+# merges on two columns: month becomes a month number (year * 12 + month) and
+# the six-digit pincode fills the low digits. Each side is collapsed to one
+# row per key and sorted once; matching is then a searchsorted over the
+# sorted keys, so a join costs one sort per input and never builds the
+# hash tables or intermediate frames of a chained merge.
+
+PINCODE_SPAN = 1_000_000
+
+
+def encode_keys(month, pincode):
+    month = pd.DatetimeIndex(month)
+    month_number = month.year.to_numpy(np.int64) * 12 + month.month.to_numpy(np.int64) - 1
+    return month_number * PINCODE_SPAN + np.asarray(pincode, dtype=np.int64)
+
+
+def decode_keys(keys):
+    month_number, pincode = np.divmod(np.asarray(keys, dtype=np.int64), PINCODE_SPAN)
+    numbers, inverse = np.unique(month_number, return_inverse=True)
+    year, month = np.divmod(numbers, 12)
+    months = pd.to_datetime(pd.DataFrame({"year": year, "month": month + 1, "day": 1})).to_numpy()
+    return months[inverse], pincode.astype(np.int32)
+
+
+def collapse(keys, values=None):
+    # Sorted unique keys, the sum of each value column per key, and the first
+    # input row of each key (for carrying attributes such as state across).
+    # Inputs that are already in key order skip the sort.
+    if len(keys) < 2 or np.all(keys[1:] >= keys[:-1]):
+        order = np.arange(len(keys))
+    else:
+        order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = kernels.group_starts(sorted_keys)
+    sums = {
+        name: np.add.reduceat(np.asarray(column, dtype=np.int64)[order], starts)
+        if len(starts) else np.empty(0, dtype=np.int64)
+        for name, column in (values or {}).items()
+    }
+    return sorted_keys[starts], sums, order[starts]
+
+
+def lookup(sorted_keys, keys):
+    # Position of each key in sorted_keys and whether it is there at all.
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[positions] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return positions, found
+
+
+def lookup_values(df, values):
+    # Columns of `values` (one row per month and pincode) for each row of df,
+    # NaN where df has a month/pincode that values does not.
+    sorted_keys, _, rows = collapse(encode_keys(values["month"], values["pincode"]))
+    positions, found = lookup(sorted_keys, encode_keys(df["month"], df["pincode"]))
+    out = {}
+    for column in values.columns.difference(["month", "pincode"]):
+        column_values = values[column].to_numpy(dtype=np.float64)[rows]
+        out[column] = np.where(found, column_values[positions] if len(rows) else np.nan, np.nan)
+    return pd.DataFrame(out, index=df.index)
+
+
+def _sorted_unique(sorted_values):
+    return sorted_values[kernels.group_starts(sorted_values)]
+
+
+def _as_category(values):
+    return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+
+
+def _categories(frames, column):
+    categories = set()
+    for df in frames:
+        categories.update(_as_category(df[column]).cat.categories)
+    return pd.Index(sorted(categories))
+
+
+def _recode(values, categories, rows):
+    # Codes of values[rows] in `categories`, translated through the small
+    # category table rather than by hashing every string.
+    values = _as_category(values)
+    mapping = categories.get_indexer(values.cat.categories).astype(np.int32)
+    codes = values.cat.codes.to_numpy()[rows]
+    return np.where(codes >= 0, mapping[codes] if len(mapping) else -1, -1)
+
+
+def fact_table(sources):
+    # sources maps a dataset name to (monthly frame, value column, output
+    # column); the first source that has a key wins when datasets disagree on a pincode's
+    # state or district. Every (month, pincode) seen in any dataset gets a
+    # row. A pincode missing from a month that its dataset does cover is a
+    # real zero; a month the dataset does not cover at all is unknown, and
+    # has_<dataset> and <dataset>_month_covered let consumers tell them apart.
+    collapsed = {}
+    with instrument.step("encode"):
+        for name, (df, value, column) in sources.items():
+            keys = encode_keys(df["month"], df["pincode"])
+            unique_keys, sums, rows = collapse(keys, {column: df[value].to_numpy()})
+            collapsed[name] = (unique_keys, sums[column], rows)
+
+    with instrument.step("join"):
+        all_keys = _sorted_unique(np.sort(np.concatenate([keys for keys, _, _ in collapsed.values()])))
+        months, pincodes = decode_keys(all_keys)
+        month_numbers = all_keys // PINCODE_SPAN
+        facts = {"month": months, "pincode": pincodes}
+        attributes = {
+            column: _categories([df for df, _, _ in sources.values()], column)
+            for column in ("state", "district")
+        }
+        codes = {column: np.full(len(all_keys), -1, dtype=np.int32) for column in attributes}
+
+        for name, (df, value, column) in sources.items():
+            keys, sums, rows = collapsed[name]
+            positions, found = lookup(keys, all_keys)
+            facts[column] = np.where(found, sums[positions] if len(keys) else 0, 0)
+            facts[f"has_{name}"] = found
+            covered = _sorted_unique(keys // PINCODE_SPAN)
+            facts[f"{name}_month_covered"] = lookup(covered, month_numbers)[1]
+            for attribute, code in codes.items():
+                source_codes = _recode(df[attribute], attributes[attribute], rows)
+                fill = found & (code < 0)
+                code[fill] = source_codes[positions[fill]]
+
+        for attribute, code in codes.items():
+            facts[attribute] = pd.Categorical.from_codes(code, categories=attributes[attribute])
+
+    columns = ["month", "state", "district", "pincode"] + [
+        name for name in facts if name not in ("month", "state", "district", "pincode")
+    ]
+    return pd.DataFrame(facts)[columns]
+
+
+def add_ratios(facts, base, others):
+    # Updates per enrolment; NaN where the base is zero or either dataset
+    # does not cover the month.
+    denominator = facts[base].to_numpy(np.float64)
+    for column, covered, ratio in others:
+        known = (denominator > 0) & facts[covered].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            facts[ratio] = np.where(known, facts[column].to_numpy(np.float64) / denominator, np.nan)
+    return facts
+
+
+def monthly_facts(enrolment_monthly):
+    # One row per (month, pincode) across enrolment and the update datasets,
+    # with update-to-enrolment ratios. Update datasets whose monthly table has
+    # not been built yet join as empty, so their months read as not covered.
+    sources = {"enrolment": (enrolment_monthly, "total_enrolments", "total_enrolments")}
+    for dataset in ingest.UPDATE_DATASETS:
+        columns = ingest.MONTHLY_KEYS + ["total_updates"]
+        name = f"{dataset}_monthly"
+        if store.exists(name):
+            df = store.read(name, columns=columns)
+        else:
+            df = pd.DataFrame({column: pd.Series(dtype="object") for column in columns})
+            df["month"] = pd.to_datetime(df["month"])
+        sources[dataset] = (df, "total_updates", f"{dataset}_updates")
+
+    facts = fact_table(sources)
+    return add_ratios(facts, "total_enrolments", [
+        (f"{dataset}_updates", f"{dataset}_month_covered", f"{dataset}_per_enrolment")
+        for dataset in ingest.UPDATE_DATASETS
+    ])
@@ -0,0 +1,98 @@
+import numpy as np
+
+# Grouped window kernels over rows that are already ordered by group, e.g. a
+# features table sorted by (pincode, month). Groups are described by the
+# index of their first row; every kernel works on whole arrays with cumulative
+# sums and reduceat, so the cost does not depend on the number of groups.
+
+
+def group_starts(keys):
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def group_sizes(starts, n):
+    return np.diff(np.r_[starts, n])
+
+
+def group_ids(starts, n):
+    return np.repeat(np.arange(len(starts)), group_sizes(starts, n))
+
+
+def row_starts(starts, n):
+    # First row of each row's group, broadcast to every row.
+    return np.repeat(starts, group_sizes(starts, n))
+
+
+def pct_change(values, starts):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = values[1:] / values[:-1] - 1
+    out[starts] = np.nan
+    return out
+
+
+def rolling_mean(values, starts, window, min_periods=1):
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    valid = ~np.isnan(values)
+    sums = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+    counts = np.r_[0, np.cumsum(valid)]
+
+    positions = np.arange(n)
+    lower = np.maximum(positions - window + 1, row_starts(starts, n))
+    total = sums[positions + 1] - sums[lower]
+    count = counts[positions + 1] - counts[lower]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = total / count
+    out[count < max(min_periods, 1)] = np.nan
+    return out
+
+
+def shift(values, starts, periods=1):
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if periods < n:
+        out[periods:] = values[:n - periods]
+    position = np.arange(n) - row_starts(starts, n)
+    out[position < periods] = np.nan
+    return out
+
+
+def shifted_rolling_mean(values, starts, window, min_periods=1):
+    return shift(rolling_mean(values, starts, window, min_periods), starts)
+
+
+def zscore(values, starts):
+    # Population z-score (ddof=0) per group, ignoring NaNs like
+    # scipy.stats.zscore(nan_policy="omit"). Two passes keep it stable.
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    valid = ~np.isnan(values)
+    ids = group_ids(starts, n)
+
+    counts = np.add.reduceat(valid.astype(np.float64), starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.add.reduceat(np.where(valid, values, 0.0), starts) / counts
+        deviations = np.where(valid, values - means[ids], 0.0)
+        stds = np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts)
+        out = (values - means[ids]) / stds[ids]
+    return out
+
+
+def group_transform(kernel, values, keys, **kwargs):
+    # Applies a kernel to unsorted rows: rows are grouped by a stable sort on
+    # keys, so within-group order (e.g. by month) is preserved.
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind="stable")
+    values = np.asarray(values, dtype=np.float64)[order]
+    out = np.empty(len(values))
+    out[order] = kernel(values, group_starts(keys[order]), **kwargs)
+    return out
@@ -0,0 +1,111 @@
+import datetime
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from uidai_pipeline import instrument, store
+
+# The scaler and Isolation Forest are fitted on a schedule rather than on
+# every run. A saved model carries a version number, the feature columns and
+# dtypes it was trained on and its training parameters; runs in between only
+# score, in parallel batches, against the saved model. Scores are kept as
+# decision values (negative means anomalous, lower is more anomalous) so
+# flagged cells can be ranked, not just labelled.
+
+MODEL_PATH = os.path.join(store.DATA_DIR, "isolation_forest.joblib")
+FORMAT_VERSION = 1
+DEFAULT_BATCH_SIZE = 50_000
+DEFAULT_REFIT_DAYS = 30
+
+
+def schema(df, columns):
+    return [[column, str(df[column].dtype)] for column in columns]
+
+
+def prepare(df, columns):
+    return df[columns].replace([np.inf, -np.inf], 0).fillna(0)
+
+
+def load(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    saved = joblib.load(path)
+    # Models saved before versioning hold only the scaler and the forest.
+    return saved if saved.get("format") == FORMAT_VERSION else None
+
+
+def refit_reason(saved, df, columns, contamination, refit_days=DEFAULT_REFIT_DAYS):
+    if saved is None:
+        return "no saved model"
+    if saved["schema"] != schema(df, columns):
+        return "feature schema changed"
+    if saved["contamination"] != contamination:
+        return "contamination changed"
+    age = datetime.datetime.now() - datetime.datetime.fromisoformat(saved["fitted"])
+    if refit_days is not None and age.days >= refit_days:
+        return f"model is {age.days} days old"
+    return None
+
+
+def stratified_sample(df, size, strata="state", random_state=42):
+    # Same fraction from every state, so small states are not drowned out by
+    # the large ones in the training set.
+    if size is None or len(df) <= size:
+        return df
+    return df.groupby(strata, observed=True, group_keys=False).sample(
+        frac=size / len(df), random_state=random_state
+    )
+
+
+def fit(df, columns, contamination, sample_size=None, strata="state", previous=None, random_state=42):
+    train = stratified_sample(df, sample_size, strata, random_state)
+    with instrument.step("model_fit"):
+        scaler = StandardScaler().fit(prepare(train, columns))
+        forest = IsolationForest(contamination=contamination, random_state=random_state)
+        forest.fit(scaler.transform(prepare(train, columns)))
+    return {
+        "format": FORMAT_VERSION,
+        "version": (previous["version"] + 1) if previous else 1,
+        "fitted": datetime.datetime.now().isoformat(timespec="seconds"),
+        "schema": schema(df, columns),
+        "contamination": contamination,
+        "train_rows": len(train),
+        "sample_size": sample_size,
+        "strata": strata,
+        "scaler": scaler,
+        "model": forest,
+    }
+
+
+def save(saved, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(saved, temporary)
+    os.replace(temporary, path)
+
+
+def _score_batch(scaler, forest, batch):
+    return forest.decision_function(scaler.transform(batch))
+
+
+def score(saved, df, batch_size=DEFAULT_BATCH_SIZE, jobs=None):
+    columns = [column for column, _ in saved["schema"]]
+    if schema(df, columns) != saved["schema"]:
+        raise ValueError(f"Features do not match model version {saved['version']}: {saved['schema']}")
+    values = prepare(df, columns)
+    batches = [values.iloc[start:start + batch_size] for start in range(0, len(values), batch_size)]
+    # Tree traversal releases the GIL, so threads share one copy of the
+    # forest instead of pickling it to every worker.
+    with instrument.step("model_score"):
+        scores = joblib.Parallel(n_jobs=jobs, prefer="threads")(
+            joblib.delayed(_score_batch)(saved["scaler"], saved["model"], batch) for batch in batches
+        )
+    scores = np.concatenate(scores) if scores else np.empty(0)
+    instrument.metric(scored_rows=len(values), score_batches=len(batches))
+    return pd.DataFrame(
+        {"anomaly_score": scores, "anomaly_flag": (scores < 0).astype(int)}, index=df.index
+    )
@@ -0,0 +1,205 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import kernels, store
+
+# Running per-pincode statistics for the z-score detector, so a refresh only
+# touches the months that arrived since the last run. The store is a set of
+# flat arrays indexed by position in a sorted pincode array: count, mean and
+# sum of squared deviations (m2) per tracked column, the last value seen and
+# the last month folded in. New months are merged in with Chan/Welford
+# updates; with `decay` set the statistics are exponentially weighted
+# instead, each month scaling the weight of the older ones by (1 - decay).
+# Non-finite values (growth after a zero month) are skipped rather than
+# poisoning a pincode's statistics for good.
+
+STATS_PATH = os.path.join(store.DATA_DIR, "zscore_stats.npz")
+SERIES = ["total_enrolments", "enrolments_mom_growth"]
+FIELDS = ["count", "mean", "m2", "last"]
+
+
+def month_number(months):
+    months = pd.DatetimeIndex(months)
+    return (months.year.to_numpy(np.int32) * 12 + months.month.to_numpy(np.int32) - 1).astype(np.int32)
+
+
+def empty(series=SERIES, decay=None):
+    stats = {"pincodes": np.empty(0, dtype=np.int32), "last_month": np.empty(0, dtype=np.int32)}
+    for column in series:
+        for field in FIELDS:
+            stats[f"{column}.{field}"] = np.empty(0)
+    stats["decay"] = np.float64(np.nan if decay is None else decay)
+    return stats
+
+
+def series_of(stats):
+    return [name[:-len(".count")] for name in stats if name.endswith(".count")]
+
+
+def decay_of(stats):
+    decay = float(stats["decay"])
+    return None if np.isnan(decay) else decay
+
+
+def load(path=STATS_PATH):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+def save(stats, path=STATS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temporary, **stats)
+    os.replace(temporary, path)
+
+
+def _grow(stats, pincodes):
+    # Adds rows for pincodes not in the store yet, keeping the array sorted.
+    new = np.setdiff1d(pincodes, stats["pincodes"])
+    if len(new) == 0:
+        return stats
+    merged = np.union1d(stats["pincodes"], new).astype(np.int32)
+    old_positions = np.searchsorted(merged, stats["pincodes"])
+    grown = {"pincodes": merged, "decay": stats["decay"]}
+    for name, values in stats.items():
+        if name in grown:
+            continue
+        fill = -1 if name == "last_month" else (np.nan if name.endswith(".last") else 0)
+        column = np.full(len(merged), fill, dtype=values.dtype)
+        column[old_positions] = values
+        grown[name] = column
+    return grown
+
+
+def positions(stats, pincodes):
+    found = np.searchsorted(stats["pincodes"], pincodes)
+    found = np.minimum(found, max(len(stats["pincodes"]) - 1, 0))
+    present = stats["pincodes"][found] == pincodes if len(stats["pincodes"]) else np.zeros(len(pincodes), bool)
+    return found, present
+
+
+def reset(stats, pincodes):
+    # Forgets the given pincodes, e.g. before refolding a revised history.
+    rows, present = positions(stats, np.asarray(pincodes, dtype=np.int32))
+    rows = rows[present]
+    stats = dict(stats)
+    stats["last_month"] = stats["last_month"].copy()
+    stats["last_month"][rows] = -1
+    for column in series_of(stats):
+        for field in FIELDS:
+            name = f"{column}.{field}"
+            stats[name] = stats[name].copy()
+            stats[name][rows] = np.nan if field == "last" else 0
+    return stats
+
+
+def _merge_exact(stats, column, rows, starts, values):
+    valid = np.isfinite(values)
+    clean = np.where(valid, values, 0.0)
+    counts_b = np.add.reduceat(valid.astype(np.float64), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means_b = np.where(counts_b > 0, np.add.reduceat(clean, starts) / counts_b, 0.0)
+    deviations = np.where(valid, values - np.repeat(means_b, kernels.group_sizes(starts, len(values))), 0.0)
+    m2_b = np.add.reduceat(deviations * deviations, starts)
+
+    counts_a = stats[f"{column}.count"][rows]
+    means_a = stats[f"{column}.mean"][rows]
+    total = counts_a + counts_b
+    delta = means_b - means_a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(total > 0, counts_b / total, 0.0)
+    stats[f"{column}.mean"][rows] = means_a + delta * share
+    stats[f"{column}.m2"][rows] = stats[f"{column}.m2"][rows] + m2_b + delta * delta * counts_a * share
+    stats[f"{column}.count"][rows] = total
+
+
+def _merge_decayed(stats, column, rows, starts, values, decay):
+    # Weighted Welford: one pass per month position within the batch, each
+    # vectorized over all pincodes that have a value at that position.
+    offsets = np.arange(len(values)) - kernels.row_starts(starts, len(values))
+    row_of = np.repeat(rows, kernels.group_sizes(starts, len(values)))
+    weight, mean, m2 = (stats[f"{column}.{field}"] for field in ("count", "mean", "m2"))
+    for offset in range(int(offsets.max()) + 1 if len(offsets) else 0):
+        at = offsets == offset
+        x, target = values[at], row_of[at]
+        valid = np.isfinite(x)
+        x, target = x[valid], target[valid]
+        weight[target] = weight[target] * (1 - decay) + 1
+        delta = x - mean[target]
+        mean[target] = mean[target] + delta / weight[target]
+        m2[target] = m2[target] * (1 - decay) + delta * (x - mean[target])
+
+
+def update(stats, df):
+    # Folds rows of df (month, pincode and the tracked columns) newer than
+    # each pincode's last folded month into the store. Returns the updated
+    # store and the pincodes that had rows at or before their last month;
+    # those need reset() and a refold of their full history.
+    months = month_number(df["month"])
+    pincodes = df["pincode"].to_numpy(np.int32)
+    stats = _grow({name: values.copy() for name, values in stats.items()}, np.unique(pincodes))
+    rows, _ = positions(stats, pincodes)
+
+    late = months <= stats["last_month"][rows]
+    revised = np.unique(pincodes[late])
+    keep = ~np.isin(pincodes, revised)
+    order = np.lexsort((months[keep], rows[keep]))
+    months, rows = months[keep][order], rows[keep][order]
+    starts = kernels.group_starts(rows)
+    if len(rows) == 0:
+        return stats, revised
+    group_rows = rows[starts]
+
+    decay = decay_of(stats)
+    for column in series_of(stats):
+        values = df[column].to_numpy(np.float64)[keep][order]
+        if decay is None:
+            _merge_exact(stats, column, group_rows, starts, values)
+        else:
+            _merge_decayed(stats, column, group_rows, starts, values, decay)
+        finite = np.isfinite(values)
+        last_index = np.maximum.reduceat(np.where(finite, np.arange(len(values)), -1), starts)
+        has_last = last_index >= 0
+        stats[f"{column}.last"][group_rows[has_last]] = values[last_index[has_last]]
+    stats["last_month"][group_rows] = np.maximum.reduceat(months, starts)
+    return stats, revised
+
+
+def concat(parts):
+    # One store from stores over disjoint pincodes, e.g. one per state
+    # partition.
+    pincodes = np.concatenate([part["pincodes"] for part in parts])
+    order = np.argsort(pincodes, kind="stable")
+    repeated = pincodes[order][1:][np.diff(pincodes[order]) == 0]
+    if len(repeated):
+        raise ValueError(f"Pincode {repeated[0]} is in more than one partition; it is filed under two states")
+    stats = {
+        name: np.concatenate([part[name] for part in parts])[order]
+        for name in parts[0] if name != "decay"
+    }
+    stats["decay"] = parts[0]["decay"]
+    return stats
+
+
+def zscores(stats, df, column):
+    # Population z-score (ddof=0) of each row against its pincode's current
+    # statistics; NaN for pincodes the store has not seen or with no spread.
+    rows, present = positions(stats, df["pincode"].to_numpy(np.int32))
+    count = np.where(present, stats[f"{column}.count"][rows], 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(stats[f"{column}.m2"][rows] / count)
+        out = (df[column].to_numpy(np.float64) - stats[f"{column}.mean"][rows]) / std
+    out[~present | (count == 0)] = np.nan
+    return out
+
+
+def anomalies(stats, df, threshold):
+    with np.errstate(invalid="ignore"):
+        flagged = np.zeros(len(df), dtype=bool)
+        for column in series_of(stats):
+            flagged |= np.abs(zscores(stats, df, column)) > threshold
+    return df[flagged]
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from uidai_pipeline import features, flags, ingest, instrument, online, store
+
+# State-partitioned execution of the merge, features and ml stages. From
+# the monthly groupby to the z-scores nothing crosses a partition boundary:
+# windows run along a pincode's own months, shares are taken within a
+# district or state, and states that share a pincode (one filed under two
+# states) are kept in the same partition. States, or such linked sets of
+# states, are split into partitions of about equal row counts (largest
+# first, each to the lightest partition), every partition runs in its own
+# process reading only its states from the parquet store, and the parts are
+# concatenated and sorted the way the single-process code orders them.
+# Steps that need every state at once, such as the Isolation Forest fit and
+# the demand tertiles, stay in the stage scripts and run on the merged
+# result. District shares are taken per (state, district) in both modes, so
+# a district name used by two states gets the same shares whether or not
+# the states share a partition.
+
+
+def state_rows(name):
+    # Rows per state, read from the state column alone.
+    states = pq.read_table(store.path(name), columns=["state"]).column("state").to_pandas()
+    return states.value_counts().to_dict()
+
+
+def linked_states(name):
+    # The states of each pincode filed under more than one state.
+    cells = pq.read_table(store.path(name), columns=["state", "pincode"]).to_pandas().drop_duplicates()
+    cells = cells[cells["pincode"].duplicated(keep=False)]
+    return [set(states) for _, states in cells.groupby("pincode")["state"]]
+
+
+def plan(counts, partitions, linked=()):
+    # States joined by a pincode in `linked` move as one unit, so every
+    # pincode's rows land in a single partition.
+    units = {state: {state} for state in counts}
+    for states in linked:
+        merged = set().union(*(units[state] for state in states))
+        for state in merged:
+            units[state] = merged
+    unique = {id(unit): unit for unit in units.values()}.values()
+    loads = [0] * partitions
+    groups = [[] for _ in range(partitions)]
+    for unit in sorted(unique, key=lambda unit: (-sum(counts[state] for state in unit), min(map(str, unit)))):
+        lightest = loads.index(min(loads))
+        groups[lightest].extend(unit)
+        loads[lightest] += sum(counts[state] for state in unit)
+    return [sorted(group) for group in groups if group]
+
+
+def _run(function, name, states, kwargs):
+    df = store.read(name, states=states)
+    return function(df, **kwargs), len(df)
+
+
+def map_states(function, name, partitions, workers=None, **kwargs):
+    # function(df, **kwargs) for the rows of every partition of table
+    # `name`; results come back in partition order.
+    groups = plan(state_rows(name), partitions, linked_states(name))
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+    with instrument.step("partitions"):
+        if workers <= 1:
+            results = [_run(function, name, states, kwargs) for states in groups]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_run, function, name, states, kwargs) for states in groups]
+                results = [future.result() for future in futures]
+    if workers > 1:
+        # Reads in the pool do not reach this process's manifest entry.
+        instrument.rows_in(name, sum(rows for _, rows in results))
+    instrument.metric(partitions=len(groups), workers=workers, partition_rows=[rows for _, rows in results])
+    return [result for result, _ in results]
+
+
+def concat(frames, keys):
+    # Each part has its own category set; the merged keys get one sorted
+    # set, as a store read would.
+    df = pd.concat(frames, ignore_index=True)
+    for column in ("state", "district"):
+        if column in df:
+            df[column] = df[column].astype(str).astype("category")
+    return df.sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+def _monthly(cleaned_df):
+    return ingest.aggregate_monthly(cleaned_df), cleaned_df["date"].max()
+
+
+def monthly(partitions, workers=None):
+    # enrolment_monthly from enrolment_cleaned, and the latest date seen.
+    parts = map_states(_monthly, "enrolment_cleaned", partitions, workers)
+    monthly_df = concat([part for part, _ in parts], ingest.MONTHLY_KEYS)
+    return monthly_df, max(latest for _, latest in parts)
+
+
+def build_features(partitions, workers=None):
+    parts = map_states(features.build_features, "enrolment_monthly", partitions, workers)
+    return concat(parts, ["pincode", "month"])
+
+
+def per_pincode(partitions, workers=None, zscore_decay=None):
+    # flags.per_pincode over every partition of enrolment_features.
+    parts = map_states(flags.per_pincode, "enrolment_features", partitions, workers, zscore_decay=zscore_decay)
+    return {
+        "forecast": concat([part["forecast"] for part in parts], ["pincode", "month"]),
+        "zscores": concat([part["zscores"] for part in parts], ["pincode", "month"]),
+        "zscore_stats": online.concat([part["zscore_stats"] for part in parts]),
+        "demand": concat([part["demand"] for part in parts], ["pincode"]),
+    }
@@ -0,0 +1,32 @@
+import glob
+import os
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+# The benchmark harness points whole pipeline runs at generated datasets by
+# overriding these two directories.
+DATA_DIR = os.environ.get("UIDAI_DATA_DIR", os.path.join(ROOT_DIR, "data"))
+OUTPUT_DIR = os.environ.get("UIDAI_OUTPUT_DIR", os.path.join(ROOT_DIR, "outputs"))
+EXPORT_DIR = os.environ.get(
+    "UIDAI_EXPORT_DIR", os.path.join(ROOT_DIR, "uidai-dashboard-react", "public", "data", "export")
+)
+
+RAW_ENROLMENT = os.path.join(DATA_DIR, "enrolment.csv")
+RAW_BIOMETRIC = os.path.join(DATA_DIR, "biometric.csv")
+RAW_DEMOGRAPHIC = os.path.join(DATA_DIR, "demographic_updates.csv")
+RAW_DEVICE_LOGS = os.path.join(DATA_DIR, "device_transactions.csv")
+PINCODE_CENTROIDS = os.path.join(DATA_DIR, "pincode_centroids.csv")
+
+
+def shards(source):
+    # A raw source is one CSV file, a directory of CSV shards or a glob
+    # pattern; shards come back in name order. A pattern matching nothing
+    # is returned as is, so reading it fails with the pattern in the error.
+    if os.path.isdir(source):
+        found = glob.glob(os.path.join(source, "*.csv"))
+    elif any(char in source for char in "*?["):
+        found = glob.glob(source)
+    else:
+        found = []
+    return sorted(found) or [source]
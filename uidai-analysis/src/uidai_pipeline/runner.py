@@ -0,0 +1,585 @@
+import argparse
+import ast
+import datetime
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from uidai_pipeline import instrument
+from uidai_pipeline.paths import (
+    DATA_DIR, EXPORT_DIR, OUTPUT_DIR, PINCODE_CENTROIDS, RAW_BIOMETRIC, RAW_DEMOGRAPHIC, RAW_DEVICE_LOGS, RAW_ENROLMENT,
+    SRC_DIR, shards,
+)
+
+# Only the standard library is imported here: pandas, pyarrow, sklearn and
+# matplotlib are loaded by the stage scripts themselves, in a child process,
+# and only for stages that actually run.
+
+CACHE_PATH = os.path.join(DATA_DIR, ".pipeline_cache.json")
+PACKAGE_DIR = os.path.join(SRC_DIR, "uidai_pipeline")
+
+
+def _data(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def _output(name):
+    return os.path.join(OUTPUT_DIR, name)
+
+
+CHARTS = [
+    "01_univariate_time_trend.png",
+    "02_univariate_distributions.png",
+    "03_univariate_state_totals.png",
+    "04_bivariate_scatter.png",
+    "05_bivariate_state_heatmap.png",
+    "06_bivariate_top_states_trend.png",
+    "07_trivariate_district_hotspots.png",
+    "08_trivariate_growth_by_state.png",
+]
+
+
+def _update_stage(dataset, raw):
+    # Biometric and demographic updates run clean, monthly, features and
+    # flags in one script; they do not depend on the enrolment stages.
+    return {
+        "script": "06_update_datasets.py",
+        "deps": [],
+        # Every shard of a sharded source is an input, so adding or
+        # replacing one reruns the stage.
+        "inputs": lambda p: shards(p["input"] or raw),
+        "outputs": [
+            _data(f"{dataset}_cleaned.parquet"),
+            _data(f"{dataset}_monthly.parquet"),
+            _data(f"{dataset}_features.parquet"),
+            _data(f"{dataset}_district_monthly.parquet"),
+            _data(f"{dataset}_state_monthly.parquet"),
+            _data(f"{dataset}_pincode_summary.parquet"),
+            _output(f"{dataset}_flagged.parquet"),
+        ],
+        "params": {
+            "dataset": dataset,
+            "input": None,
+            "z_threshold": 2.5,
+            "contamination": 0.05,
+            "reject_limits": None,
+            "reject_duplicates": False,
+            "csv": False,
+        },
+    }
+
+
+# Each stage declares the script it runs, its upstream stages, the files it
+# reads and writes, and the parameters passed to it as command-line flags.
+# deps and inputs may depend on the parameters, e.g. a streaming merge reads
+# the raw file directly and does not need the load stage.
+STAGES = {
+    "load": {
+        "script": "01_load_and_clean.py",
+        "deps": [],
+        "inputs": lambda p: shards(p["input"] or RAW_ENROLMENT),
+        "outputs": [_data("enrolment_cleaned.parquet"), _data("enrolment_sketches.npz")],
+        "params": {"input": None, "reject_limits": None, "reject_duplicates": False, "csv": False},
+    },
+    "merge": {
+        "script": "02_merge_datasets.py",
+        "deps": lambda p: (
+            ([] if p["stream"] or p["incremental"] else ["load"])
+            + (["biometric", "demographic"] if p["join"] else [])
+        ),
+        "inputs": lambda p: (
+            shards(p["input"] or RAW_ENROLMENT) if p["stream"] or p["incremental"]
+            else [_data("enrolment_cleaned.parquet")]
+        ) + (
+            [_data("biometric_monthly.parquet"), _data("demographic_monthly.parquet")] if p["join"] else []
+        ),
+        "outputs": lambda p: [_data("enrolment_monthly.parquet"), _data("monthly_delta.parquet")] + (
+            [_data("monthly_facts.parquet")] if p["join"] else []
+        ) + ([_data("enrolment_sketches.npz")] if p["stream"] or p["incremental"] else []),
+        "params": {
+            "stream": False,
+            "incremental": False,
+            "input": None,
+            "chunksize": 1_000_000,
+            "join": True,
+            "reject_limits": None,
+            "reject_duplicates": False,
+            "partitions": None,
+            "workers": None,
+            "csv": False,
+        },
+    },
+    "features": {
+        "script": "03_feature_engineering.py",
+        "deps": ["merge"],
+        "inputs": [_data("enrolment_monthly.parquet"), _data("monthly_delta.parquet")],
+        "outputs": [
+            _data("enrolment_features.parquet"),
+            _data("features_delta.parquet"),
+            _data(os.path.join("enrolment_cube", "meta.json")),
+        ],
+        "params": {"incremental": False, "partitions": None, "workers": None, "csv": False},
+    },
+    "analysis": {
+        "script": "04_analysis.py",
+        "deps": ["features"],
+        "inputs": [_data("enrolment_features.parquet"), _data(os.path.join("enrolment_cube", "meta.json"))],
+        "outputs": lambda p: (
+            [_output(os.path.join("chart_data", name.replace(".png", ".json"))) for name in CHARTS]
+            if p["data_only"] else [_output(name) for name in CHARTS]
+        ),
+        "params": {"dpi": 300, "workers": None, "data_only": False},
+    },
+    "ml": {
+        "script": "05_ml_analysis.py",
+        "deps": ["features"],
+        "inputs": [_data("enrolment_features.parquet"), _data("features_delta.parquet")],
+        "outputs": [
+            _output("flagged_records.parquet"),
+            _data("anomaly_scores.parquet"),
+            _data("pincode_demand.parquet"),
+            _data("isolation_forest.joblib"),
+            _data("zscore_stats.npz"),
+        ],
+        "params": {
+            "incremental": False,
+            "z_threshold": 2.5,
+            "zscore_decay": None,
+            "contamination": 0.05,
+            "refit": False,
+            "score_only": False,
+            "refit_days": 30,
+            "sample_size": None,
+            "batch_size": 50_000,
+            "jobs": None,
+            "partitions": None,
+            "workers": None,
+            "csv": False,
+        },
+    },
+    # Grids are comma-separated values; None sweeps the defaults in sweep.py.
+    "sweep": {
+        "script": "10_threshold_sweep.py",
+        "deps": ["ml"],
+        "inputs": [
+            _data("enrolment_features.parquet"),
+            _data("anomaly_scores.parquet"),
+            _data("pincode_demand.parquet"),
+            _data("zscore_stats.npz"),
+            _data("isolation_forest.joblib"),
+        ],
+        "outputs": [
+            _output("threshold_sweep.parquet"),
+            _output("detector_sweep.parquet"),
+            _output("detector_overlap.parquet"),
+        ],
+        "params": {
+            "z_threshold": None,
+            "contamination": None,
+            "risk_growth_above": None,
+            "risk_growth_below": None,
+            "demand_quantile": None,
+            "spike_growth": None,
+            "drop_growth": None,
+            "csv": False,
+        },
+    },
+    "forecast": {
+        "script": "08_forecast.py",
+        "deps": ["features"],
+        "inputs": [_data("enrolment_features.parquet"), _data(os.path.join("enrolment_cube", "meta.json"))],
+        "outputs": [
+            _output("enrolment_forecast.parquet"),
+            _output("forecast_accuracy.parquet"),
+            _output("forecast_district_accuracy.parquet"),
+        ],
+        "params": {"horizon": 3, "model": "auto", "min_train": 3, "csv": False},
+    },
+    "biometric": _update_stage("biometric", RAW_BIOMETRIC),
+    "demographic": _update_stage("demographic", RAW_DEMOGRAPHIC),
+    # Transaction logs are not part of the public data; without one the
+    # stage has nothing to write and stays up to date until a log appears.
+    "devices": {
+        "script": "09_device_performance.py",
+        "deps": [],
+        "inputs": lambda p: [p["input"] or RAW_DEVICE_LOGS],
+        "outputs": lambda p: [
+            _data("device_daily.parquet"),
+            _output("device_monthly.parquet"),
+            _output("device_performance_top.csv"),
+        ] if os.path.exists(p["input"] or RAW_DEVICE_LOGS) else [],
+        "params": {"input": None, "chunksize": 1_000_000, "top": 10, "confidence": 0.95, "csv": False},
+    },
+    # Like devices: without a centroid file the stage has nothing to write.
+    "hotspots": {
+        "script": "11_spatial_hotspots.py",
+        "deps": ["ml"],
+        "inputs": lambda p: [
+            p["centroids"] or PINCODE_CENTROIDS, _data("enrolment_features.parquet"),
+            _data(os.path.join("enrolment_cube", "meta.json")), _output("flagged_records.parquet"),
+        ],
+        "outputs": lambda p: [
+            _output("pincode_hotspots.parquet"),
+            _output("hotspot_clusters.parquet"),
+        ] if os.path.exists(p["centroids"] or PINCODE_CENTROIDS) else [],
+        "params": {
+            "centroids": None,
+            "radius_km": 10.0,
+            "neighbours": 5,
+            "alpha": 0.05,
+            "min_cluster": 3,
+            "csv": False,
+        },
+    },
+    "export": {
+        "script": "07_export_dashboard.py",
+        "deps": ["ml", "forecast", "biometric", "demographic"],
+        "inputs": [
+            _data("enrolment_features.parquet"),
+            _output("flagged_records.parquet"),
+            _output("enrolment_forecast.parquet"),
+            _output("forecast_district_accuracy.parquet"),
+        ] + [
+            path
+            for dataset in ("biometric", "demographic")
+            for path in (
+                _data(f"{dataset}_cleaned.parquet"),
+                _data(f"{dataset}_features.parquet"),
+                _data(f"{dataset}_pincode_summary.parquet"),
+                _output(f"{dataset}_flagged.parquet"),
+            )
+        ],
+        "outputs": [os.path.join(EXPORT_DIR, "manifest.json")],
+        "params": {},
+    },
+    "verify": {
+        "script": "verify_pipeline.py",
+        "deps": ["analysis", "ml", "sweep", "forecast", "biometric", "demographic", "export"],
+        "inputs": [
+            _data("enrolment_monthly.parquet"),
+            _data("enrolment_features.parquet"),
+            _output("flagged_records.parquet"),
+            _output("threshold_sweep.parquet"),
+            _output("biometric_flagged.parquet"),
+            _output("demographic_flagged.parquet"),
+        ] + [_output(name) for name in CHARTS],
+        "outputs": [],
+        "params": {},
+    },
+}
+
+
+def _resolve(value, params):
+    return value(params) if callable(value) else value
+
+
+def _parse_value(text):
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def stage_params(overrides):
+    params = {name: dict(stage["params"]) for name, stage in STAGES.items()}
+    for item in overrides:
+        key, _, value = item.partition("=")
+        stage, _, param = key.partition(".")
+        if stage not in params or param not in params[stage]:
+            raise SystemExit(f"Unknown stage parameter: {key}")
+        params[stage][param] = _parse_value(value)
+    return params
+
+
+def plan(targets, params):
+    order = []
+
+    def visit(name):
+        if name in order:
+            return
+        for dep in _resolve(STAGES[name]["deps"], params[name]):
+            visit(dep)
+        order.append(name)
+
+    for name in targets or STAGES:
+        if name not in STAGES:
+            raise SystemExit(f"Unknown stage: {name}")
+        visit(name)
+    return order
+
+
+def _argv(params):
+    argv = []
+    for key, value in params.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv += [flag, str(value)]
+    return argv
+
+
+def file_digest(path, known):
+    # Content hashes are reused while a file's size and mtime are unchanged,
+    # so a cache-hit run never re-reads large inputs.
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    entry = known.get(path)
+    if entry and entry[:2] == signature:
+        return entry[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    known[path] = signature + [digest.hexdigest()]
+    return known[path][2]
+
+
+_imported = {}
+
+
+def _imports(path):
+    # Package modules a file imports anywhere in it, lazy imports included;
+    # parsed once per file version.
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if _imported.get(path, (None,))[0] != signature:
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == "uidai_pipeline":
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and (node.module or "").startswith("uidai_pipeline."):
+                names.add(node.module.split(".")[1])
+            elif isinstance(node, ast.Import):
+                names.update(
+                    alias.name.split(".")[1] for alias in node.names if alias.name.startswith("uidai_pipeline.")
+                )
+        _imported[path] = (signature, sorted(names))
+    return _imported[path][1]
+
+
+def code_files(script):
+    # The stage script and every package module it reaches through imports,
+    # so editing a helper reruns only the stages that use it.
+    found = {script, os.path.join(PACKAGE_DIR, "__init__.py")}
+    pending = [script]
+    while pending:
+        for name in _imports(pending.pop()):
+            path = os.path.join(PACKAGE_DIR, f"{name}.py")
+            if path not in found and os.path.exists(path):
+                found.add(path)
+                pending.append(path)
+    return sorted(found)
+
+
+def fingerprint(name, params, known):
+    stage = STAGES[name]
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    code = code_files(os.path.join(SRC_DIR, stage["script"]))
+    for path in code + _resolve(stage["inputs"], params):
+        digest.update(path.encode())
+        digest.update(file_digest(path, known).encode() if os.path.exists(path) else b"missing")
+    return digest.hexdigest()
+
+
+def load_cache():
+    if not os.path.exists(CACHE_PATH):
+        return {"stages": {}, "files": {}}
+    with open(CACHE_PATH) as f:
+        return json.load(f)
+
+
+def save_cache(cache):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(CACHE_PATH, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def is_fresh(name, params, cache):
+    outputs = _resolve(STAGES[name]["outputs"], params)
+    return (
+        cache["stages"].get(name) == fingerprint(name, params, cache["files"])
+        and all(map(os.path.exists, outputs))
+    )
+
+
+def _start_manifest(run_id, targets, params):
+    # Stages skipped as up to date keep their entry from the run that
+    # produced their outputs; each entry carries the run_id it came from.
+    manifest = instrument.load_manifest()
+    manifest["run"] = {
+        "run_id": run_id,
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "targets": list(targets),
+        "params": params,
+        "ran": [],
+        "skipped": [],
+    }
+    instrument.save_manifest(manifest)
+
+
+def _note_stage(name, outcome, returncode=0):
+    # A stage that exited non-zero fails the run; if its own record still
+    # says "ok" (sys.exit, or a SystemExit raised outside instrument.fail),
+    # it is marked failed here from the exit code.
+    manifest = instrument.load_manifest()
+    manifest["run"][outcome].append(name)
+    if returncode:
+        manifest["run"]["failed"] = name
+        record = manifest["stages"].get(name)
+        if record and record["run_id"] == manifest["run"]["run_id"] and record["status"] == "ok":
+            record["status"] = "error"
+            record["error"] = f"exit code {returncode}"
+    instrument.save_manifest(manifest)
+
+
+def run(targets=(), overrides=(), force=False, quiet=False, profile=False):
+    params = stage_params(overrides)
+    cache = load_cache()
+    run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    env = dict(os.environ, UIDAI_RUN_ID=run_id)
+    if profile:
+        env["UIDAI_PROFILE"] = "1"
+    _start_manifest(run_id, targets, params)
+
+    for name in plan(targets, params):
+        if not force and is_fresh(name, params[name], cache):
+            print(f"[{name}] up to date, skipped")
+            _note_stage(name, "skipped")
+            continue
+        stamp = fingerprint(name, params[name], cache["files"])
+
+        stage = STAGES[name]
+        command = [sys.executable, stage["script"]] + _argv(params[name])
+        print(f"[{name}] running {' '.join(command[1:])}")
+        started = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL if quiet else None
+        )
+        _note_stage(name, "ran", result.returncode)
+        if result.returncode != 0:
+            save_cache(cache)
+            raise SystemExit(f"[{name}] failed with exit code {result.returncode}")
+        print(f"[{name}] finished in {time.perf_counter() - started:.2f}s")
+
+        cache["stages"][name] = stamp
+        save_cache(cache)
+
+
+def status(overrides=()):
+    params = stage_params(overrides)
+    cache = load_cache()
+    for name in STAGES:
+        state = "up to date" if is_fresh(name, params[name], cache) else "stale"
+        print(f"{name:<10} {STAGES[name]['script']:<28} {state}")
+    save_cache(cache)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uidai_pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run stages whose inputs or parameters changed")
+    run_parser.add_argument("stages", nargs="*", help="target stages (default: all)")
+    run_parser.add_argument("--set", dest="overrides", action="append", default=[],
+                            metavar="STAGE.PARAM=VALUE", help="override a stage parameter")
+    run_parser.add_argument("--force", action="store_true", help="ignore cached fingerprints")
+    run_parser.add_argument("--quiet", action="store_true", help="hide stage output")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="write a cProfile dump per stage to outputs/profiles/")
+    run_parser.add_argument("--partitions", type=int, default=None,
+                            help="run the state-partitioned stages on this many partitions in parallel")
+
+    status_parser = commands.add_parser("status", help="show which stages are up to date")
+    status_parser.add_argument("--set", dest="overrides", action="append", default=[],
+                               metavar="STAGE.PARAM=VALUE")
+
+    synth_parser = commands.add_parser("synth", help="generate a synthetic dataset")
+    synth_parser.add_argument("--out", required=True, help="output directory")
+    synth_parser.add_argument("--rows", type=int, default=1_000_000, help="rows per dataset")
+    synth_parser.add_argument("--pincodes", type=int, default=19_000)
+    synth_parser.add_argument("--states", type=int, default=36)
+    synth_parser.add_argument("--months", type=int, default=12)
+    synth_parser.add_argument("--start", default="2025-01-01")
+    synth_parser.add_argument("--seed", type=int, default=0)
+    synth_parser.add_argument("--spike-fraction", type=float, default=0.01)
+    synth_parser.add_argument("--duplicate-fraction", type=float, default=0.005)
+    synth_parser.add_argument("--dirty-fraction", type=float, default=0.0)
+    synth_parser.add_argument("--device-rows", type=int, default=0,
+                              help="also write a device transaction log with this many rows")
+
+    serve_parser = commands.add_parser("serve", help="answer dashboard aggregate queries over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--cache-size", type=int, default=512, help="query results kept in the LRU cache")
+
+    top_parser = commands.add_parser("top", help="top keys and distinct pincodes from the enrolment sketches")
+    top_parser.add_argument("--level", default="district", choices=["pincode", "district", "state", "pincode_month"])
+    top_parser.add_argument("-k", type=int, default=10, help="keys to list")
+    top_parser.add_argument("--distinct", default="state", choices=["state", "state_month", "total"],
+                            help="grouping of the distinct pincode estimates")
+
+    bench_parser = commands.add_parser("bench", help="time stages on synthetic data at several scales")
+    bench_parser.add_argument("--scales", default="100000,1000000",
+                              help="comma-separated row counts")
+    bench_parser.add_argument(
+        "--stages",
+        default="load,merge,features,analysis,ml,sweep,hotspots,forecast,biometric,demographic,devices",
+    )
+    bench_parser.add_argument("--pincodes", type=int, default=19_000)
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--set", dest="overrides", action="append", default=[],
+                              metavar="STAGE.PARAM=VALUE")
+    bench_parser.add_argument("--results", default=None, help="JSON-lines file to append results to")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        overrides = args.overrides
+        if args.partitions:
+            overrides = [
+                f"{name}.partitions={args.partitions}" for name, stage in STAGES.items()
+                if "partitions" in stage["params"]
+            ] + overrides
+        run(args.stages, overrides, force=args.force, quiet=args.quiet, profile=args.profile)
+    elif args.command == "status":
+        status(args.overrides)
+    elif args.command == "synth":
+        from uidai_pipeline import synth
+
+        meta = synth.generate_all(
+            args.out, args.rows, pincodes=args.pincodes, states=args.states, start=args.start,
+            months=args.months, seed=args.seed, spike_fraction=args.spike_fraction,
+            duplicate_fraction=args.duplicate_fraction, dirty_fraction=args.dirty_fraction,
+            device_rows=args.device_rows,
+        )
+        print(json.dumps(meta, indent=2))
+    elif args.command == "serve":
+        from uidai_pipeline import service
+
+        service.serve(args.host, args.port, cache_size=args.cache_size)
+    elif args.command == "top":
+        from uidai_pipeline import sketch
+
+        sketch.report(args.level, args.k, args.distinct)
+    else:
+        from uidai_pipeline import bench
+
+        bench.bench(
+            [int(rows) for rows in args.scales.split(",")],
+            stages=args.stages.split(","),
+            pincodes=args.pincodes,
+            seed=args.seed,
+            overrides=args.overrides,
+            results_path=args.results or bench.RESULTS_PATH,
+        )
@@ -0,0 +1,236 @@
+import collections
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import cube, ingest, store, updates
+
+# A local HTTP service that answers the dashboard's small aggregate queries
+# (top districts of a state, the monthly series of one pincode) from cubes
+# held in memory, instead of each page fetching whole views. The enrolment
+# cube is memory-mapped from what 03_feature_engineering.py saved; update
+# datasets are cubed from their features tables on load. Results sit in an
+# LRU cache keyed by the normalized query. Every request stats the artifacts
+# the cubes came from, and when a pipeline run has replaced any of them the
+# cubes are reloaded and the cache emptied.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 512
+GROUPS = ["state", "district", "pincode", "month"]
+
+
+def sources():
+    # Dataset name -> (artifact to watch, loader returning a cube or None).
+    datasets = {"enrolment": (cube.META_PATH, cube.load)}
+    for dataset in ingest.UPDATE_DATASETS:
+        name = f"{dataset}_features"
+        datasets[dataset] = (
+            store.path(name),
+            lambda name=name: cube.build(store.read(name), updates.VALUE) if store.exists(name) else None,
+        )
+    return datasets
+
+
+def _signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def _codes(labels, values):
+    # Codes of the requested labels, matched on the whole label (a longer
+    # value is not cut to the width of the cube's string labels); unknown
+    # labels match nothing.
+    codes = pd.Index(np.asarray(labels)).get_indexer(list(values))
+    return codes[codes >= 0]
+
+
+def _month_columns(data, start, end):
+    months = cube.month_index(data)
+    keep = np.ones(len(months), dtype=bool)
+    if start:
+        keep &= months >= pd.Timestamp(start)
+    if end:
+        keep &= months <= pd.Timestamp(end)
+    return np.flatnonzero(keep)
+
+
+def aggregate(data, state=(), district=(), pincode=(), start=None, end=None, group="state", top=None):
+    # Totals per `group` over the cube rows matching every filter and the
+    # months in [start, end], largest first (months in calendar order).
+    rows = np.ones(len(data["counts"]), dtype=bool)
+    for level, values in (("state", state), ("district", district), ("pincode", pincode)):
+        if values:
+            codes = _codes(data[cube.LABELS[level]], values)
+            rows &= np.isin(data[cube.LEVELS[level]], codes)
+    columns = _month_columns(data, start, end)
+    counts = np.asarray(data["counts"])[np.ix_(rows, columns)]
+    present = np.asarray(data["present"])[np.ix_(rows, columns)]
+
+    if group == "month":
+        labels = [str(month.date()) for month in cube.month_index(data)[columns]]
+        totals, cells = counts.sum(axis=0), present.sum(axis=0)
+        order = np.arange(len(labels))
+    else:
+        codes = data[cube.LEVELS[group]][rows]
+        size = len(data[cube.LABELS[group]])
+        totals = np.bincount(codes, weights=counts.sum(axis=1), minlength=size)
+        cells = np.bincount(codes, weights=present.sum(axis=1), minlength=size)
+        labels = data[cube.LABELS[group]]
+        observed = np.flatnonzero(cells > 0)
+        order = observed[np.argsort(-totals[observed], kind="stable")]
+    if top:
+        order = order[:top]
+    return [
+        {group: labels[i].item() if isinstance(labels[i], np.generic) else labels[i],
+         data["value"]: int(round(totals[i])), "cells": int(cells[i])}
+        for i in order
+    ]
+
+
+def parse_query(params):
+    # Query-string parameters -> a hashable, normalized query; repeated or
+    # comma-separated filter values are sorted so equal queries share a key.
+    def values(name, kind=str):
+        items = [item for value in params.get(name, []) for item in value.split(",") if item]
+        return tuple(sorted(kind(item) for item in items))
+
+    group = params.get("group", ["state"])[0]
+    if group not in GROUPS:
+        raise ValueError(f"group must be one of {GROUPS}")
+    top = params.get("top", [None])[0]
+    if top and int(top) < 0:
+        raise ValueError("top must not be negative")
+    return (
+        ("dataset", params.get("dataset", ["enrolment"])[0]),
+        ("state", values("state")),
+        ("district", values("district")),
+        ("pincode", values("pincode", int)),
+        ("start", params.get("start", [None])[0]),
+        ("end", params.get("end", [None])[0]),
+        ("group", group),
+        ("top", int(top) if top else None),
+    )
+
+
+class QueryService:
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, datasets=None):
+        self.datasets = datasets or sources()
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.signature = None
+        self.cubes = {}
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def refresh(self):
+        # Reloads every cube when any watched artifact changed since the
+        # last load; cheap enough (one stat per dataset) to run per request.
+        signature = _signature(path for path, _ in self.datasets.values())
+        if signature == self.signature:
+            return
+        cubes = {name: load() for name, (_, load) in self.datasets.items()}
+        self.cubes = {name: data for name, data in cubes.items() if data is not None}
+        self.cache.clear()
+        self.signature = signature
+        self.stats["reloads"] += 1
+
+    def query(self, key):
+        with self.lock:
+            self.refresh()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.cache[key], True
+            self.stats["misses"] += 1
+            signature = self.signature
+            arguments = dict(key)
+            data = self.cubes.get(arguments.pop("dataset"))
+        if data is None:
+            raise LookupError(f"Dataset {dict(key)['dataset']} has not been built")
+        result = aggregate(data, **arguments)
+        with self.lock:
+            # Not cached if the cubes were reloaded while it was computed.
+            if self.signature != signature:
+                return result, False
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result, False
+
+    def meta(self):
+        with self.lock:
+            self.refresh()
+            return {
+                "datasets": {
+                    name: {
+                        "value": data["value"],
+                        "months": [str(month.date()) for month in cube.month_index(data)],
+                        "states": [str(state) for state in data["states"]],
+                        "rows": int(len(data["counts"])),
+                    }
+                    for name, data in self.cubes.items()
+                },
+                "cache": dict(self.stats, size=len(self.cache), capacity=self.cache_size),
+            }
+
+
+def _handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            # The dashboard dev server runs on another port.
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                if url.path == "/api/query":
+                    started = time.perf_counter()
+                    rows, cached = service.query(parse_query(parse_qs(url.query)))
+                    self._send(200, {
+                        "rows": rows, "cached": cached,
+                        "ms": round((time.perf_counter() - started) * 1000, 3),
+                    })
+                elif url.path == "/api/meta":
+                    self._send(200, service.meta())
+                else:
+                    self._send(404, {"error": f"Unknown endpoint {url.path}"})
+            except (ValueError, LookupError) as error:
+                self._send(400, {"error": str(error)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=DEFAULT_CACHE_SIZE):
+    service = QueryService(cache_size)
+    service.refresh()
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    print(f"Serving {sorted(service.cubes)} on http://{host}:{port}/api/query "
+          f"(cache of {cache_size} results)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
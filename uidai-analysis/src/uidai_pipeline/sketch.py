@@ -0,0 +1,251 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import instrument, store
+
+# Fixed-size summaries of the enrolment feed, folded in as rows are
+# ingested and kept between runs, so top-k and distinct-count reports need
+# neither the monthly tables nor a groupby.
+#
+# Per level (pincode, district, state, pincode-month) there is a weighted
+# SpaceSaving summary of at most `capacity` keys and a Count-Min sketch.
+# SpaceSaving counts overestimate by at most their error term, and a key
+# missing from the summary has at most `floor`; Count-Min also only
+# overestimates, so reports take the smaller of the two. HyperLogLog
+# registers per (state, month) estimate distinct pincodes, within about
+# 1.04 / sqrt(2 ** HLL_PRECISION), i.e. 1.6%; unions over months or states
+# are register maxima. Every part is mergeable (SpaceSaving by the
+# mergeable-summaries rule, Count-Min by addition, HyperLogLog by maximum),
+# so shards, partitions or daily batches can be sketched apart and merged.
+# Below `capacity` distinct keys a level is exact.
+
+SKETCH_PATH = os.path.join(store.DATA_DIR, "enrolment_sketches.npz")
+VALUE = "total_enrolments"
+LEVELS = {
+    "pincode": ["pincode"],
+    "district": ["district"],
+    "state": ["state"],
+    "pincode_month": ["month", "pincode"],
+}
+DEFAULT_CAPACITY = 1024
+CMS_DEPTH = 4
+CMS_WIDTH_BITS = 14
+HLL_PRECISION = 12
+# Odd multipliers for the multiply-shift row hashes of the Count-Min sketch.
+CMS_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93], dtype=np.uint64
+)
+
+
+def empty(capacity=DEFAULT_CAPACITY):
+    sketches = {"capacity": np.int64(capacity), "rows": np.int64(0), "total": np.int64(0)}
+    for level in LEVELS:
+        sketches[f"{level}.keys"] = np.empty(0, dtype=str)
+        sketches[f"{level}.counts"] = np.empty(0, dtype=np.int64)
+        sketches[f"{level}.errors"] = np.empty(0, dtype=np.int64)
+        sketches[f"{level}.floor"] = np.int64(0)
+        sketches[f"{level}.cms"] = np.zeros((CMS_DEPTH, 1 << CMS_WIDTH_BITS), dtype=np.int64)
+    sketches["hll.groups"] = np.empty(0, dtype=str)
+    sketches["hll.registers"] = np.zeros((0, 1 << HLL_PRECISION), dtype=np.uint8)
+    return sketches
+
+
+def load(path=SKETCH_PATH):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+def save(sketches, path=SKETCH_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temporary, **sketches)
+    os.replace(temporary, path)
+
+
+def _hash(labels):
+    return pd.util.hash_array(np.asarray(labels, dtype=object))
+
+
+def _cms_columns(hashes):
+    return [(hashes * multiplier) >> np.uint64(64 - CMS_WIDTH_BITS) for multiplier in CMS_MULTIPLIERS]
+
+
+def _level_keys(df, level):
+    # Exact sums of the batch per key of `level`, labelled as strings.
+    columns = LEVELS[level]
+    sums = df.groupby(columns, observed=True, sort=False)[VALUE].sum()
+    if level == "pincode_month":
+        months = sums.index.get_level_values("month")
+        pincodes = sums.index.get_level_values("pincode")
+        labels = months.strftime("%Y-%m").astype(str) + "|" + pincodes.astype(str)
+    else:
+        labels = sums.index.astype(str)
+    return np.asarray(labels, dtype=str), sums.to_numpy(np.int64)
+
+
+def _lookup(keys, values, wanted, missing):
+    positions = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+    found = keys[positions] == wanted if len(keys) else np.zeros(len(wanted), dtype=bool)
+    return np.where(found, values[positions] if len(keys) else 0, missing)
+
+
+def _merge_summary(a, b, capacity):
+    # a and b are (keys sorted, counts, errors, floor). A key absent from a
+    # summary counts at that summary's floor, in both count and error; the
+    # `capacity` largest counts are kept and the rest bounded by the new
+    # floor, the smallest kept count.
+    keys = np.union1d(a[0], b[0])
+    counts = _lookup(a[0], a[1], keys, a[3]) + _lookup(b[0], b[1], keys, b[3])
+    errors = _lookup(a[0], a[2], keys, a[3]) + _lookup(b[0], b[2], keys, b[3])
+    floor = a[3] + b[3]
+    if len(keys) > capacity:
+        keep = np.sort(np.argsort(-counts, kind="stable")[:capacity])
+        dropped = np.ones(len(keys), dtype=bool)
+        dropped[keep] = False
+        floor = max(floor, counts[dropped].max())
+        keys, counts, errors = keys[keep], counts[keep], errors[keep]
+    return keys, counts, errors, np.int64(floor)
+
+
+def _clz(values):
+    # Leading zero bits of uint64 values.
+    smeared = values.copy()
+    for shift in (1, 2, 4, 8, 16, 32):
+        smeared |= smeared >> np.uint64(shift)
+    return 64 - np.bitwise_count(smeared).astype(np.int64)
+
+
+def _hll_registers(df):
+    # HyperLogLog registers of the batch's pincodes per (state, month).
+    groups = (df["state"].astype(str) + "|" + df["month"].dt.strftime("%Y-%m").astype(str)).to_numpy(str)
+    labels, group = np.unique(groups, return_inverse=True)
+    hashes = pd.util.hash_array(df["pincode"].to_numpy(np.int64))
+    bucket = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(_clz(rest) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    registers = np.zeros(len(labels) * (1 << HLL_PRECISION), dtype=np.uint8)
+    np.maximum.at(registers, group * (1 << HLL_PRECISION) + bucket, rank)
+    return labels, registers.reshape(len(labels), 1 << HLL_PRECISION)
+
+
+def _merge_registers(a_groups, a_registers, b_groups, b_registers):
+    groups = np.union1d(a_groups, b_groups)
+    registers = np.zeros((len(groups), 1 << HLL_PRECISION), dtype=np.uint8)
+    for labels, values in ((a_groups, a_registers), (b_groups, b_registers)):
+        rows = np.searchsorted(groups, labels)
+        registers[rows] = np.maximum(registers[rows], values)
+    return groups, registers
+
+
+def merge(a, b):
+    capacity = int(min(a["capacity"], b["capacity"]))
+    merged = {"capacity": np.int64(capacity), "rows": a["rows"] + b["rows"], "total": a["total"] + b["total"]}
+    for level in LEVELS:
+        parts = [
+            (sketches[f"{level}.keys"], sketches[f"{level}.counts"], sketches[f"{level}.errors"],
+             sketches[f"{level}.floor"])
+            for sketches in (a, b)
+        ]
+        keys, counts, errors, floor = _merge_summary(*parts, capacity)
+        merged.update({
+            f"{level}.keys": keys, f"{level}.counts": counts, f"{level}.errors": errors, f"{level}.floor": floor,
+            f"{level}.cms": a[f"{level}.cms"] + b[f"{level}.cms"],
+        })
+    merged["hll.groups"], merged["hll.registers"] = _merge_registers(
+        a["hll.groups"], a["hll.registers"], b["hll.groups"], b["hll.registers"]
+    )
+    return merged
+
+
+def sketch(df, capacity=DEFAULT_CAPACITY):
+    # Sketches of one batch of cleaned rows (date or month, state,
+    # district, pincode, total_enrolments).
+    if "month" not in df:
+        df = df.assign(month=df["date"].dt.to_period("M").dt.to_timestamp())
+    batch = empty(capacity)
+    batch["rows"] = np.int64(len(df))
+    batch["total"] = np.int64(df[VALUE].sum())
+    with instrument.step("sketch"):
+        for level in LEVELS:
+            labels, sums = _level_keys(df, level)
+            order = np.argsort(labels, kind="stable")
+            exact = (labels[order], sums[order], np.zeros(len(labels), dtype=np.int64), np.int64(0))
+            empty_summary = (batch[f"{level}.keys"], batch[f"{level}.counts"], batch[f"{level}.errors"],
+                             np.int64(0))
+            keys, counts, errors, floor = _merge_summary(empty_summary, exact, capacity)
+            batch.update({f"{level}.keys": keys, f"{level}.counts": counts, f"{level}.errors": errors,
+                          f"{level}.floor": floor})
+            cms = batch[f"{level}.cms"]
+            for row, columns in enumerate(_cms_columns(_hash(labels))):
+                np.add.at(cms[row], columns.astype(np.int64), sums)
+        batch["hll.groups"], batch["hll.registers"] = _hll_registers(df)
+    return batch
+
+
+def update(sketches, df):
+    return merge(sketches, sketch(df, int(sketches["capacity"])))
+
+
+def point(sketches, level, labels):
+    # Count-Min estimate of each key's total; never below the true total.
+    cms = sketches[f"{level}.cms"]
+    columns = _cms_columns(_hash(labels))
+    return np.min([cms[row][column.astype(np.int64)] for row, column in enumerate(columns)], axis=0)
+
+
+def top(sketches, level, k=10):
+    # The k largest keys of a level: an upper estimate (the smaller of the
+    # SpaceSaving and Count-Min counts) and a guaranteed lower bound.
+    keys = sketches[f"{level}.keys"]
+    counts = np.minimum(sketches[f"{level}.counts"], point(sketches, level, keys)) if len(keys) else np.empty(0)
+    lower = sketches[f"{level}.counts"] - sketches[f"{level}.errors"]
+    order = np.argsort(-counts, kind="stable")[:k]
+    return pd.DataFrame({
+        level: keys[order],
+        VALUE: counts[order].astype(np.int64),
+        "lower_bound": lower[order],
+        "exact": (sketches[f"{level}.errors"][order] == 0) & (sketches[f"{level}.floor"] == 0),
+    })
+
+
+def _estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    harmonic = np.sum(np.power(2.0, -registers.astype(np.float64)), axis=-1)
+    raw = alpha * m * m / harmonic
+    zeros = np.sum(registers == 0, axis=-1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def distinct(sketches, by="state_month"):
+    # Estimated distinct pincodes per (state, month), per state, or overall.
+    groups, registers = sketches["hll.groups"], sketches["hll.registers"]
+    split = pd.Series(groups, dtype=str).str.split("|", expand=True, regex=False) if len(groups) else None
+    if by == "total":
+        return float(_estimate(registers.max(axis=0))) if len(groups) else 0.0
+    if by == "state":
+        states = split[0].to_numpy()
+        labels = np.unique(states)
+        merged = np.stack([registers[states == state].max(axis=0) for state in labels]) if len(labels) else registers
+        return pd.Series(_estimate(merged), index=pd.Index(labels, name="state"), name="pincodes")
+    index = pd.MultiIndex.from_arrays([split[0], pd.to_datetime(split[1])], names=["state", "month"])
+    return pd.Series(_estimate(registers), index=index, name="pincodes")
+
+
+def report(level="district", k=10, by="state", path=SKETCH_PATH):
+    sketches = load(path)
+    if sketches is None:
+        print(f"No sketches at {path}; run the load stage or a streaming merge first")
+        return
+    print(f"Top {k} by {level} ({int(sketches['total'])} enrolments sketched, "
+          f"absent keys at most {int(sketches[f'{level}.floor'])}):")
+    print(top(sketches, level, k).to_string(index=False))
+    estimates = distinct(sketches, by)
+    print("\nDistinct pincodes (HyperLogLog estimate):")
+    print(round(estimates) if by == "total" else estimates.round().astype(int).to_string())
@@ -0,0 +1,306 @@
+import datetime
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from uidai_pipeline import ingest, instrument
+from uidai_pipeline.paths import DATA_DIR, OUTPUT_DIR
+
+ROW_GROUP_SIZE = 1 << 18
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+_MONTHLY_FIELDS = [
+    ("month", pa.date32()),
+    ("state", _CATEGORY),
+    ("district", _CATEGORY),
+    ("pincode", pa.int32()),
+    ("total_enrolments", pa.int32()),
+]
+
+SCHEMAS = {
+    "enrolment_cleaned": pa.schema([
+        ("date", pa.date32()),
+        ("state", _CATEGORY),
+        ("district", _CATEGORY),
+        ("pincode", pa.int32()),
+        ("total_enrolments", pa.int32()),
+    ]),
+    "enrolment_monthly": pa.schema(_MONTHLY_FIELDS),
+    "enrolment_features": pa.schema(_MONTHLY_FIELDS + [
+        ("enrolments_mom_growth", pa.float64()),
+        ("rolling_3m_avg", pa.float64()),
+        ("enrolment_share_district", pa.float64()),
+        ("enrolment_share_state", pa.float64()),
+    ]),
+    "flagged_records": pa.schema(_MONTHLY_FIELDS + [
+        ("enrolments_mom_growth", pa.float64()),
+        ("demand_level", _CATEGORY),
+        ("risk_level", _CATEGORY),
+        ("flag_reason", pa.string()),
+    ]),
+    "monthly_delta": pa.schema(_MONTHLY_FIELDS[:4]),
+    "features_delta": pa.schema(_MONTHLY_FIELDS[:4]),
+    "anomaly_scores": pa.schema([
+        ("month", pa.date32()),
+        ("pincode", pa.int32()),
+        ("anomaly_score", pa.float64()),
+        ("anomaly_flag", pa.int8()),
+    ]),
+    "pincode_demand": pa.schema([
+        ("pincode", pa.int32()),
+        ("avg_enrolments", pa.float64()),
+        ("total_enrolments", pa.int64()),
+        ("num_months", pa.int32()),
+        ("avg_growth", pa.float64()),
+    ]),
+}
+SCHEMAS["flagged_delta"] = SCHEMAS["flagged_records"]
+_ACCURACY_FIELDS = [
+    ("abs_error", pa.float64()),
+    ("pct_error", pa.float64()),
+    ("points", pa.int32()),
+    ("pct_points", pa.int32()),
+    ("mae", pa.float64()),
+    ("mape", pa.float64()),
+]
+SCHEMAS["enrolment_forecast"] = pa.schema([
+    ("pincode", pa.int32()),
+    ("state", _CATEGORY),
+    ("district", _CATEGORY),
+    ("month", pa.date32()),
+    ("horizon", pa.int32()),
+    ("forecast", pa.float64()),
+    ("model", _CATEGORY),
+])
+SCHEMAS["forecast_accuracy"] = pa.schema([
+    ("pincode", pa.int32()),
+    ("state", _CATEGORY),
+    ("district", _CATEGORY),
+    ("model", _CATEGORY),
+    ("selected", pa.bool_()),
+] + _ACCURACY_FIELDS)
+SCHEMAS["forecast_district_accuracy"] = pa.schema([
+    ("state", _CATEGORY),
+    ("district", _CATEGORY),
+    ("model", _CATEGORY),
+    ("pincodes", pa.int32()),
+] + _ACCURACY_FIELDS)
+SCHEMAS["monthly_facts"] = pa.schema(_MONTHLY_FIELDS[:4] + [
+    ("total_enrolments", pa.int64()),
+    ("biometric_updates", pa.int64()),
+    ("demographic_updates", pa.int64()),
+    ("has_enrolment", pa.bool_()),
+    ("has_biometric", pa.bool_()),
+    ("has_demographic", pa.bool_()),
+    ("enrolment_month_covered", pa.bool_()),
+    ("biometric_month_covered", pa.bool_()),
+    ("demographic_month_covered", pa.bool_()),
+    ("biometric_per_enrolment", pa.float64()),
+    ("demographic_per_enrolment", pa.float64()),
+])
+_DEVICE_FIELDS = [
+    ("deviceproviderid", _CATEGORY),
+    ("modelid", _CATEGORY),
+    ("dev_level", _CATEGORY),
+    ("total_trans", pa.int64()),
+    ("success_trans", pa.int64()),
+    ("failed_trans", pa.int64()),
+    ("bio_failure", pa.int64()),
+    ("success_perc", pa.float64()),
+    ("failed_perc", pa.float64()),
+    ("bio_failure_perc", pa.float64()),
+    ("failed_ci_low", pa.float64()),
+    ("failed_ci_high", pa.float64()),
+    ("bio_ci_low", pa.float64()),
+    ("bio_ci_high", pa.float64()),
+]
+SCHEMAS["device_daily"] = pa.schema([("date", pa.date32()), ("state", _CATEGORY)] + _DEVICE_FIELDS)
+SCHEMAS["device_monthly"] = pa.schema([("month", pa.date32())] + _DEVICE_FIELDS)
+_SWEEP_COUNTS = [("state", _CATEGORY), ("district", _CATEGORY), ("flagged", pa.int64())]
+SCHEMAS["threshold_sweep"] = pa.schema([
+    ("contamination", pa.float64()),
+    ("risk_growth_above", pa.float64()),
+    ("risk_growth_below", pa.float64()),
+    ("demand_quantile", pa.float64()),
+] + _SWEEP_COUNTS)
+SCHEMAS["detector_sweep"] = pa.schema([("detector", _CATEGORY), ("threshold", pa.float64())] + _SWEEP_COUNTS)
+SCHEMAS["pincode_hotspots"] = pa.schema(_MONTHLY_FIELDS + [
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("neighbours", pa.int32()),
+    ("neighbourhood_enrolments", pa.int64()),
+    ("neighbourhood_growth", pa.float64()),
+    ("gi_star", pa.float64()),
+    ("gi_p", pa.float64()),
+    ("hotspot", _CATEGORY),
+    ("flagged", pa.bool_()),
+    ("cluster", pa.int32()),
+])
+SCHEMAS["hotspot_clusters"] = pa.schema([
+    ("month", pa.date32()),
+    ("cluster", pa.int32()),
+    ("state", _CATEGORY),
+    ("pincodes", pa.int32()),
+    ("hot_pincodes", pa.int32()),
+    ("total_enrolments", pa.int64()),
+    ("growth", pa.float64()),
+    ("mean_gi_star", pa.float64()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("radius_km", pa.float64()),
+])
+SCHEMAS["detector_overlap"] = pa.schema([
+    ("detector_a", _CATEGORY),
+    ("threshold_a", pa.float64()),
+    ("detector_b", _CATEGORY),
+    ("threshold_b", pa.float64()),
+    ("flagged_a", pa.int64()),
+    ("flagged_b", pa.int64()),
+    ("both", pa.int64()),
+    ("jaccard", pa.float64()),
+])
+
+
+def _update_schemas(dataset, counts):
+    keys = _MONTHLY_FIELDS[:4]
+    ages = [(column, pa.int32()) for column in counts]
+    rollup_values = [(column, pa.int64()) for column in counts] + [("total_updates", pa.int64())]
+    return {
+        f"{dataset}_cleaned": pa.schema(
+            [("date", pa.date32())] + keys[1:] + ages + [("total_updates", pa.int32())]
+        ),
+        f"{dataset}_monthly": pa.schema(keys + ages + [("total_updates", pa.int32())]),
+        f"{dataset}_features": pa.schema(keys + ages + [
+            ("total_updates", pa.int32()),
+            ("updates_mom_growth", pa.float64()),
+            ("rolling_3m_avg", pa.float64()),
+            ("update_share_district", pa.float64()),
+            ("update_share_state", pa.float64()),
+        ]),
+        f"{dataset}_district_monthly": pa.schema(keys[:3] + rollup_values + [
+            ("pincodes", pa.int32()),
+            ("updates_mom_growth", pa.float64()),
+        ]),
+        f"{dataset}_state_monthly": pa.schema(keys[:2] + rollup_values + [
+            ("districts", pa.int32()),
+            ("pincodes", pa.int32()),
+            ("updates_mom_growth", pa.float64()),
+        ]),
+        f"{dataset}_pincode_summary": pa.schema([
+            ("pincode", pa.int32()),
+            ("state", _CATEGORY),
+            ("district", _CATEGORY),
+            ("avg_updates", pa.float64()),
+            ("total_updates", pa.int64()),
+            ("num_months", pa.int32()),
+            ("avg_growth", pa.float64()),
+            ("volatility", pa.float64()),
+            ("spike_count", pa.int32()),
+            ("demand_level", _CATEGORY),
+            ("risk_level", _CATEGORY),
+        ]),
+        f"{dataset}_flagged": pa.schema(keys + [
+            ("total_updates", pa.int32()),
+            ("updates_mom_growth", pa.float64()),
+            ("demand_level", _CATEGORY),
+            ("risk_level", _CATEGORY),
+            ("flag_reason", pa.string()),
+        ]),
+    }
+
+
+for _dataset, _spec in ingest.UPDATE_DATASETS.items():
+    SCHEMAS.update(_update_schemas(_dataset, _spec["counts"]))
+
+LOCATIONS = {
+    "enrolment_cleaned": DATA_DIR,
+    "enrolment_monthly": DATA_DIR,
+    "enrolment_features": DATA_DIR,
+    "flagged_records": OUTPUT_DIR,
+    "monthly_delta": DATA_DIR,
+    "features_delta": DATA_DIR,
+    "anomaly_scores": DATA_DIR,
+    "pincode_demand": DATA_DIR,
+    "flagged_delta": OUTPUT_DIR,
+    "monthly_facts": DATA_DIR,
+    "enrolment_forecast": OUTPUT_DIR,
+    "forecast_accuracy": OUTPUT_DIR,
+    "forecast_district_accuracy": OUTPUT_DIR,
+    "device_daily": DATA_DIR,
+    "device_monthly": OUTPUT_DIR,
+    "threshold_sweep": OUTPUT_DIR,
+    "detector_sweep": OUTPUT_DIR,
+    "detector_overlap": OUTPUT_DIR,
+    "pincode_hotspots": OUTPUT_DIR,
+    "hotspot_clusters": OUTPUT_DIR,
+}
+for _name in SCHEMAS:
+    LOCATIONS.setdefault(_name, OUTPUT_DIR if _name.endswith("_flagged") else DATA_DIR)
+
+
+def path(name, ext="parquet"):
+    return os.path.join(LOCATIONS[name], f"{name}.{ext}")
+
+
+def exists(name):
+    return os.path.exists(path(name))
+
+
+def _date_column(name):
+    return "date" if "date" in SCHEMAS[name].names else "month"
+
+
+def _as_date(value):
+    return pd.Timestamp(value).date() if not isinstance(value, datetime.date) else value
+
+
+def to_table(df, name):
+    schema = SCHEMAS[name]
+    columns = {}
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_date32(field.type):
+            array = pa.array(pd.to_datetime(values), from_pandas=True).cast(field.type)
+        else:
+            if pa.types.is_dictionary(field.type):
+                values = values.astype("category").cat.as_unordered()
+            array = pa.array(values, type=field.type, from_pandas=True)
+        columns[field.name] = array
+    return pa.table(columns, schema=schema)
+
+
+def write(df, name, csv=False):
+    os.makedirs(LOCATIONS[name], exist_ok=True)
+    with instrument.step("write"):
+        pq.write_table(to_table(df, name), path(name), row_group_size=ROW_GROUP_SIZE)
+        if csv:
+            df[SCHEMAS[name].names].to_csv(path(name, "csv"), index=False)
+    instrument.rows_out(name, len(df))
+
+
+def read(name, columns=None, states=None, months=None, filters=None):
+    # Column projection and row-group pruning both happen inside pyarrow, so
+    # a single-state or month-range read never materialises the other rows.
+    predicates = list(filters or [])
+    if states is not None:
+        states = [states] if isinstance(states, str) else list(states)
+        predicates.append(("state", "in", states))
+    if months is not None:
+        start, end = months
+        column = _date_column(name)
+        if start is not None:
+            predicates.append((column, ">=", _as_date(start)))
+        if end is not None:
+            predicates.append((column, "<=", _as_date(end)))
+
+    with instrument.step("read"):
+        table = pq.read_table(path(name), columns=columns, filters=predicates or None)
+        df = table.to_pandas(date_as_object=False)
+        for column in df.select_dtypes("category").columns:
+            categories = df[column].cat.categories
+            df[column] = df[column].cat.reorder_categories(sorted(categories))
+    instrument.rows_in(name, len(df))
+    return df
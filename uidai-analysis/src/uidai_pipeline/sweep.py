@@ -0,0 +1,201 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import instrument, join, online
+
+# Threshold sweeps over the flagging rules of 04_analysis.py and
+# 05_ml_analysis.py. Every rule flags a cell when one score passes one
+# threshold, so each cell's scores are computed once and, per rule, the
+# thresholds of a grid are sorted from strictest to loosest: a cell flagged
+# at one threshold is flagged at every looser one and can be summarised by
+# the index of the first threshold that flags it (its level). A cell is in
+# flagged_records under a combination of thresholds unless every rule's
+# level is past that rule's threshold, so a histogram of level tuples per
+# district, summed from the far corner (suffix sums along each axis), gives
+# the flagged count of every combination and every district in one pass.
+# Pairwise overlaps come the same way from two-level histograms.
+#
+# The Isolation Forest threshold at a contamination c is the c-quantile of
+# the decision scores, and 0 (the forest's own cut) at the contamination it
+# was fitted with. Demand and growth rules apply to pincode averages over
+# pincodes with two or more months, as flags.assign_levels does.
+
+# Rule -> (score column, flags scores above the threshold).
+DETECTORS = {
+    "zscore": ("z_score", True),
+    "iforest": ("anomaly_score", False),
+    "growth_rise": ("avg_growth", True),
+    "growth_drop": ("avg_growth", False),
+    "demand": ("avg_enrolments", True),
+    "spike": ("enrolments_mom_growth", True),
+    "drop": ("enrolments_mom_growth", False),
+}
+# Column name of each rule's grid values in the sweep tables.
+PARAMETERS = {
+    "zscore": "z_threshold",
+    "iforest": "contamination",
+    "growth_rise": "risk_growth_above",
+    "growth_drop": "risk_growth_below",
+    "demand": "demand_quantile",
+    "spike": "spike_growth",
+    "drop": "drop_growth",
+}
+# The rules whose union is flagged_records (see flags.compose_flags).
+FLAGGED = ["iforest", "growth_rise", "growth_drop", "demand"]
+# Grid values: z-score thresholds, contamination, growth cutoffs in percent
+# and demand quantiles.
+DEFAULT_GRID = {
+    "zscore": [2.0, 2.5, 3.0, 3.5],
+    "iforest": [0.01, 0.02, 0.05, 0.1],
+    "growth_rise": [25.0, 50.0, 75.0, 100.0],
+    "growth_drop": [-50.0, -30.0, -10.0],
+    "demand": [1 / 2, 2 / 3, 3 / 4, 9 / 10],
+    "spike": [50.0, 100.0, 200.0],
+    "drop": [-75.0, -50.0, -30.0],
+}
+# The values the stage scripts use today.
+CURRENT = {
+    "zscore": 2.5,
+    "iforest": 0.05,
+    "growth_rise": 50.0,
+    "growth_drop": -30.0,
+    "demand": 2 / 3,
+    "spike": 100.0,
+    "drop": -50.0,
+}
+
+
+def scores(features_df, anomaly_df, demand_df, zscore_stats):
+    # One row per cell with every score the rules compare.
+    cells = features_df[["month", "state", "district", "pincode", "enrolments_mom_growth"]].copy()
+    z_enrolments = np.abs(online.zscores(zscore_stats, features_df, "total_enrolments"))
+    z_growth = np.abs(online.zscores(zscore_stats, features_df, "enrolments_mom_growth"))
+    cells["z_score"] = np.fmax(z_enrolments, z_growth)
+    cells["anomaly_score"] = join.lookup_values(features_df, anomaly_df[["month", "pincode", "anomaly_score"]])[
+        "anomaly_score"
+    ].to_numpy()
+    eligible = demand_df[demand_df["num_months"] >= 2].set_index("pincode")
+    for column in ["avg_growth", "avg_enrolments"]:
+        cells[column] = cells["pincode"].map(eligible[column]).astype(np.float64).to_numpy()
+    return cells
+
+
+def thresholds(cells, detector, values, contamination=None):
+    # Score thresholds for the grid values of one rule.
+    values = np.asarray(values, dtype=np.float64)
+    column, _ = DETECTORS[detector]
+    if detector == "iforest":
+        cuts = np.quantile(cells[column].dropna(), values)
+        return np.where(values == contamination, 0.0, cuts)
+    if detector == "demand":
+        pincodes = cells.drop_duplicates("pincode")[column].dropna()
+        return np.quantile(pincodes, values)
+    return values
+
+
+def levels(cells, detector, values, contamination=None):
+    # Grid values sorted strictest first, and each cell's level: the index
+    # of the first of them that flags it, len(values) if none does.
+    column, above = DETECTORS[detector]
+    cuts = thresholds(cells, detector, values, contamination)
+    order = np.argsort(-cuts if above else cuts, kind="stable")
+    score = cells[column].to_numpy(np.float64)
+    with np.errstate(invalid="ignore"):
+        flagged = score[None, :] > cuts[order, None] if above else score[None, :] < cuts[order, None]
+    return np.asarray(values, dtype=np.float64)[order], len(order) - flagged.sum(axis=0)
+
+
+def _districts(cells):
+    codes, districts = pd.MultiIndex.from_arrays(
+        [cells["state"].astype(str), cells["district"].astype(str)]
+    ).factorize()
+    return codes, districts.set_names(["state", "district"])
+
+
+def _histogram(indices, shape):
+    flat = np.ravel_multi_index(indices, shape)
+    return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+
+def _frame(districts, counts, columns):
+    # Long frame of counts shaped (district, grid...) with one column per
+    # grid axis.
+    grids = np.meshgrid(*columns.values(), indexing="ij")
+    combos = counts[0].size
+    frame = pd.DataFrame({
+        name: np.tile(grid.ravel(), len(districts)) for name, grid in zip(columns, grids)
+    })
+    frame["state"] = pd.Categorical(np.repeat(districts.get_level_values("state"), combos))
+    frame["district"] = pd.Categorical(np.repeat(districts.get_level_values("district"), combos))
+    frame["flagged"] = counts.reshape(len(districts), combos).ravel().astype(np.int64)
+    return frame
+
+
+def sweep(cells, grid=None, contamination=None):
+    # Flagged counts per district for every combination of the FLAGGED
+    # rules' grids, per district for every value of each rule alone, and
+    # the overlap of every pair of rules at every pair of values.
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    codes, districts = _districts(cells)
+    with instrument.step("levels"):
+        ranked = {detector: levels(cells, detector, grid[detector], contamination) for detector in DETECTORS}
+
+    with instrument.step("combinations"):
+        shape = (len(districts),) + tuple(len(ranked[detector][0]) + 1 for detector in FLAGGED)
+        spared = _histogram((codes,) + tuple(ranked[detector][1] for detector in FLAGGED), shape)
+        for axis in range(1, len(shape)):
+            spared = np.flip(np.cumsum(np.flip(spared, axis), axis), axis)
+        spared = spared[(slice(None),) + (slice(1, None),) * len(FLAGGED)]
+        sizes = np.bincount(codes, minlength=len(districts)).reshape((-1,) + (1,) * len(FLAGGED))
+        combined = _frame(
+            districts, sizes - spared, {PARAMETERS[detector]: ranked[detector][0] for detector in FLAGGED}
+        )
+
+    with instrument.step("detectors"):
+        singles = []
+        for detector, (values, level) in ranked.items():
+            counts = np.cumsum(_histogram((codes, level), (len(districts), len(values) + 1)), axis=1)
+            single = _frame(districts, counts[:, :-1], {"threshold": values})
+            single.insert(0, "detector", detector)
+            singles.append(single)
+        detectors = pd.concat(singles, ignore_index=True)
+        detectors["detector"] = detectors["detector"].astype("category")
+
+    with instrument.step("overlap"):
+        pairs = []
+        for a, b in itertools.combinations(ranked, 2):
+            (values_a, level_a), (values_b, level_b) = ranked[a], ranked[b]
+            counts = _histogram((level_a, level_b), (len(values_a) + 1, len(values_b) + 1)).cumsum(0).cumsum(1)
+            both = counts[:-1, :-1]
+            flagged_a = np.broadcast_to(counts[:-1, -1:], both.shape)
+            flagged_b = np.broadcast_to(counts[-1:, :-1], both.shape)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                jaccard = both / (flagged_a + flagged_b - both)
+            grid_a, grid_b = np.meshgrid(values_a, values_b, indexing="ij")
+            pairs.append(pd.DataFrame({
+                "detector_a": a, "threshold_a": grid_a.ravel(), "detector_b": b, "threshold_b": grid_b.ravel(),
+                "flagged_a": flagged_a.ravel(), "flagged_b": flagged_b.ravel(), "both": both.ravel(),
+                "jaccard": jaccard.ravel(),
+            }))
+        overlap = pd.concat(pairs, ignore_index=True)
+        for column in ["detector_a", "detector_b"]:
+            overlap[column] = overlap[column].astype("category")
+
+    instrument.metric(sweep_districts=len(districts), sweep_cells=len(cells))
+    return {"combinations": combined, "detectors": detectors, "overlap": overlap}
+
+
+def by_state(frame, keys):
+    # State totals of a per-district sweep frame.
+    return frame.groupby(keys + ["state"], observed=True, sort=False)["flagged"].sum().reset_index()
+
+
+def select(frame, **values):
+    # Rows of a sweep frame at the given grid values, matched within
+    # floating-point noise (demand quantiles such as 2/3).
+    keep = np.ones(len(frame), dtype=bool)
+    for column, value in values.items():
+        keep &= np.isclose(frame[column].to_numpy(np.float64), value)
+    return frame[keep]
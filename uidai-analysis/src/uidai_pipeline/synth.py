@@ -0,0 +1,281 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Deterministic generator for national-scale stand-ins of the three UIDAI
+# daily dumps. Same columns and dd-mm-yyyy dates as data/*.csv; volumes are
+# skewed across states and pincodes, follow a yearly seasonal curve, and a
+# small share of (pincode, month) cells get injected spikes or drops, which
+# are written to synthetic_truth.csv so detectors can be scored against them.
+
+STATES = [
+    "Andaman and Nicobar Islands", "Andhra Pradesh", "Arunachal Pradesh", "Assam",
+    "Bihar", "Chandigarh", "Chhattisgarh", "Dadra and Nagar Haveli and Daman and Diu",
+    "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir",
+    "Jharkhand", "Karnataka", "Kerala", "Ladakh", "Lakshadweep", "Madhya Pradesh",
+    "Maharashtra", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha",
+    "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal",
+]
+
+# Mean count per row for each age column, taken from the Chennai sample.
+DATASETS = {
+    "enrolment.csv": {"age_0_5": 2.3, "age_5_17": 0.8, "age_18_greater": 0.1},
+    "biometric.csv": {"bio_age_5_17": 7.8, "bio_age_17_": 10.0},
+    "demographic_updates.csv": {"demo_age_5_17": 2.1, "demo_age_17_": 17.1},
+}
+
+# Device models with their share of transactions and failure rates, and
+# the share of failures that are biometric, from the April 2025 rows of the
+# published device performance file.
+DEVICE_MODELS = [
+    ("Morpho.SmartChip", "CBME3RD", "L1", 0.770, 0.0754, 0.891),
+    ("INTEGRA.IMSPL", "IMS.AQT.TCS1S.A", "L0", 0.054, 0.0587, 0.916),
+    ("EVOLUTE.EVOLUTE", "FALCON", "L0", 0.043, 0.0655, 0.928),
+    ("EVOLUTE.EVOLUTE", "IDENTI5", "L0", 0.035, 0.0787, 0.918),
+    ("LINKWELL.LTPL", "VTK.VA21POS.A400.A", "L0", 0.035, 0.0787, 0.805),
+    ("MATRIX.MCPL", "MCP.FAX.500OH.E", "L0", 0.031, 0.0509, 0.877),
+    ("EVOLUTE.EVOLUTE", "LEOPARD", "L0", 0.029, 0.0763, 0.899),
+    ("INTEGRA.IMSPL", "IMS.AQT.TCS1S.W", "L0", 0.0042, 0.0300, 0.964),
+    ("INTEGRA.IMSPL", "IMS.ANA.TCS1S.E", "L0", 0.0012, 0.0508, 0.973),
+    ("SECUGEN.SGI", "HU20A", "L0", 0.0001, 0.0692, 0.957),
+]
+OTHER_ERRORS = ["otp", "demo", "other"]
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def make_geography(pincodes=19_000, states=36, seed=0):
+    rng = np.random.default_rng([seed, 0])
+    names = STATES[:states] if states <= len(STATES) else STATES + [
+        f"State {i}" for i in range(len(STATES), states)
+    ]
+
+    # Skewed state sizes, at least one pincode each.
+    state_weights = rng.lognormal(0, 1, size=states)
+    per_state = 1 + rng.multinomial(pincodes - states, state_weights / state_weights.sum())
+
+    codes = np.sort(rng.choice(np.arange(110_000, 1_000_000), size=pincodes, replace=False))
+    state_index = np.repeat(np.arange(states), per_state)
+    rows = []
+    start = 0
+    for s, count in enumerate(per_state):
+        districts = max(1, count // 25)
+        district_index = np.sort(rng.integers(0, districts, size=count))
+        rows.append(pd.DataFrame({
+            "pincode": codes[start:start + count],
+            "state": names[s],
+            "district": [f"{names[s]} District {d + 1}" for d in district_index],
+        }))
+        start += count
+    geography = pd.concat(rows, ignore_index=True)
+
+    # Pareto activity: a few pincodes carry most of the volume.
+    weights = rng.pareto(1.2, size=pincodes) + 0.05
+    geography["weight"] = weights / weights.sum()
+    geography["state_index"] = state_index
+    return geography
+
+
+def _calendar(start, months):
+    month_starts = pd.date_range(start, periods=months, freq="MS")
+    days = pd.date_range(month_starts[0], month_starts[-1] + pd.offsets.MonthEnd(0), freq="D")
+    labels = np.array(days.strftime("%d-%m-%Y"), dtype=object)
+    month_of_day = (days.year - month_starts[0].year) * 12 + days.month - month_starts[0].month
+    return month_starts, labels, np.asarray(month_of_day)
+
+
+def make_anomalies(geography, months, spike_fraction, seed):
+    rng = np.random.default_rng([seed, 1])
+    factor = np.ones((len(geography), months), dtype=np.float32)
+    cells = int(spike_fraction * factor.size)
+    pincode_index = rng.integers(0, len(geography), size=cells)
+    month_index = rng.integers(0, months, size=cells)
+    spike = rng.random(cells) < 0.6
+    factor[pincode_index, month_index] = np.where(spike, rng.uniform(3, 8, cells), rng.uniform(0.05, 0.3, cells))
+    return factor, pincode_index, month_index
+
+
+def generate(path, columns, rows, geography, factor, start="2025-01-01", months=12, seed=0,
+             duplicate_fraction=0.005, dirty_fraction=0.0, chunk_rows=DEFAULT_CHUNK_ROWS, salt=0):
+    month_starts, day_labels, month_of_day = _calendar(start, months)
+    seasonal = 1 + 0.3 * np.sin(2 * np.pi * (month_starts.month.to_numpy() - 3) / 12)
+    day_weights = seasonal[month_of_day]
+    day_weights = day_weights / day_weights.sum()
+
+    pincode_codes = geography["pincode"].to_numpy()
+    state_names = geography["state"].to_numpy()
+    district_names = geography["district"].to_numpy()
+    activity = geography["weight"].to_numpy()
+    # Per-pincode intensity (mean 1) so busy pincodes also have larger rows.
+    base = np.random.default_rng([seed, 2, salt]).lognormal(0, 0.6, size=len(geography))
+    base = base / base.mean()
+
+    written = 0
+    lines = 0
+    chunk_index = 0
+    if os.path.exists(path):
+        os.remove(path)
+    while written < rows:
+        size = min(chunk_rows, rows - written)
+        rng = np.random.default_rng([seed, 3, salt, chunk_index])
+        p = rng.choice(len(geography), size=size, p=activity)
+        d = rng.choice(len(day_labels), size=size, p=day_weights)
+        intensity = base[p] * factor[p, month_of_day[d]]
+
+        chunk = pd.DataFrame({
+            "date": day_labels[d],
+            "state": state_names[p],
+            "district": district_names[p],
+            "pincode": pincode_codes[p],
+        })
+        for column, mean in columns.items():
+            chunk[column] = rng.poisson(mean * intensity)
+
+        duplicates = rng.random(size) < duplicate_fraction
+        if duplicates.any():
+            chunk = pd.concat([chunk, chunk[duplicates]], ignore_index=True)
+
+        if dirty_fraction > 0:
+            chunk = _dirty(chunk, columns, dirty_fraction, rng, district_names)
+
+        chunk.to_csv(path, mode="a", header=chunk_index == 0, index=False)
+        written += size
+        lines += len(chunk)
+        chunk_index += 1
+    return lines
+
+
+def _dirty(chunk, columns, fraction, rng, district_names):
+    # Four kinds of bad rows, in equal shares: unparseable dates, negative
+    # or unparseable counts, a pincode reported under a second district,
+    # and unparseable pincodes.
+    dirty = np.flatnonzero(rng.random(len(chunk)) < fraction)
+    kind = rng.integers(0, 4, size=len(dirty))
+    first_column = next(iter(columns))
+    chunk[[first_column, "pincode"]] = chunk[[first_column, "pincode"]].astype(object)
+    chunk.loc[dirty[kind == 0], "date"] = rng.choice(["31-02-2025", "2025/13/01", ""], size=(kind == 0).sum())
+    chunk.loc[dirty[kind == 1], first_column] = rng.choice(["-1", "-7", "n/a", ""], size=(kind == 1).sum())
+    chunk.loc[dirty[kind == 2], "district"] = rng.choice(district_names, size=(kind == 2).sum())
+    chunk.loc[dirty[kind == 3], "pincode"] = rng.choice(["60O001", "NA", ""], size=(kind == 3).sum())
+    return chunk
+
+
+def generate_device_logs(path, rows, geography, start="2025-01-01", months=12, seed=0,
+                         chunk_rows=DEFAULT_CHUNK_ROWS):
+    # One row per authentication transaction. States are weighted by their
+    # pincodes' activity, and each state scales every model's failure rate
+    # by its own factor, so per-state intervals have something to separate.
+    month_starts = pd.date_range(start, periods=months, freq="MS")
+    days = pd.date_range(month_starts[0], month_starts[-1] + pd.offsets.MonthEnd(0), freq="D")
+    day_labels = np.array(days.strftime("%Y-%m-%dT"), dtype=object)
+    time_labels = np.array([f"{h:02d}:{m:02d}:{s:02d}" for h in range(24) for m in range(60) for s in range(60)],
+                           dtype=object)
+
+    state_activity = geography.groupby("state", sort=True)["weight"].sum()
+    state_names = state_activity.index.to_numpy(dtype=object)
+    state_weights = state_activity.to_numpy() / state_activity.sum()
+    state_factor = np.random.default_rng([seed, 4]).lognormal(0, 0.25, size=len(state_names))
+
+    providers, models, levels, shares, failure, bio = map(np.array, zip(*DEVICE_MODELS))
+    shares = shares.astype(float) / shares.astype(float).sum()
+    failure = failure.astype(float)
+    bio = bio.astype(float)
+
+    written = 0
+    chunk_index = 0
+    if os.path.exists(path):
+        os.remove(path)
+    while written < rows:
+        size = min(chunk_rows, rows - written)
+        rng = np.random.default_rng([seed, 5, chunk_index])
+        m = rng.choice(len(DEVICE_MODELS), size=size, p=shares)
+        s = rng.choice(len(state_names), size=size, p=state_weights)
+        failed = rng.random(size) < np.minimum(failure[m] * state_factor[s], 1)
+        error = np.where(rng.random(size) < bio[m], "bio", np.array(OTHER_ERRORS)[rng.integers(0, 3, size)])
+
+        chunk = pd.DataFrame({
+            "timestamp": day_labels[rng.integers(0, len(days), size)] + time_labels[rng.integers(0, 86_400, size)],
+            "state": state_names[s],
+            "deviceproviderid": providers[m],
+            "modelid": models[m],
+            "dev_level": levels[m],
+            "auth_result": np.where(failed, "N", "Y"),
+            "error_type": np.where(failed, error, ""),
+        })
+        chunk.to_csv(path, mode="a", header=chunk_index == 0, index=False)
+        written += size
+        chunk_index += 1
+    return written
+
+
+def generate_centroids(path, geography, seed=0):
+    # A stand-in for the pincode directory: one to three post offices per
+    # pincode, scattered around a district centre, which is scattered around
+    # its state's centre inside India's bounding box.
+    rng = np.random.default_rng([seed, 6])
+    states = geography["state"].unique()
+    state_centre = dict(zip(states, np.column_stack([rng.uniform(9, 32, len(states)),
+                                                     rng.uniform(70, 94, len(states))])))
+    districts = geography[["state", "district"]].drop_duplicates()
+    district_centre = {
+        district: state_centre[state] + rng.normal(0, 1.0, 2)
+        for state, district in districts.itertuples(index=False)
+    }
+    centres = np.stack([district_centre[district] for district in geography["district"]])
+    pincode_points = centres + rng.normal(0, 0.12, centres.shape)
+    offices = rng.integers(1, 4, size=len(geography))
+    points = np.repeat(pincode_points, offices, axis=0) + rng.normal(0, 0.01, (offices.sum(), 2))
+    pd.DataFrame({
+        "pincode": np.repeat(geography["pincode"].to_numpy(), offices),
+        "latitude": points[:, 0].round(6),
+        "longitude": points[:, 1].round(6),
+    }).to_csv(path, index=False)
+    return int(offices.sum())
+
+
+def generate_all(out_dir, rows, pincodes=19_000, states=36, start="2025-01-01", months=12, seed=0,
+                 spike_fraction=0.01, duplicate_fraction=0.005, dirty_fraction=0.0,
+                 datasets=None, chunk_rows=DEFAULT_CHUNK_ROWS, device_rows=0):
+    os.makedirs(out_dir, exist_ok=True)
+    geography = make_geography(pincodes, states, seed)
+    factor, spike_pincodes, spike_months = make_anomalies(geography, months, spike_fraction, seed)
+
+    month_starts = pd.date_range(start, periods=months, freq="MS")
+    truth = pd.DataFrame({
+        "month": month_starts[spike_months].strftime("%Y-%m-%d"),
+        "pincode": geography["pincode"].to_numpy()[spike_pincodes],
+        "factor": factor[spike_pincodes, spike_months],
+    }).drop_duplicates(["month", "pincode"], keep="last")
+    truth.to_csv(os.path.join(out_dir, "synthetic_truth.csv"), index=False)
+
+    counts = {}
+    for salt, (name, columns) in enumerate(DATASETS.items()):
+        if datasets and name not in datasets:
+            continue
+        counts[name] = generate(
+            os.path.join(out_dir, name), columns, rows, geography, factor,
+            start=start, months=months, seed=seed, duplicate_fraction=duplicate_fraction,
+            dirty_fraction=dirty_fraction, chunk_rows=chunk_rows, salt=salt,
+        )
+
+    counts["pincode_centroids.csv"] = generate_centroids(
+        os.path.join(out_dir, "pincode_centroids.csv"), geography, seed=seed
+    )
+
+    if device_rows:
+        counts["device_transactions.csv"] = generate_device_logs(
+            os.path.join(out_dir, "device_transactions.csv"), device_rows, geography,
+            start=start, months=months, seed=seed, chunk_rows=chunk_rows,
+        )
+
+    meta = {
+        "rows": counts, "pincodes": pincodes, "states": states, "start": start,
+        "months": months, "seed": seed, "spike_fraction": spike_fraction,
+        "duplicate_fraction": duplicate_fraction, "dirty_fraction": dirty_fraction,
+    }
+    with open(os.path.join(out_dir, "synthetic_meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
@@ -0,0 +1,111 @@
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from uidai_pipeline import features, flags, ingest, instrument, kernels, validate
+
+# Biometric and demographic updates go through the same steps as enrolment:
+# clean, monthly pincode aggregate, window and share features, anomaly
+# flags. On top of that they get district and state monthly rollups and a
+# per-pincode summary, which is what the dashboard pages used to recompute
+# from the raw CSV on every page view.
+
+VALUE = "total_updates"
+GROWTH = "updates_mom_growth"
+SHARE_PREFIX = "update_share"
+ISO_FEATURES = [VALUE, GROWTH, "rolling_3m_avg", "update_share_state"]
+
+
+def load(dataset, validator=None, source=None):
+    spec = ingest.UPDATE_DATASETS[dataset]
+    dtypes = spec["dtypes"] if validator is None else ingest.as_text(spec["dtypes"])
+    df = ingest.read_raw(source or spec["raw"], dtypes)
+    if validator is not None:
+        df = validate.check(validator, df)
+        validate.finish(validator)
+    return ingest.clean_updates(df, spec["counts"]).sort_values("date")
+
+
+def aggregate_monthly(cleaned_df, dataset):
+    counts = ingest.UPDATE_DATASETS[dataset]["counts"]
+    monthly_df = ingest.aggregate_monthly(cleaned_df, values=counts + [VALUE])
+    return monthly_df.sort_values("month")
+
+
+def build_features(monthly_df):
+    features_df = features.add_window_features(monthly_df.copy(), value=VALUE, growth_column=GROWTH)
+    features_df = features.add_share_features(features_df, value=VALUE, prefix=SHARE_PREFIX)
+    return features_df[list(monthly_df.columns) + [
+        GROWTH, "rolling_3m_avg", f"{SHARE_PREFIX}_district", f"{SHARE_PREFIX}_state"
+    ]]
+
+
+def rollup(features_df, dataset, level):
+    counts = ingest.UPDATE_DATASETS[dataset]["counts"]
+    keys = ["state", "district"] if level == "district" else ["state"]
+    aggregations = {column: "sum" for column in counts + [VALUE]}
+    aggregations["pincode"] = "nunique"
+    if level == "state":
+        aggregations["district"] = "nunique"
+
+    with instrument.step("groupby"):
+        rolled = (
+            features_df.groupby(["month"] + keys, observed=True)
+            .agg(aggregations)
+            .reset_index()
+            .rename(columns={"pincode": "pincodes", "district": "districts"} if level == "state"
+                    else {"pincode": "pincodes"})
+        )
+
+    rolled = rolled.sort_values(keys + ["month"]).reset_index(drop=True)
+    series = rolled.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+    growth = kernels.pct_change(rolled[VALUE].to_numpy(), kernels.group_starts(series))
+    rolled[GROWTH] = np.where(np.isfinite(growth), growth, 0) * 100
+    return rolled.sort_values(["month"] + keys).reset_index(drop=True)
+
+
+def pincode_summary(features_df):
+    ordered = features_df.sort_values(["pincode", "month"])
+    # A spike is a month that more than doubles or more than halves the
+    # previous month; growth after a zero month is not counted.
+    spikes = ordered[GROWTH].abs().gt(100) & np.isfinite(ordered[GROWTH]) & ordered["pincode"].duplicated()
+    summary = ordered.assign(spike=spikes).groupby("pincode").agg(
+        state=("state", "first"),
+        district=("district", "first"),
+        avg_updates=(VALUE, "mean"),
+        total_updates=(VALUE, "sum"),
+        num_months=(VALUE, "count"),
+        avg_growth=(GROWTH, "mean"),
+        spike_count=("spike", "sum"),
+    )
+    summary["std_updates"] = ordered.groupby("pincode")[VALUE].std(ddof=0)
+    summary = summary.reset_index()
+
+    summary["volatility"] = np.where(
+        (summary["num_months"] > 1) & (summary["avg_updates"] > 0),
+        summary["std_updates"] / summary["avg_updates"].where(summary["avg_updates"] > 0) * 100,
+        0,
+    )
+    levels = flags.assign_levels(summary, volume="avg_updates")
+    summary = summary.merge(levels[["pincode", "demand_level", "risk_level"]], on="pincode", how="left")
+    return summary.drop(columns="std_updates")
+
+
+def score_anomalies(features_df, contamination):
+    iso_df = features_df[["month", "pincode"] + ISO_FEATURES].replace([np.inf, -np.inf], 0).fillna(0)
+    with instrument.step("model_fit"):
+        scaled = StandardScaler().fit_transform(iso_df[ISO_FEATURES])
+        iso_forest = IsolationForest(contamination=contamination, random_state=42)
+        iso_df["anomaly_flag"] = (iso_forest.fit_predict(scaled) == -1).astype(int)
+    return iso_df
+
+
+def zscore_anomalies(features_df, z_threshold):
+    z_values = np.abs(kernels.group_transform(kernels.zscore, features_df[VALUE], features_df["pincode"]))
+    z_growth = np.abs(kernels.group_transform(kernels.zscore, features_df[GROWTH], features_df["pincode"]))
+    return features_df[(z_values > z_threshold) | (z_growth > z_threshold)]
+
+
+def compose_flags(features_df, iso_df, summary):
+    levels = summary[summary["demand_level"].notna()]
+    return flags.compose_flags(features_df, iso_df, levels, sort_by=VALUE)
@@ -0,0 +1,235 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from uidai_pipeline import ingest, instrument, kernels, paths
+
+# Row checks that run on each raw chunk as it is parsed, before cleaning,
+# so bad rows never reach the monthly tables and nothing is read twice.
+# Every rejected row is appended to <dataset>_rejects.csv with its line in
+# the source file (and the shard, in the source column, for sharded
+# inputs) and the first reason it failed, in REASONS order. Pincode and
+# count fields arrive as text (ingest.as_text) and are parsed here, so a
+# field that is not an integer is rejected as bad_pincode or
+# negative_count instead of failing the read. Rows that repeat an earlier
+# (date, pincode) are counted as repeated keys; count files legitimately
+# repeat rows (two centres reporting the same pincode and day), so they are
+# only rejected as duplicates when the source is known to deliver one row
+# per key (reject_duplicates). Seen pincodes are kept per date, so a chunk
+# only merges into the dates it touches and the state grows with the
+# distinct (date, pincode) keys, not the raw rows.
+# A pincode's district is the one most of its rows use when it is first
+# seen; later rows filing it under another district are rejected. Reject
+# rates are checked against the limits after every chunk once MIN_ROWS
+# rows have been seen, so a broken file fails early instead of after the
+# whole pass.
+
+REASONS = ["bad_date", "bad_pincode", "missing_location", "negative_count", "duplicate", "pincode_district"]
+DEFAULT_LIMITS = "total=0.05"
+MIN_ROWS = 10_000
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def parse_limits(text):
+    # "total=0.05,bad_date=0.001" -> {"total": 0.05, "bad_date": 0.001}
+    limits = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        reason, _, rate = item.partition("=")
+        if reason != "total" and reason not in REASONS:
+            raise ValueError(f"Unknown reject reason {reason!r}; expected total or one of {REASONS}")
+        limits[reason] = float(rate)
+    return limits
+
+
+def rejects_path(name):
+    return os.path.join(paths.OUTPUT_DIR, f"{name}_rejects.csv")
+
+
+def start(name, counts, limits=DEFAULT_LIMITS, reject_duplicates=False, path=None):
+    path = path or rejects_path(name)
+    if os.path.exists(path):
+        os.remove(path)
+    return {
+        "name": name,
+        "counts": list(counts),
+        "limits": parse_limits(limits) if isinstance(limits, str) else dict(limits or {}),
+        "path": path,
+        "reject_duplicates": reject_duplicates,
+        "rows": 0,
+        "rejected": dict.fromkeys(REASONS, 0),
+        "repeated_keys": 0,
+        "keys": {},
+        "pincodes": np.empty(0, dtype=np.int64),
+        "districts": np.empty(0, dtype=object),
+    }
+
+
+def _known(sorted_values, values):
+    positions = np.minimum(np.searchsorted(sorted_values, values), max(len(sorted_values) - 1, 0))
+    found = sorted_values[positions] == values if len(sorted_values) else np.zeros(len(values), dtype=bool)
+    return positions, found
+
+
+def _register(state, pincodes, districts):
+    merged_pincodes = np.concatenate([state["pincodes"], pincodes])
+    merged_districts = np.concatenate([state["districts"], districts])
+    order = np.argsort(merged_pincodes, kind="stable")
+    state["pincodes"], state["districts"] = merged_pincodes[order], merged_districts[order]
+
+
+def _pincode_conflicts(state, pincodes, districts):
+    # Decided once per distinct (pincode, district) pair of the chunk and
+    # mapped back to its rows. New pincodes are registered with the district
+    # most of their rows use; ties go to the district seen first.
+    codes, labels = pd.factorize(districts)
+    labels = np.asarray(labels, dtype=object)
+    span = max(len(labels), 1)
+    pairs = pincodes * span + codes
+    order = np.argsort(pairs, kind="stable")
+    starts = kernels.group_starts(pairs[order])
+    first_of_pair = np.zeros(len(pairs), dtype=np.intp)
+    first_of_pair[starts] = 1
+    pair_of_row = np.empty(len(pairs), dtype=np.intp)
+    pair_of_row[order] = np.cumsum(first_of_pair) - 1
+    pair_pincode, pair_code = np.divmod(pairs[order][starts], span)
+    pair_rows = kernels.group_sizes(starts, len(pairs))
+
+    _, found = _known(state["pincodes"], pair_pincode)
+    if (~found).any():
+        new = np.flatnonzero(~found)
+        ranked = new[np.lexsort((pair_code[new], -pair_rows[new], pair_pincode[new]))]
+        majority = ranked[kernels.group_starts(pair_pincode[ranked])]
+        _register(state, pair_pincode[majority], labels[pair_code[majority]])
+    positions, _ = _known(state["pincodes"], pair_pincode)
+    return (state["districts"][positions] != labels[pair_code])[pair_of_row]
+
+
+def _repeats(state, days, pincodes):
+    # True for rows whose (date, pincode) came before, earlier in this chunk
+    # or in an earlier one; state["keys"] maps each day to the sorted
+    # pincodes seen on it.
+    keys = days * 1_000_000 + pincodes
+    order = np.argsort(keys, kind="stable")
+    starts = kernels.group_starts(keys[order])
+    repeat = np.ones(len(keys), dtype=bool)
+    repeat[order[starts]] = False
+    distinct_days, distinct_pincodes = np.divmod(keys[order][starts], 1_000_000)
+    bounds = kernels.group_starts(distinct_days)
+    for begin, end in zip(bounds, np.r_[bounds[1:], len(distinct_days)]):
+        day = int(distinct_days[begin])
+        seen = state["keys"].get(day, np.empty(0, dtype=np.int64))
+        _, found = _known(seen, distinct_pincodes[begin:end])
+        repeat[order[starts[begin:end][found]]] = True
+        state["keys"][day] = np.union1d(seen, distinct_pincodes[begin:end])
+    return repeat
+
+
+def _numbers(values):
+    # A raw integer column as floats, NaN where a field is blank or does not
+    # parse. The arrow cast covers clean chunks; a chunk with a bad field
+    # takes the slower element-wise parse.
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.to_numpy(np.float64)
+    try:
+        return values.astype("int64[pyarrow]").to_numpy(np.float64, na_value=np.nan)
+    except (pa.ArrowInvalid, TypeError, ValueError):
+        return pd.to_numeric(values, errors="coerce").to_numpy(np.float64)
+
+
+def _not_integer(values):
+    return ~np.isfinite(values) | (values != np.round(values))
+
+
+def check(state, chunk):
+    # Returns the accepted rows of a raw, column-normalized chunk with the
+    # date already parsed; the rejected rows go to the rejects file.
+    reason = np.full(len(chunk), -1, dtype=np.int8)
+
+    def mark(code, failed):
+        reason[(reason < 0) & failed] = code
+
+    with instrument.step("parse_dates"):
+        dates = pd.to_datetime(chunk["date"], format=ingest.DATE_FORMAT, errors="coerce")
+    with instrument.step("validate"):
+        mark(0, dates.isna().to_numpy())
+        pincodes = _numbers(chunk["pincode"])
+        unparsed = _not_integer(pincodes)
+        pincodes = np.where(unparsed, 0, pincodes).astype(np.int64)
+        mark(1, unparsed | (pincodes < 100_000) | (pincodes > 999_999))
+        mark(2, (chunk["state"].isna() | chunk["district"].isna()).to_numpy())
+        counts = np.column_stack([_numbers(chunk[column]) for column in state["counts"]])
+        mark(3, (_not_integer(counts) | (counts < 0)).any(axis=1))
+
+        rows = np.flatnonzero(reason < 0)
+        days = dates.iloc[rows].to_numpy("datetime64[D]").astype(np.int64)
+        repeated = rows[_repeats(state, days, pincodes[rows])]
+        state["repeated_keys"] += len(repeated)
+        failed = np.zeros(len(chunk), dtype=bool)
+        if state["reject_duplicates"]:
+            failed[repeated] = True
+            mark(4, failed)
+            failed[:] = False
+
+        rows = np.flatnonzero(reason < 0)
+        districts = chunk["district"].to_numpy(object)[rows]
+        failed[rows[_pincode_conflicts(state, pincodes[rows], districts)]] = True
+        mark(5, failed)
+
+        accepted = reason < 0
+        state["rows"] += len(chunk)
+        codes, found = np.unique(reason[~accepted], return_counts=True)
+        for code, count in zip(codes, found):
+            state["rejected"][REASONS[code]] += int(count)
+
+    if (~accepted).any():
+        rejects = chunk[~accepted].assign(reason=np.asarray(REASONS, dtype=object)[reason[~accepted]])
+        rejects.insert(0, "line", chunk.index[~accepted] + 2)
+        os.makedirs(os.path.dirname(state["path"]), exist_ok=True)
+        write_header = not os.path.exists(state["path"])
+        rejects.to_csv(state["path"], mode="a", header=write_header, index=False)
+
+    if state["rows"] >= MIN_ROWS:
+        enforce(state)
+    # Parsed fields go back as the int32 the raw dtypes declare.
+    parsed = {column: counts[accepted, i].astype(np.int32) for i, column in enumerate(state["counts"])}
+    parsed["pincode"] = pincodes[accepted].astype(np.int32)
+    return chunk[accepted].assign(date=dates[accepted].to_numpy(), **parsed)
+
+
+def summary(state):
+    return {
+        "rows": state["rows"],
+        "accepted": state["rows"] - sum(state["rejected"].values()),
+        "rejected": {reason: count for reason, count in state["rejected"].items() if count},
+        "repeated_keys": state["repeated_keys"],
+        "pincodes": len(state["pincodes"]),
+    }
+
+
+def enforce(state):
+    rows = max(state["rows"], 1)
+    rates = {reason: count / rows for reason, count in state["rejected"].items()}
+    rates["total"] = sum(state["rejected"].values()) / rows
+    over = {reason: rate for reason, rate in rates.items() if rate > state["limits"].get(reason, np.inf)}
+    if over:
+        instrument.metric(validation=summary(state))
+        details = ", ".join(f"{reason} {rate:.2%} > {state['limits'][reason]:.2%}" for reason, rate in over.items())
+        raise ValidationError(
+            f"{state['name']}: reject rate over limit after {state['rows']} rows ({details}); see {state['path']}"
+        )
+
+
+def finish(state):
+    # Final limit check and the counters for the run report.
+    enforce(state)
+    report = summary(state)
+    instrument.metric(validation=report)
+    rejected = sum(state["rejected"].values())
+    print(f"Validation: {report['accepted']} of {report['rows']} rows accepted"
+          + (f", {rejected} rejected {report['rejected']} -> {state['path']}" if rejected else ""))
+    return report
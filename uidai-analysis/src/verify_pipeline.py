@@ -1,56 +1,180 @@
 import pandas as pd
-import os
+from uidai_pipeline import instrument
+
+# Reads the run manifest written by the stages themselves instead of
+# reloading every artifact; run the pipeline first.
+manifest = instrument.load_manifest()
+stages = manifest['stages']
+missing = [name for name in ['merge', 'features', 'analysis', 'ml'] if name not in stages]
+if missing:
+    raise SystemExit(f'No manifest entry for {missing}; run python -m uidai_pipeline run first')
+
+merge, features, analysis, ml = (stages[name] for name in ['merge', 'features', 'analysis', 'ml'])
+
+# Failed checks are collected and the script exits non-zero at the end, so
+# the runner's verify stage fails with them.
+failures = []
+
+
+def check(label, ok, lead='\n'):
+    print(f'{lead}{"✓" if ok else "✗"} {label}: {"OK" if ok else "MISMATCH"}')
+    if not ok:
+        failures.append(label)
+
 
 print('='*80)
 print('DATA FILE & OUTPUT VERIFICATION')
 print('='*80)
 
-df_clean = pd.read_csv('../data/enrolment_cleaned.csv')
-print(f'\n1. enrolment_cleaned.csv')
-print(f'   Shape: {df_clean.shape}')
-print(f'   Columns: {list(df_clean.columns)}')
-
-df_monthly = pd.read_csv('../data/enrolment_monthly.csv')
-print(f'\n2. enrolment_monthly.csv')
-print(f'   Shape: {df_monthly.shape}')
-print(f'   Unique months: {df_monthly["month"].nunique()}')
-print(f'   Unique pincodes: {df_monthly["pincode"].nunique()}')
-
-df_features = pd.read_csv('../data/enrolment_features.csv')
-print(f'\n3. enrolment_features.csv')
-print(f'   Shape: {df_features.shape}')
-print(f'   Feature columns: {list(df_features.columns[4:])}')
-print(f'   Growth rate stats: min={df_features["enrolments_mom_growth"].min():.2f}%, max={df_features["enrolments_mom_growth"].max():.2f}%')
-
-df_flagged = pd.read_csv('../outputs/flagged_records.csv')
-pct = len(df_flagged)/len(df_features)*100
-print(f'\n4. flagged_records.csv')
-print(f'   Total flagged: {len(df_flagged)} out of {len(df_features)} ({pct:.1f}%)')
-print(f'   Demand levels: {df_flagged["demand_level"].value_counts().to_dict()}')
-print(f'   Risk levels: {df_flagged["risk_level"].value_counts().to_dict()}')
-
-output_files = [f for f in os.listdir('../outputs') if f.endswith('.png')]
+print(f'\n1. enrolment_cleaned')
+if 'load' in stages and 'enrolment_cleaned' in stages['load']['outputs']:
+    load = stages['load']
+    print(f'   Shape: {(load["outputs"]["enrolment_cleaned"], len(load["metrics"]["columns"]))}')
+    print(f'   Columns: {load["metrics"]["columns"]}')
+else:
+    print('   Not written (monthly aggregate built with 02_merge_datasets.py --stream)')
+
+print(f'\n2. enrolment_monthly')
+print(f'   Rows: {merge["outputs"]["enrolment_monthly"]}')
+print(f'   Unique months: {merge["metrics"]["months"]}')
+print(f'   Unique pincodes: {merge["metrics"]["pincodes"]}')
+
+feature_rows = features['outputs']['enrolment_features']
+print(f'\n3. enrolment_features')
+print(f'   Rows: {feature_rows}')
+print(f'   Growth rate stats: min={features["metrics"]["growth_min"]:.2f}%, max={features["metrics"]["growth_max"]:.2f}%')
+if 'cube_shape' in features['metrics']:
+    rows, columns = features['metrics']['cube_shape']
+    print(f'   Cube: {rows} pincodes x {columns} months')
+
+flagged = ml['metrics']
+pct = flagged['flagged_records']/feature_rows*100
+print(f'\n4. flagged_records')
+print(f'   Total flagged: {flagged["flagged_records"]} out of {feature_rows} ({pct:.1f}%)')
+print(f'   Demand levels: {flagged["demand_levels"]}')
+print(f'   Risk levels: {flagged["risk_levels"]}')
+if 'model_version' in flagged:
+    fitted = f'refitted ({flagged["model_refit"]})' if flagged['model_refit'] else 'scored with the saved model'
+    print(f'   Isolation Forest v{flagged["model_version"]}: {fitted}, '
+          f'{flagged["scored_rows"]} cells in {flagged["score_batches"]} batches')
+
 print(f'\n5. Visualizations Created')
-print(f'   Total PNG files: {len(output_files)}')
+print(f'   Charts: {analysis["metrics"]["charts_written"]} drawn, {analysis["metrics"]["charts_skipped"]} unchanged')
+
+for number, dataset in enumerate(['biometric', 'demographic'], start=6):
+    print(f'\n{number}. {dataset} updates')
+    if dataset not in stages:
+        print('   Not run')
+        continue
+    record = stages[dataset]
+    print(f'   Cleaned rows: {record["outputs"][f"{dataset}_cleaned"]}')
+    print(f'   Pincode-months: {record["outputs"][f"{dataset}_monthly"]} '
+          f'({record["metrics"]["months"]} months, {record["metrics"]["pincodes"]} pincodes)')
+    print(f'   Rollups: {record["outputs"][f"{dataset}_district_monthly"]} district-months, '
+          f'{record["outputs"][f"{dataset}_state_monthly"]} state-months')
+    print(f'   Flagged: {record["metrics"]["flagged_records"]} records in {record["metrics"]["flagged_pincodes"]} pincodes')
+
+print(f'\n8. Dashboard export')
+if 'export' in stages:
+    export = stages['export']['metrics']
+    print(f'   {export["views"]} views in {export["files"]} files, '
+          f'{export["raw_bytes"] / 1024:.1f} KB JSON -> {export["bytes"] / 1024:.1f} KB gzipped')
+else:
+    print('   Not run')
+
+print(f'\n9. monthly_facts')
+if 'monthly_facts' in merge['outputs']:
+    print(f'   Rows: {merge["outputs"]["monthly_facts"]}')
+    print(f'   Months covered: {merge["metrics"]["months_covered"]}')
+    print(f'   Totals: {merge["metrics"]["fact_totals"]}')
+else:
+    print('   Not built (02_merge_datasets.py without --join)')
+
+print(f'\n10. Forecasts')
+if 'forecast' in stages:
+    forecast = stages['forecast']['metrics']
+    print(f'   {forecast["pincodes"]} pincodes, horizon {forecast["horizon"]}, {forecast["origins"]} backtest origins')
+    print(f'   Backtest MAE: {forecast["model_mae"]}')
+    print(f'   Models chosen: {forecast["models_chosen"]}')
+else:
+    print('   Not run')
+
+print('\n' + '='*80)
+print('STAGE TIMINGS')
+print('='*80)
+for name, record in stages.items():
+    steps = ', '.join(f'{step} {entry["seconds"]:.2f}s' for step, entry in record['steps'].items())
+    print(f'\n{name:<10} {record["status"]:<6} wall {record["wall_s"]:.2f}s  cpu {record["cpu_s"]:.2f}s  '
+          f'peak {record["peak_rss_mb"]:.0f} MB  run {record["run_id"]}')
+    print(f'           {steps}')
 
 print('\n' + '='*80)
 print('SANITY CHECKS')
 print('='*80)
 
 # Trend check
-monthly_total = df_features.groupby('month')['total_enrolments'].sum().sort_index()
+monthly_total = pd.Series(features['metrics']['monthly_total'], name='total_enrolments')
 print(f'\n✓ Total enrolments by month (should show clear trend):')
 print(monthly_total)
 
 # Flagged pincodes check
-flagged_pincodes = df_flagged['pincode'].nunique()
-total_pincodes = df_features['pincode'].nunique()
+flagged_pincodes = flagged['flagged_pincodes']
+total_pincodes = features['metrics']['pincodes']
 print(f'\n✓ High-risk/demand pincodes: {flagged_pincodes} out of {total_pincodes} ({flagged_pincodes/total_pincodes*100:.1f}%)')
 print(f'  (Should be subset, not all and not none)')
 
 # Anomaly count
-anomaly_count = (df_flagged['demand_level'] == 'High').sum() + (df_flagged['risk_level'] == 'High').sum()
+anomaly_count = flagged['demand_levels'].get('High', 0) + flagged['risk_levels'].get('High', 0)
 print(f'\n✓ Anomalies detected: {anomaly_count} records')
-print(f'  (Isolation Forest should flag ~5% of {len(df_features)} = ~{int(len(df_features)*0.05)} records)')
+print(f'  (Isolation Forest should flag ~5% of {feature_rows} = ~{int(feature_rows*0.05)} records)')
+
+# Raw rows rejected at ingestion, by reason
+for name in ['load', 'merge', 'biometric', 'demographic']:
+    report = stages.get(name, {}).get('metrics', {}).get('validation')
+    if report:
+        rejected = ', '.join(f'{reason} {count}' for reason, count in report['rejected'].items()) or 'none'
+        print(f'\n✓ {name} validation: {report["accepted"]} of {report["rows"]} rows accepted; '
+              f'rejected: {rejected}; repeated (date, pincode) keys: {report["repeated_keys"]}')
+
+# Every stage reports the rows it read, and they must match what the stage
+# upstream of it wrote
+consistent = (
+    features['inputs'].get('enrolment_monthly') == merge['outputs']['enrolment_monthly']
+    or 'monthly_delta' in features['inputs']
+) and ml['metrics'].get('feature_rows', feature_rows) == feature_rows
+check('Stage row counts consistent', consistent)
+
+# Rollups must add up to the pincode-level monthly totals they came from
+for dataset in ['biometric', 'demographic']:
+    if dataset in stages:
+        record = stages[dataset]
+        ok = record['metrics']['state_total'] == sum(record['metrics']['monthly_total'].values())
+        check(f'{dataset} state rollup matches pincode totals', ok, lead='')
+
+# The fact table must keep every enrolment and update it joined
+if 'fact_totals' in merge['metrics']:
+    expected = {'total_enrolments': merge['metrics']['enrolment_total']}
+    for dataset in ['biometric', 'demographic']:
+        if dataset in stages:
+            expected[f'{dataset}_updates'] = sum(stages[dataset]['metrics']['monthly_total'].values())
+    ok = all(merge['metrics']['fact_totals'][column] == total for column, total in expected.items())
+    check('monthly_facts totals match their datasets', ok, lead='')
+
+# The threshold sweep at today's thresholds must flag what 05_ml_analysis.py did
+# (an --incremental run scores only the changed cells, so it has no z-score
+# count over every cell)
+if 'sweep' in stages:
+    current = stages['sweep']['metrics']
+    ok = (
+        current['current_flagged'] == flagged['flagged_records']
+        and current['current_single']['iforest'] == ml['metrics']['iso_anomalies']
+        and current['current_single']['zscore'] == ml['metrics'].get('z_anomalies', current['current_single']['zscore'])
+        and current['current_single']['demand'] == flagged['demand_levels'].get('High', 0)
+        and current['current_single']['growth_rise'] + current['current_single']['growth_drop']
+        == flagged['risk_levels'].get('High', 0)
+    )
+    check('Threshold sweep reproduces the current flags', ok, lead='')
 
 print('\n' + '='*80)
+if failures:
+    raise SystemExit(f'{len(failures)} checks failed: {", ".join(failures)}')
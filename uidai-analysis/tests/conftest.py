@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The stage scripts run from src/ and import uidai_pipeline from there.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+MONTHS = pd.date_range("2025-01-01", periods=6, freq="MS")
+
+
+@pytest.fixture
+def months():
+    return MONTHS
+
+
+@pytest.fixture
+def long():
+    # A pincode x month table with gaps over two states, and pincode 100003
+    # filed under a district of the other state.
+    rng = np.random.default_rng(7)
+    table = pd.DataFrame({
+        "month": rng.choice(MONTHS, size=400),
+        "pincode": rng.integers(100000, 100080, size=400),
+    }).drop_duplicates(["month", "pincode"])
+    table["state"] = pd.Categorical(np.where(table["pincode"] % 3 == 0, "B", "A"))
+    table["district"] = pd.Categorical(table["state"].astype(str) + " " + (table["pincode"] % 4).astype(str))
+    table.loc[table["pincode"] == 100003, "district"] = "A 1"
+    table["total_enrolments"] = rng.integers(0, 50, size=len(table))
+    return table
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from uidai_pipeline import cube
+
+
+def test_rollups_and_pivots_match_groupby(long):
+    enrolment_cube = cube.build(long)
+    pivoted = long.pivot_table(values="total_enrolments", index=["state", "district"], columns="month",
+                               aggfunc="sum", observed=True)
+    assert np.allclose(cube.pivot(enrolment_cube, ["state", "district"]).to_numpy(), pivoted.to_numpy(),
+                       equal_nan=True)
+    assert np.array_equal(cube.totals(enrolment_cube, "pincode").to_numpy(),
+                          long.groupby("pincode")["total_enrolments"].sum().to_numpy())
+    assert np.array_equal(cube.monthly(enrolment_cube).to_numpy(),
+                          long.groupby("month")["total_enrolments"].sum().to_numpy())
+
+
+
+def test_missing_labels_are_rejected(long):
+    # A categorical district with a missing value used to take the code of
+    # the last category.
+    table = long.copy()
+    table.loc[table.index[:3], "district"] = np.nan
+    with pytest.raises(ValueError, match="3 rows have no district"):
+        cube.build(table)
+    with pytest.raises(ValueError, match="no state"):
+        cube.build(table.assign(district="D", state=table["state"].astype(object).where(table.index > 0)))
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from uidai_pipeline import devices, paths, synth
+
+
+def test_stream_daily_matches_groupby(tmp_path):
+    # Device logs folded in small chunks against one groupby over the whole
+    # log.
+    log_path = str(tmp_path / "device_transactions.csv")
+    synth.generate_device_logs(log_path, 20_000, synth.make_geography(200, states=5), months=2, chunk_rows=7_000)
+    daily = devices.stream_daily(log_path, chunksize=3_000)
+    raw = pd.read_csv(log_path, keep_default_na=False)
+    raw["date"] = pd.to_datetime(raw["timestamp"].str[:10])
+    raw["failed"] = raw["auth_result"] != "Y"
+    raw["bio"] = raw["failed"] & (raw["error_type"] == "bio")
+    expected = raw.groupby(devices.DAILY_KEYS).agg(
+        total_trans=("failed", "size"), failed_trans=("failed", "sum"), bio_failure=("bio", "sum")
+    ).reset_index()
+    assert len(daily) == len(expected)
+    for column in devices.DAILY_KEYS + ["total_trans", "failed_trans", "bio_failure"]:
+        assert np.array_equal(daily[column].astype(str).to_numpy(), expected[column].astype(str).to_numpy())
+
+
+def test_wilson_bounds():
+    # Against the closed form for zero failures.
+    low, high = devices.wilson([0, 30], [9, 400])
+    z = stats.norm.ppf(0.975)
+    assert low[0] == 0 and np.isclose(high[0], z * z / (9 + z * z) * 100)
+    assert low[1] < 7.5 < high[1]
+
+
+def test_published_format():
+    # The published file's percentages recomputed from its own April counts
+    # (later months are written in scientific notation, so only April is
+    # exact).
+    published = pd.read_csv(os.path.join(paths.ROOT_DIR, "data", "Top 10 Aadhaar Biometric Device Performance.csv"))
+    april = published[published["Month"] == "Apr-25"].astype({column: "int64" for column in devices.COUNTS})
+    april = april.reset_index(drop=True)
+    rebuilt = devices.published(devices.add_rates(
+        april.assign(month=pd.Timestamp("2025-04-01"))[devices.MONTHLY_KEYS + devices.COUNTS]
+    ))
+    rates = ["success_perc", "failed_perc", "bio_failure_perc"]
+    exact = [column for column in devices.PUBLISHED_COLUMNS if column not in rates]
+    assert rebuilt[exact].equals(april[exact])
+    assert np.allclose(rebuilt[rates], april[rates])
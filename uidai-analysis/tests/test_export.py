@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+from uidai_pipeline import export
+
+
+def test_previous_generation_is_kept_until_the_next_export(tmp_path, monkeypatch):
+    # A page holding the manifest of one export can still fetch its files
+    # after the next export; the export after that removes them.
+    generations = []
+    for total in [1, 2, 3]:
+        df = pd.DataFrame({"state": ["A", "B"], "total_enrolments": [total, 10]})
+        monkeypatch.setattr(export, "enrolment_views", lambda out_dir, df=df: {
+            "national": export.write_view(out_dir, "national", df),
+            "states": export.write_partitioned(out_dir, "states", df),
+        })
+        manifest, removed = export.export_all(str(tmp_path), datasets=())
+        generations.append(set(export._files(manifest["views"])))
+        assert all(os.path.exists(tmp_path / name) for name in set().union(*generations[-2:]))
+    stale = generations[0] - generations[1] - generations[2]
+    assert stale and removed == len(stale)
+    assert not any(os.path.exists(tmp_path / name) for name in stale)
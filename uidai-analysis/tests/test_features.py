@@ -0,0 +1,11 @@
+import numpy as np
+
+from uidai_pipeline import features
+
+
+def test_shares_match_groupby(long):
+    shares = features.add_share_features(long.copy())
+    for level, keys in [("district", ["state", "district"]), ("state", ["state"])]:
+        total = long.groupby(["month"] + keys, observed=True)["total_enrolments"].transform("sum")
+        expected = (long["total_enrolments"] / total * 100).fillna(0)
+        assert np.allclose(shares[f"enrolment_share_{level}"].to_numpy(), expected.to_numpy())
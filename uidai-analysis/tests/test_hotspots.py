@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from uidai_pipeline import hotspots
+
+SIZE = 600
+
+
+@pytest.fixture(scope="module")
+def centroids(tmp_path_factory):
+    # Centroids averaged over offices from a file with other header
+    # spellings, one office without a longitude.
+    rng = np.random.default_rng(23)
+    path = tmp_path_factory.mktemp("hotspots") / "centroids.csv"
+    pd.DataFrame({
+        "Pincode": np.r_[np.arange(SIZE), [0, 5, 5]],
+        "Lat": np.r_[12.8 + rng.random(SIZE) * 0.5, [13.0, 12.9, 12.9]].astype(str),
+        "Long": np.r_[80.0 + rng.random(SIZE) * 0.5, [80.1, 80.2, "NA"]].astype(str),
+    }).to_csv(path, index=False)
+    return hotspots.read_centroids(str(path))
+
+
+@pytest.fixture(scope="module")
+def distance(centroids):
+    # All-pairs haversine distances.
+    lat, lon = np.radians(centroids["latitude"].to_numpy()), np.radians(centroids["longitude"].to_numpy())
+    return 2 * hotspots.EARTH_RADIUS_KM * np.arcsin(np.sqrt(
+        np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+        + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2
+    ))
+
+
+@pytest.fixture(scope="module")
+def graph(centroids, distance):
+    # Index-backed neighbourhoods, and the all-pairs band and Gi* weights.
+    band, weights = hotspots.neighbours(hotspots.unit_vectors(centroids["latitude"], centroids["longitude"]), 3.0, 4)
+    near = (distance <= 3.0) & ~np.eye(SIZE, dtype=bool)
+    ranked = np.argsort(distance, axis=1, kind="stable")[:, 1:5]
+    nearest = np.zeros_like(near)
+    nearest[np.repeat(np.arange(SIZE), 4), ranked.ravel()] = True
+    return band, weights, near, near | nearest | nearest.T | np.eye(SIZE, dtype=bool)
+
+
+def test_centroids(centroids):
+    assert len(centroids) == SIZE
+
+
+def test_neighbours_match_all_pairs(graph):
+    band, weights, near, expected_weights = graph
+    assert np.array_equal(band.toarray(), near)
+    assert np.array_equal(weights.toarray() > 0, expected_weights)
+
+
+def test_gi_star_matches_formula(graph):
+    # The Gi* formula per pincode and month, skipping missing values.
+    _, weights, _, expected_weights = graph
+    rng = np.random.default_rng(24)
+    values = rng.normal(0, 1, (SIZE, 3))
+    values[rng.random((SIZE, 3)) < 0.1] = np.nan
+    reference = np.full_like(values, np.nan)
+    for month in range(3):
+        valid = ~np.isnan(values[:, month])
+        x, n = values[valid, month], valid.sum()
+        mean, spread = x.mean(), x.std()
+        for i in np.flatnonzero(valid):
+            w = expected_weights[i, valid].astype(float)
+            reference[i, month] = (w @ x - mean * w.sum()) / (spread * np.sqrt((n * w.sum() - w.sum() ** 2) / (n - 1)))
+    assert np.allclose(hotspots.gi_star(weights, values), reference, equal_nan=True)
+
+
+def _root(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def test_clusters_match_union_find(graph):
+    # Clusters against a union-find over flagged pairs within the band.
+    band, _, near, _ = graph
+    flagged = np.random.default_rng(25).random((SIZE, 3)) < 0.3
+    labels = hotspots.clusters(band, flagged, min_size=3)
+    for month in range(3):
+        parent = list(range(SIZE))
+        for i, j in zip(*np.nonzero(near & flagged[:, month][:, None] & flagged[:, month][None, :])):
+            parent[_root(parent, i)] = _root(parent, j)
+        roots = pd.Series([_root(parent, i) for i in range(SIZE)])[flagged[:, month]]
+        sizes = roots.map(roots.value_counts())
+        clustered = pd.Series(labels[:, month])[flagged[:, month]]
+        assert ((clustered >= 1) == (sizes >= 3)).all()
+        assert (labels[~flagged[:, month], month] == -1).all()
+        grouped = pd.DataFrame({"root": roots, "label": clustered})[clustered >= 1]
+        assert (grouped.groupby("root")["label"].nunique() == 1).all()
+        assert (grouped.groupby("label")["root"].nunique() == 1).all()
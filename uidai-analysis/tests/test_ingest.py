@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import ingest
+
+
+def _raw(long):
+    # The generated table as raw enrolment rows.
+    return long.assign(date=long["month"].dt.strftime("%d-%m-%Y"), age_0_5=long["total_enrolments"],
+                       age_5_17=1, age_18_greater=0)[list(ingest.ENROLMENT_DTYPES)]
+
+
+def test_sharded_reads_match_single_file(long, tmp_path):
+    # A raw file read whole, and as a directory of shards (one with its
+    # header in another spelling) both whole and in chunks, gives the same
+    # rows.
+    raw = _raw(long)
+    raw.to_csv(tmp_path / "whole.csv", index=False)
+    os.makedirs(tmp_path / "shards")
+    for number, rows in enumerate(np.array_split(np.arange(len(raw)), 3)):
+        part = raw.iloc[rows]
+        if number == 1:
+            part = part.rename(columns=lambda name: name.upper().replace("_", " "))
+        part.to_csv(tmp_path / "shards" / f"part_{number}.csv", index=False)
+    whole = ingest.read_raw(str(tmp_path / "whole.csv"), ingest.ENROLMENT_DTYPES)
+    sharded = ingest.read_raw(str(tmp_path / "shards"), ingest.ENROLMENT_DTYPES)
+    chunked = pd.concat(ingest.read_raw(str(tmp_path / "shards" / "*.csv"), ingest.ENROLMENT_DTYPES, chunksize=50))
+    columns = list(ingest.ENROLMENT_DTYPES)
+    assert whole[columns].astype(str).equals(sharded[columns].reset_index(drop=True).astype(str))
+    assert whole[columns].astype(str).equals(chunked[columns].reset_index(drop=True).astype(str))
+    assert sharded[ingest.SOURCE].astype(str).tolist() == chunked[ingest.SOURCE].astype(str).tolist()
+    assert sharded.index.max() < len(raw) // 3 + 1
+
+
+def test_incremental_reads_resume_at_recorded_offsets(long, tmp_path):
+    # A streamed read that resumes from the recorded offsets parses only the
+    # rows appended since, and with the first read adds up to one pass over
+    # the file.
+    raw = _raw(long)
+    path = str(tmp_path / "enrolment.csv")
+    raw.iloc[:150].to_csv(path, index=False)
+    offsets = {}
+    first, _ = ingest.stream_monthly(path, chunksize=40, offsets=offsets)
+    assert offsets == {"enrolment.csv": {"bytes": os.path.getsize(path), "rows": 150}}
+    raw.iloc[150:].to_csv(path, mode="a", header=False, index=False)
+    second, _ = ingest.stream_monthly(path, chunksize=40, offsets=offsets)
+    assert offsets == {"enrolment.csv": {"bytes": os.path.getsize(path), "rows": len(raw)}}
+    assert second["total_enrolments"].sum() == raw["age_0_5"].iloc[150:].sum() + len(raw) - 150
+    whole, _ = ingest.stream_monthly(path, chunksize=40)
+    keys = ["month", "pincode"]
+    resumed = ingest.aggregate_monthly(pd.concat([first, second]).astype({"state": str, "district": str}))
+    assert (resumed.sort_values(keys)["total_enrolments"].tolist()
+            == whole.sort_values(keys)["total_enrolments"].tolist())
+
+
+def test_incremental_reads_stop_at_the_last_complete_line(long, tmp_path):
+    # A row still being appended is left for the next run, which parses it
+    # whole once its line is complete.
+    raw = _raw(long)
+    path = str(tmp_path / "enrolment.csv")
+    raw.iloc[:100].to_csv(path, index=False)
+    complete = os.path.getsize(path)
+    line = raw.iloc[100:101].to_csv(header=False, index=False)
+    with open(path, "a") as f:
+        f.write(line[:len(line) // 2])
+    offsets = {}
+    first, _ = ingest.stream_monthly(path, chunksize=40, offsets=offsets)
+    assert offsets == {"enrolment.csv": {"bytes": complete, "rows": 100}}
+    assert first["total_enrolments"].sum() == raw["age_0_5"].iloc[:100].sum() + 100
+    with open(path, "a") as f:
+        f.write(line[len(line) // 2:])
+    second, _ = ingest.stream_monthly(path, chunksize=40, offsets=offsets)
+    assert offsets == {"enrolment.csv": {"bytes": os.path.getsize(path), "rows": 101}}
+    assert second["pincode"].tolist() == [raw["pincode"].iloc[100]]
+    assert second["total_enrolments"].tolist() == [raw["age_0_5"].iloc[100] + 1]
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def _python(code, output_dir, run_id=None):
+    env = dict(os.environ, UIDAI_OUTPUT_DIR=str(output_dir), PYTHONPATH=SRC_DIR)
+    env.pop("UIDAI_RUN_ID", None)
+    if run_id:
+        env["UIDAI_RUN_ID"] = run_id
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+
+def _stage(output_dir, name):
+    with open(os.path.join(output_dir, "run_manifest.json")) as f:
+        return json.load(f)["stages"][name]
+
+
+def test_fail_records_an_error(tmp_path):
+    result = _python(
+        "from uidai_pipeline import instrument\n"
+        "instrument.begin('sweep')\n"
+        "instrument.fail('No anomaly scores')\n",
+        tmp_path,
+    )
+    assert result.returncode == 1
+    record = _stage(tmp_path, "sweep")
+    assert record["status"] == "error" and record["error"] == "SystemExit: No anomaly scores"
+
+
+def test_runner_marks_a_non_zero_exit_as_an_error(tmp_path):
+    # A stage that exits non-zero past instrument.fail is still recorded
+    # as failed by the runner, from its exit code; one that exits zero is not.
+    for name, code in [("ml", 3), ("hotspots", 0)]:
+        _python(
+            "from uidai_pipeline import instrument\n"
+            f"instrument.begin('{name}')\n"
+            f"raise SystemExit({code})\n",
+            tmp_path, run_id="run",
+        )
+    result = _python(
+        "from uidai_pipeline import instrument, runner\n"
+        "manifest = instrument.load_manifest()\n"
+        "manifest['run'] = {'run_id': 'run', 'ran': [], 'skipped': []}\n"
+        "instrument.save_manifest(manifest)\n"
+        "runner._note_stage('ml', 'ran', 3)\n"
+        "runner._note_stage('hotspots', 'ran', 0)\n",
+        tmp_path,
+    )
+    assert result.returncode == 0, result.stderr
+    assert _stage(tmp_path, "ml")["status"] == "error"
+    assert _stage(tmp_path, "ml")["error"] == "exit code 3"
+    assert _stage(tmp_path, "hotspots")["status"] == "ok"
+    with open(os.path.join(tmp_path, "run_manifest.json")) as f:
+        assert json.load(f)["run"]["failed"] == "ml"
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from uidai_pipeline import join
+
+
+def test_fact_table_matches_outer_merge():
+    # Integer-key join against chained pandas merges on (month, pincode), on
+    # generated tables with missing months and pincodes on either side.
+    rng = np.random.default_rng(11)
+    months = pd.date_range("2025-01-01", periods=6, freq="MS")
+    sides = {}
+    for name, size in [("left", 300), ("right", 200)]:
+        cells = pd.DataFrame({
+            "month": rng.choice(months, size=size),
+            "state": "S", "district": "D",
+            "pincode": rng.integers(100000, 100060, size=size),
+        }).drop_duplicates(["month", "pincode"])
+        sides[name] = cells.assign(value=rng.integers(0, 50, size=len(cells)))
+    facts = join.fact_table({name: (df, "value", f"{name}_value") for name, df in sides.items()})
+    merged = sides["left"].merge(sides["right"], on=["month", "pincode"], how="outer", suffixes=("_left", "_right"))
+    merged = merged.sort_values(["month", "pincode"]).reset_index(drop=True)
+    assert len(facts) == len(merged)
+    assert np.array_equal(facts["pincode"].to_numpy(), merged["pincode"].to_numpy())
+    assert np.array_equal(facts["left_value"].to_numpy(), merged["value_left"].fillna(0).to_numpy())
+    assert np.array_equal(facts["right_value"].to_numpy(), merged["value_right"].fillna(0).to_numpy())
+    assert np.array_equal(facts["has_right"].to_numpy(), merged["value_right"].notna().to_numpy())
@@ -0,0 +1,79 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from uidai_pipeline import kernels, online
+
+# Kernel equivalence against the groupby/lambda reference implementations,
+# on generated series with zeros, flat runs and single-month pincodes.
+
+
+@pytest.fixture(scope="module")
+def series():
+    rng = np.random.default_rng(7)
+    sizes = rng.integers(1, 12, size=400)
+    reference = pd.DataFrame({
+        "pincode": np.repeat(np.arange(len(sizes)), sizes),
+        "total_enrolments": rng.choice([0, 0, 1, 5, 5, 40, 300], size=sizes.sum()),
+    })
+    starts = kernels.group_starts(reference["pincode"].to_numpy())
+    reference["month"] = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        31 * (np.arange(len(reference)) - kernels.row_starts(starts, len(reference))), unit="D"
+    )
+    reference["month"] = reference["month"].dt.to_period("M").dt.to_timestamp()
+    return reference, starts
+
+
+def _same(got, expected):
+    return np.allclose(got, expected.to_numpy(dtype=float), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def _zscores(grouped):
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return grouped.transform(lambda x: stats.zscore(x, nan_policy="omit"))
+
+
+def test_pct_change(series):
+    reference, starts = series
+    grouped = reference.groupby("pincode")["total_enrolments"]
+    with np.errstate(all="ignore"):
+        got = kernels.pct_change(reference["total_enrolments"].to_numpy(), starts)
+    assert _same(got, grouped.pct_change())
+
+
+def test_rolling_means(series):
+    reference, starts = series
+    grouped = reference.groupby("pincode")["total_enrolments"]
+    values = reference["total_enrolments"].to_numpy()
+    assert _same(
+        kernels.rolling_mean(values, starts, window=3),
+        grouped.transform(lambda x: x.rolling(window=3, min_periods=1).mean()),
+    )
+    assert _same(
+        kernels.shifted_rolling_mean(values, starts, window=3),
+        grouped.transform(lambda x: x.rolling(window=3, min_periods=1).mean().shift(1)),
+    )
+
+
+def test_zscore(series):
+    reference, _ = series
+    grouped = reference.groupby("pincode")["total_enrolments"]
+    with np.errstate(all="ignore"):
+        got = kernels.group_transform(kernels.zscore, reference["total_enrolments"].to_numpy(), reference["pincode"])
+    assert _same(got, _zscores(grouped))
+
+
+def test_online_zscore(series):
+    # Running statistics folded in one month at a time, as daily refreshes
+    # would, against the z-scores over every month at once.
+    reference, _ = series
+    running = online.empty(series=["total_enrolments"])
+    for _, month_rows in reference.groupby("month"):
+        running, _ = online.update(running, month_rows)
+    with np.errstate(all="ignore"):
+        got = online.zscores(running, reference, "total_enrolments")
+    assert _same(got, _zscores(reference.groupby("pincode")["total_enrolments"]))
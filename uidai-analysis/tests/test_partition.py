@@ -0,0 +1,51 @@
+import numpy as np
+
+from uidai_pipeline import features, flags, online, partition, store
+
+
+def test_state_partitions_match_one_pass(long):
+    # State partitions built one at a time and merged, against the whole
+    # table in one pass (without the pincode filed under another state's
+    # district, and with one district name used in both states).
+    table = long[long["pincode"] != 100003].reset_index(drop=True)
+    table["district"] = table["district"].astype(str).replace({"A 2": "Aurangabad", "B 2": "Aurangabad"})
+    table["district"] = table["district"].astype("category")
+    groups = partition.plan(table["state"].value_counts().to_dict(), 2)
+    assert len(groups) == 2
+    whole = features.build_features(table)
+    merged = partition.concat(
+        [features.build_features(table[table["state"].isin(states)]) for states in groups], ["pincode", "month"]
+    )
+    assert whole.astype(str).equals(merged.astype(str))
+    local = flags.per_pincode(whole)
+    combined = online.concat([flags.per_pincode(merged[merged["state"].isin(states)])["zscore_stats"]
+                              for states in groups])
+    for name in combined:
+        assert np.array_equal(local["zscore_stats"][name], combined[name], equal_nan=True)
+
+
+def test_pincode_under_two_states_matches_one_pass(long, tmp_path, monkeypatch):
+    # A pincode filed under two states keeps both states in one partition,
+    # so partitioned runs read it whole and give the single-process results.
+    table = long.astype({"state": str, "district": str})
+    table["state"] = np.array(["A", "B", "C", "D"])[table["pincode"] % 4]
+    table["district"] = table["state"] + " " + (table["pincode"] % 3).astype(str)
+    shared = table.loc[table["state"] == "B", "pincode"].value_counts().idxmax()
+    table.loc[table.index[table["pincode"] == shared][::2], ["state", "district"]] = ["C", "C 0"]
+    assert table.loc[table["pincode"] == shared, "state"].nunique() == 2
+    for name in ["enrolment_monthly", "enrolment_features"]:
+        monkeypatch.setitem(store.LOCATIONS, name, str(tmp_path))
+    store.write(table.astype({"state": "category", "district": "category"}), "enrolment_monthly")
+
+    groups = partition.plan(partition.state_rows("enrolment_monthly"), 3, partition.linked_states("enrolment_monthly"))
+    assert [states for states in groups if "B" in states or "C" in states] == [["B", "C"]]
+    whole = features.build_features(store.read("enrolment_monthly"))
+    merged = partition.build_features(3, workers=1)
+    assert whole.astype(str).equals(merged.astype(str))
+
+    store.write(whole, "enrolment_features")
+    local = flags.per_pincode(store.read("enrolment_features"))
+    parts = partition.per_pincode(3, workers=1)
+    for name in local["zscore_stats"]:
+        assert np.array_equal(local["zscore_stats"][name], parts["zscore_stats"][name], equal_nan=True)
+    assert local["demand"].astype(str).equals(parts["demand"].astype(str))
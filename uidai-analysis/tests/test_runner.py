@@ -0,0 +1,26 @@
+import os
+
+from uidai_pipeline import runner
+
+
+def _modules(stage):
+    script = os.path.join(runner.SRC_DIR, runner.STAGES[stage]["script"])
+    return {os.path.basename(path) for path in runner.code_files(script)}
+
+
+def test_stage_code_is_what_the_stage_imports():
+    # Editing a helper reruns only the stages that reach it through imports.
+    assert {"sweep.py", "online.py", "store.py", "__init__.py"} <= _modules("sweep")
+    assert "sweep.py" not in _modules("load") | _modules("merge") | _modules("features") | _modules("ml")
+    assert "validate.py" in _modules("load")
+    assert _modules("verify") == {"verify_pipeline.py", "__init__.py", "instrument.py", "paths.py"}
+
+
+def test_reject_limits_default_to_validate():
+    # Stages are not passed a limit unless one is set, so the scripts fall
+    # back to validate.DEFAULT_LIMITS.
+    params = runner.stage_params([])
+    assert "--reject-limits" not in runner._argv(params["load"])
+    params = runner.stage_params(["load.reject_limits=total=0.1"])
+    argv = runner._argv(params["load"])
+    assert argv[argv.index("--reject-limits") + 1] == "total=0.1"
@@ -0,0 +1,37 @@
+import pytest
+
+from uidai_pipeline import cube, service
+
+
+def test_aggregates_match_pandas_filters(long, months):
+    # Query service answers against the same filters applied with pandas.
+    enrolment_cube = cube.build(long)
+    window = long[(long["state"] == "A") & (long["month"] >= months[1]) & (long["month"] <= months[4])]
+    expected = window.groupby("district", observed=True)["total_enrolments"].sum()
+    got = service.aggregate(enrolment_cube, state=("A",), start=str(months[1].date()), end=str(months[4].date()),
+                            group="district", top=3)
+    assert [row["total_enrolments"] for row in got] == sorted(expected.tolist(), reverse=True)[:3]
+    series = service.aggregate(enrolment_cube, pincode=(100003,), group="month")
+    assert [row["total_enrolments"] for row in series] == [
+        int(long.loc[(long["pincode"] == 100003) & (long["month"] == month), "total_enrolments"].sum())
+        for month in months
+    ]
+
+
+def test_longer_labels_match_nothing(long, tmp_path):
+    # Labels read back from the saved cube are fixed-width strings; a query
+    # value that starts with a known label is still a different label.
+    path = str(tmp_path / "cube")
+    cube.save(cube.build(long), path)
+    enrolment_cube = cube.load(path)
+    assert service.aggregate(enrolment_cube, state=("A",), group="state")
+    assert service.aggregate(enrolment_cube, state=("AXYZ",), group="state") == []
+    assert service.aggregate(enrolment_cube, district=("A 1Foo",), group="district") == []
+    assert service.aggregate(enrolment_cube, district=("A 1", "A 1Foo"), group="district") == service.aggregate(
+        enrolment_cube, district=("A 1",), group="district"
+    )
+
+
+def test_negative_top_is_rejected():
+    with pytest.raises(ValueError):
+        service.parse_query({"top": ["-1"]})
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from uidai_pipeline import sketch
+
+
+@pytest.fixture(scope="module")
+def skewed():
+    rng = np.random.default_rng(21)
+    table = pd.DataFrame({
+        "month": pd.to_datetime("2025-01-01") + pd.to_timedelta(rng.integers(0, 6, 60_000) * 31, unit="D"),
+        "pincode": 100000 + rng.zipf(1.3, 60_000) % 5_000,
+        "total_enrolments": rng.integers(1, 20, 60_000),
+    })
+    table["month"] = table["month"].dt.to_period("M").dt.to_timestamp()
+    table["state"] = "S" + (table["pincode"] % 7).astype(str)
+    table["district"] = table["state"] + " " + (table["pincode"] % 40).astype(str)
+    return table
+
+
+@pytest.fixture(scope="module")
+def sketches(skewed):
+    # The table sketched in four batches and merged, and in one pass.
+    batches = [sketch.sketch(skewed.iloc[rows], capacity=64) for rows in np.array_split(np.arange(len(skewed)), 4)]
+    merged = batches[0]
+    for batch in batches[1:]:
+        merged = sketch.merge(merged, batch)
+    return merged, sketch.sketch(skewed, capacity=64)
+
+
+def test_top_k_within_bounds(skewed, sketches):
+    # Bounds hold for every key, every key above the floor is kept, and the
+    # merged Count-Min equals one pass.
+    merged, whole = sketches
+    assert int(merged["total"]) == int(skewed["total_enrolments"].sum())
+    labels = {
+        "pincode": skewed["pincode"].astype(str),
+        "district": skewed["district"],
+        "state": skewed["state"],
+        "pincode_month": skewed["month"].dt.strftime("%Y-%m") + "|" + skewed["pincode"].astype(str),
+    }
+    for level, keys in labels.items():
+        exact = skewed.groupby(keys)["total_enrolments"].sum()
+        kept = pd.Series(merged[f"{level}.counts"], index=merged[f"{level}.keys"])
+        lower = kept - pd.Series(merged[f"{level}.errors"], index=kept.index)
+        true = exact.reindex(kept.index)
+        assert (true <= kept).all() and (true >= lower).all()
+        assert (exact[~exact.index.isin(kept.index)] <= merged[f"{level}.floor"]).all()
+        assert set(exact[exact > merged[f"{level}.floor"]].index) <= set(kept.index)
+        assert (sketch.point(merged, level, exact.index.to_numpy(str)) >= exact.to_numpy()).all()
+        assert np.array_equal(merged[f"{level}.cms"], whole[f"{level}.cms"])
+    top_pincodes = sketch.top(merged, "pincode", 5)["pincode"].tolist()
+    assert top_pincodes == skewed.groupby(labels["pincode"])["total_enrolments"].sum().nlargest(5).index.tolist()
+
+
+def test_distinct_counts_within_bounds(skewed, sketches):
+    merged, whole = sketches
+    assert np.array_equal(merged["hll.registers"], whole["hll.registers"])
+    actual = skewed.groupby(["state", "month"])["pincode"].nunique()
+    assert np.allclose(sketch.distinct(merged).to_numpy(), actual.to_numpy(), rtol=0.06)
+    assert abs(sketch.distinct(merged, "total") / skewed["pincode"].nunique() - 1) < 0.06
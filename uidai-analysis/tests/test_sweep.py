@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from uidai_pipeline import sweep
+
+
+@pytest.fixture(scope="module")
+def cells():
+    # Generated scores with missing values and ties.
+    rng = np.random.default_rng(22)
+    table = pd.DataFrame({
+        "state": pd.Categorical(rng.choice(["A", "B"], 3_000)),
+        "pincode": rng.integers(0, 300, 3_000),
+        "z_score": rng.exponential(1.2, 3_000),
+        "anomaly_score": rng.normal(0.1, 0.08, 3_000),
+        "enrolments_mom_growth": rng.normal(0, 60, 3_000).round(),
+    })
+    table["district"] = pd.Categorical(table["state"].astype(str) + " " + (table["pincode"] % 5).astype(str))
+    pincode_rng = np.random.default_rng(23)
+    table["avg_growth"] = pincode_rng.normal(10, 40, 300).round()[table["pincode"]]
+    table["avg_enrolments"] = pincode_rng.integers(1, 60, 300).astype(float)[table["pincode"]]
+    table.loc[table["pincode"] % 17 == 0, ["avg_growth", "avg_enrolments"]] = np.nan
+    table.loc[::50, "z_score"] = np.nan
+    return table
+
+
+def test_combinations_match_pandas_flags(cells):
+    # Swept flag counts against flags recomputed with pandas for every
+    # combination.
+    tables = sweep.sweep(cells, contamination=0.05)
+    demand_values = cells.drop_duplicates("pincode")["avg_enrolments"].dropna()
+    for values, counted in tables["combinations"].groupby(
+        [sweep.PARAMETERS[detector] for detector in sweep.FLAGGED], sort=False
+    ):
+        contamination, above, below, quantile = values
+        cut = 0.0 if contamination == 0.05 else cells["anomaly_score"].quantile(contamination)
+        flagged = (
+            (cells["anomaly_score"] < cut) | (cells["avg_growth"] > above) | (cells["avg_growth"] < below)
+            | (cells["avg_enrolments"] > demand_values.quantile(quantile))
+        )
+        expected = flagged.groupby([cells["state"].astype(str), cells["district"].astype(str)]).sum()
+        counted = counted.set_index(["state", "district"])["flagged"]
+        assert counted.sort_index().equals(expected.sort_index().astype(np.int64))
+
+
+def test_single_rules_and_overlap(cells):
+    tables = sweep.sweep(cells, contamination=0.05)
+    single = tables["detectors"].groupby(["detector", "threshold"], observed=True)["flagged"].sum()
+    assert single[("zscore", 2.5)] == (cells["z_score"] > 2.5).sum()
+    assert single[("drop", -50.0)] == (cells["enrolments_mom_growth"] < -50).sum()
+    pair = tables["overlap"].set_index(["detector_a", "threshold_a", "detector_b", "threshold_b"])
+    both = pair.loc[("zscore", 3.0, "spike", 100.0)]
+    assert both["both"] == ((cells["z_score"] > 3) & (cells["enrolments_mom_growth"] > 100)).sum()
+    assert both["flagged_b"] == (cells["enrolments_mom_growth"] > 100).sum()
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from uidai_pipeline import ingest, validate
+
+RAW = pd.DataFrame({
+    "date": ["01-03-2025", "01-03-2025", "01-03-2025", "01-03-2025", "02-03-2025", "01-03-2025", "02-03-2025"],
+    "state": "Tamil Nadu",
+    "district": "Chennai",
+    "pincode": ["600001", "600001", "60O001", "600002", "600002", "600002", "600001"],
+    "age_0_5": ["1", "1", "4", "", "2", "x", "5"],
+    "age_5_17": "0",
+    "age_18_greater": "0",
+})
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+@pytest.mark.parametrize("reject_duplicates", [False, True])
+def test_quarantines_unparseable_fields_and_repeated_keys(tmp_path, reject_duplicates, chunksize):
+    # Unparseable pincode and count fields are quarantined rather than
+    # failing the read, and a repeated (date, pincode) is only rejected on
+    # request, the same whether the file is read whole or in chunks.
+    RAW.to_csv(tmp_path / "raw.csv", index=False)
+    validator = validate.start("test", ingest.ENROLMENT_COUNTS, reject_duplicates=reject_duplicates,
+                               path=str(tmp_path / "rejects.csv"))
+    read = ingest.read_raw(str(tmp_path / "raw.csv"), ingest.as_text(ingest.ENROLMENT_DTYPES), chunksize=chunksize)
+    chunks = [read] if chunksize is None else list(read)
+    accepted = pd.concat([validate.check(validator, chunk) for chunk in chunks])
+    report = validate.summary(validator)
+    rejects = pd.read_csv(tmp_path / "rejects.csv")
+    assert accepted["age_0_5"].tolist() == ([1, 2, 5] if reject_duplicates else [1, 1, 2, 5])
+    assert accepted["pincode"].dtype == np.int32
+    assert report["repeated_keys"] == 1
+    assert rejects["line"].tolist() == ([3, 4, 5, 7] if reject_duplicates else [4, 5, 7])
+    duplicates = {"duplicate": 1} if reject_duplicates else {}
+    assert report["rejected"] == dict(bad_pincode=1, negative_count=2, **duplicates)
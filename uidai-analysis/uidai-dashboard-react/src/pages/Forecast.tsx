@@ -1,49 +1,102 @@
 import React, { useEffect, useState } from 'react';
 import {
-    ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, ReferenceLine
+    ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, ReferenceLine, Cell,
+    LineChart, Line, Legend
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView } from '../utils/dataLoader';
 import { FileText, Activity, CalendarClock } from 'lucide-react';
 import ImpactModule from '../components/ImpactModule';
-import { calculateTrendProjection, getRiskLevel } from '../utils/analytics';
+import { getRiskLevel } from '../utils/analytics';
+
+interface ForecastTotal {
+    month: string;
+    actual: number | null;
+    forecast: number | null;
+}
+
+interface PincodeForecast {
+    pincode: number;
+    district: string;
+    model: string;
+    forecast_h1: number;
+    last_actual: number;
+    growth_pct: number | null;
+    mae: number | null;
+    mape: number | null;
+    [horizon: string]: string | number | null;
+}
+
+interface DistrictAccuracy {
+    state: string;
+    district: string;
+    pincodes: number;
+    mae: number;
+    mape: number | null;
+}
+
+const MODEL_NAMES: { [key: string]: string } = {
+    mean3: '3-month mean',
+    ses: 'Exponential smoothing',
+    holt: 'Damped trend',
+    snaive_drift: 'Seasonal naive + drift'
+};
 
 const Forecast: React.FC = () => {
-    const [riskData, setRiskData] = useState<any[]>([]);
+    const [riskData, setRiskData] = useState<PincodeForecast[]>([]);
+    const [totals, setTotals] = useState<ForecastTotal[]>([]);
+    const [accuracy, setAccuracy] = useState<DistrictAccuracy[]>([]);
     const [loading, setLoading] = useState(true);
     const [impact, setImpact] = useState<any>(null);
 
     useEffect(() => {
         const load = async () => {
-            const res = await fetch('/data/flagged_records.csv');
-            const text = await res.text();
-
-            Papa.parse(text, {
-                header: true,
-                dynamicTyping: true,
-                complete: (results) => {
-                    const data = results.data as any[];
-                    const valid = data.filter(d => d.pincode && d.total_enrolments && d.enrolments_mom_growth);
-                    setRiskData(valid.slice(0, 50));
-
-                    // Analytics for Impact Module
-                    // Creating substantial synthetic trend for demo purposes (using growth rates)
-                    const volumes = valid.slice(0, 6).map(d => d.total_enrolments);
-                    const projection = calculateTrendProjection(volumes, 3);
-                    const risk = getRiskLevel(projection.projectedValue, 2000); // 2000 is theoretical avg capacity
-
-                    setImpact({
-                        ...projection,
-                        riskLevel: risk,
-                        impactText: `If current enrolment volume trends continue, an estimated ${projection.projectedGrowth} additional citizens will seek enrolment in these high-traffic pincodes next quarter, potentially increasing wait times by 40%.`
-                    });
-
-                    setLoading(false);
-                }
-            });
+            try {
+                // Per-pincode forecasts and backtest accuracy from 08_forecast.py
+                const [monthly, pincodes, districts] = await Promise.all([
+                    loadView<ForecastTotal>('enrolment/forecast_totals'),
+                    loadView<PincodeForecast>('enrolment/forecast_top'),
+                    loadView<DistrictAccuracy>('enrolment/forecast_districts')
+                ]);
+                const top = pincodes.filter(d => d.growth_pct !== null).slice(0, 50);
+                setRiskData(top);
+                setTotals(monthly);
+                setAccuracy(districts);
+
+                // Impact: the furthest forecast month for the top pincodes against their latest actuals
+                const horizons = Object.keys(pincodes[0] || {}).filter(k => k.startsWith('forecast_h'));
+                const lastHorizon = horizons.sort((a, b) => Number(a.slice(10)) - Number(b.slice(10))).pop() || 'forecast_h1';
+                const currentVal = top.reduce((sum, d) => sum + (d.last_actual || 0), 0);
+                const projectedValue = Math.round(top.reduce((sum, d) => sum + Number(d[lastHorizon] || 0), 0));
+                const projectedGrowth = projectedValue - currentVal;
+
+                let trendDirection = 'Stable';
+                if (projectedGrowth > 0.05 * currentVal) trendDirection = 'Rapidly Rising';
+                else if (projectedGrowth > 0) trendDirection = 'Rising';
+                else if (projectedGrowth < -0.05 * currentVal) trendDirection = 'Rapidly Declining';
+                else if (projectedGrowth < 0) trendDirection = 'Declining';
+
+                setImpact({
+                    projectedValue,
+                    projectedGrowth,
+                    trendDirection,
+                    riskLevel: getRiskLevel(projectedValue, 2000), // 2000 is theoretical avg capacity
+                    impactText: `Forecasts for the ${top.length} highest-volume pincodes put monthly enrolments at ${projectedValue.toLocaleString()} within ${horizons.length} months (${projectedGrowth >= 0 ? '+' : ''}${projectedGrowth.toLocaleString()} on the latest month), which would lengthen wait times at the busiest centres.`
+                });
+            } catch (error) {
+                console.error('Error loading forecasts:', error);
+            } finally {
+                setLoading(false);
+            }
         }
         load();
     }, []);
 
+    const published = accuracy.reduce(
+        (acc, d) => ({ error: acc.error + d.mae * d.pincodes, pincodes: acc.pincodes + d.pincodes }),
+        { error: 0, pincodes: 0 }
+    );
+    const overallMae = published.pincodes > 0 ? published.error / published.pincodes : 0;
+
     if (loading) return <div>Loading Forecasts...</div>;
 
     return (
@@ -65,15 +118,15 @@ const Forecast: React.FC = () => {
                 <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '1rem' }}>
                     <div>
                         <h3 className="chart-title" style={{ marginBottom: 5 }}>Risk Matrix</h3>
-                        <p style={{ color: '#64748b', fontSize: '0.9rem' }}>Identifying Volatility: High Volume + High Growth</p>
+                        <p style={{ color: '#64748b', fontSize: '0.9rem' }}>Next-month forecast volume against forecast growth on the latest month</p>
                     </div>
                 </div>
 
                 <ResponsiveContainer width="100%" height={350}>
                     <ScatterChart margin={{ top: 20, right: 20, bottom: 20, left: 50 }}>
                         <CartesianGrid strokeDasharray="3 3" />
-                        <XAxis type="number" dataKey="total_enrolments" name="Volume" unit="" label={{ value: 'Total Enrolments (Volume)', position: 'bottom', offset: 0 }} />
-                        <YAxis type="number" dataKey="enrolments_mom_growth" name="Growth" unit="%" label={{ value: 'MoM Growth %', angle: -90, position: 'insideLeft', offset: 0, style: { textAnchor: 'middle' } }} />
+                        <XAxis type="number" dataKey="forecast_h1" name="Volume" unit="" label={{ value: 'Forecast Enrolments Next Month', position: 'bottom', offset: 0 }} />
+                        <YAxis type="number" dataKey="growth_pct" name="Growth" unit="%" label={{ value: 'Forecast Growth %', angle: -90, position: 'insideLeft', offset: 0, style: { textAnchor: 'middle' } }} />
                         <Tooltip
                             cursor={{ strokeDasharray: '3 3' }}
                             content={({ active, payload }) => {
@@ -82,7 +135,8 @@ const Forecast: React.FC = () => {
                                     return (
                                         <div style={{ background: 'white', border: '1px solid #e2e8f0', padding: '10px', boxShadow: '0 4px 6px rgba(0,0,0,0.1)', borderRadius: 8 }}>
                                             <p style={{ fontWeight: 700, color: '#1e293b' }}>Pincode: {d.pincode}</p>
-                                            <p style={{ fontSize: '0.9rem' }}>Vol: {d.total_enrolments} | Growth: {d.enrolments_mom_growth}%</p>
+                                            <p style={{ fontSize: '0.9rem' }}>Forecast: {Math.round(d.forecast_h1)} | Latest: {d.last_actual} | Growth: {d.growth_pct?.toFixed(1)}%</p>
+                                            <p style={{ fontSize: '0.8rem', color: '#64748b' }}>{MODEL_NAMES[d.model] || d.model}{d.mae !== null ? `, backtest MAE ${d.mae.toFixed(1)}` : ''}</p>
                                         </div>
                                     );
                                 }
@@ -90,11 +144,34 @@ const Forecast: React.FC = () => {
                             }}
                         />
                         <ReferenceLine y={0} stroke="#94a3b8" />
-                        <Scatter name="Pincodes" data={riskData} fill="#f69320" />
+                        <ReferenceLine y={50} stroke="#ef4444" strokeDasharray="4 4" />
+                        <Scatter name="Pincodes" data={riskData} fill="#f69320">
+                            {riskData.map((d, i) => (
+                                <Cell key={i} fill={(d.growth_pct || 0) > 50 ? '#ef4444' : '#f69320'} />
+                            ))}
+                        </Scatter>
                     </ScatterChart>
                 </ResponsiveContainer>
             </div>
 
+            <div className="chart-container" style={{ marginBottom: '2rem' }}>
+                <h3 className="chart-title" style={{ marginBottom: 5 }}>Monthly Enrolments: Actual and Forecast</h3>
+                <p style={{ color: '#64748b', fontSize: '0.9rem', marginBottom: '1rem' }}>
+                    Sum of the per-pincode forecasts; backtest MAE {overallMae.toFixed(1)} enrolments per pincode-month
+                </p>
+                <ResponsiveContainer width="100%" height={300}>
+                    <LineChart data={totals} margin={{ top: 10, right: 20, bottom: 10, left: 20 }}>
+                        <CartesianGrid strokeDasharray="3 3" />
+                        <XAxis dataKey="month" />
+                        <YAxis />
+                        <Tooltip />
+                        <Legend />
+                        <Line type="monotone" dataKey="actual" name="Actual" stroke="#1a3672" strokeWidth={2} connectNulls={false} />
+                        <Line type="monotone" dataKey="forecast" name="Forecast" stroke="#f69320" strokeWidth={2} strokeDasharray="6 3" />
+                    </LineChart>
+                </ResponsiveContainer>
+            </div>
+
             <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(300px, 1fr))', gap: '1.5rem' }}>
                 {/* Dataset Explanation Card */}
                 <div style={{ background: 'white', padding: '1.5rem', borderRadius: 12, borderLeft: '4px solid #1a3672', boxShadow: '0 2px 4px rgba(0,0,0,0.05)' }}>
@@ -119,13 +196,13 @@ const Forecast: React.FC = () => {
                         <h4 style={{ fontWeight: 700, color: '#1e293b', fontSize: '1.1rem' }}>How Predictions Work for 2026</h4>
                     </div>
                     <p style={{ color: '#475569', lineHeight: 1.6, fontSize: '0.95rem' }}>
-                        To generate forecasts for <strong>every month of 2026</strong>, the model uses the full <strong>7-month historical dataset (Jun '25–Jan '26)</strong>.
+                        Every pincode is forecast with <strong>exponential smoothing</strong>, a <strong>damped trend</strong>, <strong>seasonal naive with drift</strong> and a <strong>3-month mean</strong>.
                     </p>
                     <p style={{ color: '#475569', lineHeight: 1.6, fontSize: '0.95rem', marginTop: '8px' }}>
-                        It employs a <strong>sliding window approach</strong>: as new actual data comes in for a month, it is immediately added to the window to update the forecast for the next month.
+                        A <strong>rolling-origin backtest</strong> refits each model on every past prefix of months and scores the months that followed; each pincode uses the model with the lowest error.
                     </p>
                     <div style={{ background: '#f8fafc', padding: '10px', marginTop: '10px', borderRadius: 6, fontSize: '0.85rem', color: '#64748b' }}>
-                        <strong>Example:</strong> In Feb, we predict for March. In March, we predict for April. The system does not guess the whole year at once—it adapts month-by-month.
+                        <strong>Example:</strong> Fit on Jun–Sep, score Oct–Dec; fit on Jun–Oct, score Nov–Jan; and so on. Forecasts are refreshed whenever new months arrive.
                     </div>
                 </div>
 
@@ -136,7 +213,7 @@ const Forecast: React.FC = () => {
                         <h4 style={{ fontWeight: 700, color: '#1e293b', fontSize: '1.1rem' }}>Risk Assessment Logic</h4>
                     </div>
                     <p style={{ color: '#475569', lineHeight: 1.6, fontSize: '0.95rem' }}>
-                        A pincode is flagged as <strong>"High Risk"</strong> if the forecast shows a <span style={{ color: '#ef4444', fontWeight: 600 }}>Growth Spike greater than 50%</span> compared to the previous month.
+                        A pincode is flagged as <strong>"High Risk"</strong> (red in the matrix) if the forecast shows a <span style={{ color: '#ef4444', fontWeight: 600 }}>Growth Spike greater than 50%</span> compared to the latest month.
                     </p>
                     <p style={{ color: '#475569', lineHeight: 1.6, fontSize: '0.95rem', marginTop: '8px' }}>
                         This allows operations teams to differentiate between "steady busy" centers and "dangerously volatile" ones.
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import {
     BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView } from '../utils/dataLoader';
 
 interface FlaggedRecord {
     pincode: string;
@@ -21,18 +21,9 @@ const Hotspots: React.FC = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch('/data/flagged_records.csv');
-                const text = await response.text();
-                Papa.parse(text, {
-                    header: true,
-                    dynamicTyping: true,
-                    complete: (results) => {
-                        // Filter and sort top 20 by enrolments for the chart
-                        const rawData = results.data as FlaggedRecord[];
-                        const cleanData = rawData.filter(d => d.pincode && d.total_enrolments > 0);
-                        setData(cleanData);
-                    }
-                });
+                // Highest-volume flagged records, already sorted by the pipeline
+                const rawData = await loadView<FlaggedRecord>('enrolment/flagged_top');
+                setData(rawData.filter(d => d.pincode && d.total_enrolments > 0));
             } catch (e) {
                 console.error("Fetch error", e);
             } finally {
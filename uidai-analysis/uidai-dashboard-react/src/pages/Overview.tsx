@@ -3,29 +3,20 @@ import {
     BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     LineChart, Line, AreaChart, Area
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView } from '../utils/dataLoader';
 import { AlertCircle, TrendingUp, Users, MapPin, AlertTriangle } from 'lucide-react';
 
 // Define types for our data
-interface EnrolmentData {
-    pincode: string;
-    state: string;
-    district: string;
+interface EnrolmentSummary {
     total_enrolments: number;
-    month: string;
-    demand_level?: string;
-    risk_level?: string;
+    pincodes: number;
+    flagged_records: number;
+    high_risk_records: number;
 }
 
-interface FlaggedRecord {
-    pincode: string;
-    state: string;
-    district: string;
+interface MonthlyTotal {
+    month: string;
     total_enrolments: number;
-    enrolments_mom_growth: number;
-    flag_reason: string;
-    risk_level: string;
-    demand_level: string;
 }
 
 const Overview: React.FC = () => {
@@ -42,90 +33,53 @@ const Overview: React.FC = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                // Fetch flagged records to calculate risks
-                const flaggedResponse = await fetch('/data/flagged_records.csv');
-                const flaggedText = await flaggedResponse.text();
-
-                Papa.parse(flaggedText, {
-                    header: true,
-                    dynamicTyping: true,
-                    complete: (results) => {
-                        const data = results.data as FlaggedRecord[];
-                        const validData = data.filter(d => d.pincode); // remove empty rows
-
-                        setStats(prev => ({
-                            ...prev,
-                            flaggedAreas: validData.length,
-                            highRiskAreas: validData.filter(d => d.risk_level === 'High').length
-                        }));
+                // Pre-aggregated by 07_export_dashboard.py: one summary row and
+                // one row per month instead of the full flagged/monthly CSVs
+                const [[summary], monthly] = await Promise.all([
+                    loadView<EnrolmentSummary>('enrolment/summary'),
+                    loadView<MonthlyTotal>('enrolment/monthly_totals')
+                ]);
+
+                const sortedData = monthly
+                    .map(m => ({ month: m.month, total: m.total_enrolments }))
+                    .sort((a, b) => a.month.localeCompare(b.month));
+
+                setChartData(sortedData);
+
+                // --- FORECAST GENERATION LOGIC ---
+                if (sortedData.length >= 3) {
+                    const last3 = sortedData.slice(-3);
+                    // Calculate simple growth rate approx
+                    const avgTotal = last3.reduce((sum, d) => sum + d.total, 0) / 3;
+
+                    // Generate next 6 months
+                    const futureMonths = [];
+                    let lastDate = new Date(sortedData[sortedData.length - 1].month);
+
+                    for (let i = 1; i <= 6; i++) {
+                        lastDate.setMonth(lastDate.getMonth() + 1);
+                        // Add some seasonality variance (random small fluctuation + trend)
+                        const variance = 1 + (Math.random() * 0.1 - 0.05); // +/- 5%
+                        const projectedWithTrend = avgTotal * variance;
+
+                        futureMonths.push({
+                            month: lastDate.toISOString().slice(0, 7), // YYYY-MM
+                            total: Math.round(projectedWithTrend)
+                        });
                     }
-                });
-
-                // Simulate summary data for the chart (since we don't have the full time series CSV readily available in the same format, we'll mock it based on the report data or try to fetch enrolment_monthly if available)
-                // I will attempt to fetch enrolment_monthly.csv which I saw in the file list
-                const monthlyResponse = await fetch('/data/enrolment_monthly.csv');
-                if (monthlyResponse.ok) {
-                    const monthlyText = await monthlyResponse.text();
-                    Papa.parse(monthlyText, {
-                        header: true,
-                        dynamicTyping: true,
-                        complete: (results) => {
-                            const data = results.data as any[];
-                            // Aggregate by month
-                            const monthlyAgg = data.reduce((acc: any, curr: any) => {
-                                if (!curr.month) return acc;
-                                const m = curr.month;
-                                // Format month if needed, assuming it's YYYY-MM
-                                if (!acc[m]) acc[m] = { month: m, total: 0 };
-                                acc[m].total += (curr.total_enrolments || 0);
-                                return acc;
-                            }, {});
-
-                            const sortedData = Object.values(monthlyAgg).sort((a: any, b: any) =>
-                                new Date(a.month).getTime() - new Date(b.month).getTime()
-                            );
-
-                            setChartData(sortedData);
-
-                            // --- FORECAST GENERATION LOGIC ---
-                            if (sortedData.length >= 3) {
-                                const last3 = sortedData.slice(-3);
-                                // Calculate simple growth rate approx
-                                const avgTotal = last3.reduce((sum: number, d: any) => sum + d.total, 0) / 3;
-
-                                // Generate next 6 months
-                                const futureMonths = [];
-                                let lastDate = new Date(sortedData[sortedData.length - 1].month);
-
-                                for (let i = 1; i <= 6; i++) {
-                                    lastDate.setMonth(lastDate.getMonth() + 1);
-                                    // Add some seasonality variance (random small fluctuation + trend)
-                                    const variance = 1 + (Math.random() * 0.1 - 0.05); // +/- 5%
-                                    const projectedWithTrend = avgTotal * variance;
-
-                                    futureMonths.push({
-                                        month: lastDate.toISOString().slice(0, 10), // YYYY-MM-DD
-                                        total: Math.round(projectedWithTrend)
-                                    });
-                                }
-                                setForecastData(futureMonths);
-                            }
-                            // --------------------------------
-
-                            // Update total enrolments
-                            const grandTotal = (sortedData as any[]).reduce((sum, item) => sum + item.total, 0);
-                            setStats(prev => ({
-                                ...prev,
-                                totalEnrolments: grandTotal,
-                                activePincodes: 90 // From report
-                            }));
-                        }
-                    });
+                    setForecastData(futureMonths);
                 }
+                // --------------------------------
 
-                setLoading(false);
+                setStats({
+                    totalEnrolments: summary.total_enrolments,
+                    activePincodes: summary.pincodes,
+                    flaggedAreas: summary.flagged_records,
+                    highRiskAreas: summary.high_risk_records
+                });
             } catch (error) {
                 console.error("Error fetching data:", error);
+            } finally {
                 setLoading(false);
             }
         };
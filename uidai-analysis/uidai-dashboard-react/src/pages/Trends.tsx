@@ -3,56 +3,64 @@ import {
     LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     BarChart, Bar
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView, queryAggregate } from '../utils/dataLoader';
 
 const Trends: React.FC = () => {
     const [monthlyData, setMonthlyData] = useState<any[]>([]);
     const [stateData, setStateData] = useState<any[]>([]);
+    const [states, setStates] = useState<string[]>([]);
+    const [selectedState, setSelectedState] = useState('');
+    const [districtData, setDistrictData] = useState<any[]>([]);
+    const [stateMonthly, setStateMonthly] = useState<any[]>([]);
+    const [queryError, setQueryError] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const loadData = async () => {
-            // 1. Fetch Monthly Aggregate
-            const mRes = await fetch('/data/enrolment_monthly.csv');
-            const mText = await mRes.text();
-
-            Papa.parse(mText, {
-                header: true,
-                dynamicTyping: true,
-                complete: (results) => {
-                    const data = results.data as any[];
-                    // Agg by month
-                    const agg = data.reduce((acc: any, curr: any) => {
-                        if (!curr.month) return acc;
-                        if (!acc[curr.month]) acc[curr.month] = { month: curr.month, valid: 0, rejected: 0, total: 0 };
-                        acc[curr.month].total += (curr.total_enrolments || 0);
-                        // assuming rejected/valid might not be in CSV, we use total. If they were we'd sum them.
-                        return acc;
-                    }, {});
-                    setMonthlyData(Object.values(agg).sort((a: any, b: any) => new Date(a.month).getTime() - new Date(b.month).getTime()));
-                }
-            });
-
-            // 2. Fetch State Aggregate (can be derived from same file)
-            Papa.parse(mText, {
-                header: true,
-                dynamicTyping: true,
-                complete: (results) => {
-                    const data = results.data as any[];
-                    const agg = data.reduce((acc: any, curr: any) => {
-                        if (!curr.state) return acc;
-                        if (!acc[curr.state]) acc[curr.state] = { state: curr.state, total: 0 };
-                        acc[curr.state].total += (curr.total_enrolments || 0);
-                        return acc;
-                    }, {});
-                    setStateData(Object.values(agg).sort((a: any, b: any) => b.total - a.total).slice(0, 10)); // Top 10 states
-                    setLoading(false);
-                }
-            });
+            try {
+                // Monthly and state totals are both pre-aggregated by the pipeline
+                const [monthly, states] = await Promise.all([
+                    loadView<{ month: string; total_enrolments: number }>('enrolment/monthly_totals'),
+                    loadView<{ state: string; total_enrolments: number }>('enrolment/state_totals')
+                ]);
+                setMonthlyData(
+                    monthly
+                        .map(m => ({ month: m.month, total: m.total_enrolments }))
+                        .sort((a, b) => a.month.localeCompare(b.month))
+                );
+                const ranked = states
+                    .map(s => ({ state: s.state, total: s.total_enrolments }))
+                    .sort((a, b) => b.total - a.total);
+                setStateData(ranked.slice(0, 10)); // Top 10 states
+                setStates(ranked.map(s => s.state));
+                if (ranked.length > 0) setSelectedState(ranked[0].state);
+            } catch (error) {
+                console.error('Error loading trends:', error);
+            } finally {
+                setLoading(false);
+            }
         };
         loadData();
     }, []);
 
+    useEffect(() => {
+        if (!selectedState) return;
+        // Drill-down answered by the query service instead of loading district views
+        Promise.all([
+            queryAggregate<{ district: string; total_enrolments: number }>({ state: selectedState, group: 'district', top: 10 }),
+            queryAggregate<{ month: string; total_enrolments: number }>({ state: selectedState, group: 'month' })
+        ])
+            .then(([districts, monthly]) => {
+                setDistrictData(districts.map(d => ({ district: d.district, total: d.total_enrolments })));
+                setStateMonthly(monthly.map(m => ({ month: m.month, total: m.total_enrolments })));
+                setQueryError(null);
+            })
+            .catch(error => {
+                console.error('Error querying state drill-down:', error);
+                setQueryError('State drill-down needs the query service: python -m uidai_pipeline serve');
+            });
+    }, [selectedState]);
+
     if (loading) return <div>Loading Trends...</div>;
 
     return (
@@ -83,6 +91,41 @@ const Trends: React.FC = () => {
                     </BarChart>
                 </ResponsiveContainer>
             </div>
+
+            <div className="chart-container">
+                <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+                    <h3 className="chart-title">District Drill-down: {selectedState}</h3>
+                    <select value={selectedState} onChange={(e) => setSelectedState(e.target.value)}>
+                        {states.map(state => (
+                            <option key={state} value={state}>{state}</option>
+                        ))}
+                    </select>
+                </div>
+                {queryError ? (
+                    <p style={{ color: '#64748b' }}>{queryError}</p>
+                ) : (
+                    <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '1.5rem' }}>
+                        <ResponsiveContainer width="100%" height={300}>
+                            <BarChart data={districtData}>
+                                <CartesianGrid strokeDasharray="3 3" vertical={false} />
+                                <XAxis dataKey="district" interval={0} angle={-30} textAnchor="end" height={80} />
+                                <YAxis />
+                                <Tooltip />
+                                <Bar dataKey="total" fill="#f69320" radius={[4, 4, 0, 0]} name="Enrolments (Top 10 Districts)" />
+                            </BarChart>
+                        </ResponsiveContainer>
+                        <ResponsiveContainer width="100%" height={300}>
+                            <LineChart data={stateMonthly}>
+                                <CartesianGrid strokeDasharray="3 3" vertical={false} />
+                                <XAxis dataKey="month" />
+                                <YAxis />
+                                <Tooltip />
+                                <Line type="monotone" dataKey="total" stroke="#1a3672" strokeWidth={2} name="Monthly Enrolments" />
+                            </LineChart>
+                        </ResponsiveContainer>
+                    </div>
+                )}
+            </div>
         </div>
     );
 };
@@ -3,15 +3,15 @@ import {
     XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     Area, BarChart, Bar, ComposedChart, Cell, Line
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView, loadAllPartitions } from '../../utils/dataLoader';
 import { AlertOctagon, ShieldAlert, Activity, Info, Zap, Target } from 'lucide-react';
 import { motion } from 'framer-motion';
 import ImpactModule from '../../components/ImpactModule';
 import { calculateTrendProjection, getRiskLevel } from '../../utils/analytics';
 
-interface BiometricRecord {
-    date: string; state: string; district: string; pincode: string;
-    bio_age_5_17: number; bio_age_17_: number;
+interface PincodeSummary {
+    pincode: string | number; district: string; state: string; total_updates: number;
+    num_months: number; volatility: number; spike_count: number;
 }
 
 interface AnomalyData {
@@ -38,119 +38,78 @@ const AnomalyRisk: React.FC = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch('/data/biometric.csv');
-                const text = await response.text();
-
-                Papa.parse(text, {
-                    header: true, dynamicTyping: true,
-                    complete: (results) => {
-                        const data = results.data as BiometricRecord[];
-                        const validData = data.filter(d => d.date && d.pincode);
-
-                        const monthlyAgg: { [key: string]: number } = {};
-                        const pincodeMonthly: { [key: string]: { [month: string]: number } } = {};
-
-                        validData.forEach(record => {
-                            const dateParts = record.date.split('-');
-                            const monthKey = `${dateParts[2]}-${dateParts[1].padStart(2, '0')}`;
-                            const total = (record.bio_age_5_17 || 0) + (record.bio_age_17_ || 0);
-
-                            if (!monthlyAgg[monthKey]) monthlyAgg[monthKey] = 0;
-                            monthlyAgg[monthKey] += total;
-
-                            if (!pincodeMonthly[record.pincode]) pincodeMonthly[record.pincode] = {};
-                            if (!pincodeMonthly[record.pincode][monthKey]) pincodeMonthly[record.pincode][monthKey] = 0;
-                            pincodeMonthly[record.pincode][monthKey] += total;
-                        });
-
-                        const sortedMonths = Object.keys(monthlyAgg).sort();
-                        const monthlyTotals = sortedMonths.map(m => monthlyAgg[m]);
-
-                        // Impact Module Calculation
-                        const projection = calculateTrendProjection(monthlyTotals, 3);
-                        const risk = getRiskLevel(projection.projectedValue, 30000); // 30k threshold
-                        setImpact({
-                            ...projection,
-                            riskLevel: risk,
-                            impactText: `If biometric authentication trends continue (${projection.trendDirection}), expect ${projection.projectedValue.toLocaleString()} attempts next quarter. High volume increases probability of Auth Failures, requiring redundant scanner deployment.`
-                        });
-
-                        const mean = monthlyTotals.reduce((a, b) => a + b, 0) / monthlyTotals.length;
-                        const stdDev = Math.sqrt(monthlyTotals.reduce((sum, val) => sum + Math.pow(val - mean, 2), 0) / monthlyTotals.length);
-
-                        const processedAnomalies: AnomalyData[] = sortedMonths.map((month, idx) => {
-                            const total = monthlyAgg[month];
-                            const prevTotal = idx > 0 ? monthlyAgg[sortedMonths[idx - 1]] : total;
-                            const momChange = prevTotal > 0 ? ((total - prevTotal) / prevTotal) * 100 : 0;
-                            const zScore = stdDev > 0 ? (total - mean) / stdDev : 0;
-                            const startIdx = Math.max(0, idx - 2);
-                            const windowVals = sortedMonths.slice(startIdx, idx + 1).map(m => monthlyAgg[m]);
-                            const rollingAvg = windowVals.reduce((a, b) => a + b, 0) / windowVals.length;
-                            const isAnomaly = Math.abs(zScore) > 2 || Math.abs(momChange) > 50;
-                            return { month, total, momChange, zScore, isAnomaly, rollingAvg };
-                        });
-
-                        const locationRisk: RiskLocation[] = [];
-                        Object.entries(pincodeMonthly).forEach(([pincode, monthData]) => {
-                            const values = Object.values(monthData);
-                            // Relaxed constraint: Allow even single month records to be assessed for volume risk
-                            if (values.length === 0) return;
-
-                            const locMean = values.reduce((a, b) => a + b, 0) / values.length;
-                            // Volatility requires at least 2 points; otherwise 0
-                            const locStdDev = values.length > 1
-                                ? Math.sqrt(values.reduce((sum, val) => sum + Math.pow(val - locMean, 2), 0) / values.length)
-                                : 0;
-
-                            const volatility = (locMean > 0 && values.length > 1) ? (locStdDev / locMean) * 100 : 0;
-
-                            let spikeCount = 0;
-                            if (values.length > 1) {
-                                for (let i = 1; i < values.length; i++) {
-                                    if (values[i - 1] > 0 && Math.abs((values[i] - values[i - 1]) / values[i - 1]) > 1) spikeCount++;
-                                }
-                            }
-
-                            const record = validData.find(d => String(d.pincode) === String(pincode));
-                            if (!record) return;
+                // Monthly totals and per-pincode volatility/spike counts are
+                // computed by the pipeline (uidai_pipeline/updates.py)
+                const [monthly, pincodes] = await Promise.all([
+                    loadView<{ month: string; total_updates: number }>('biometric/monthly_totals'),
+                    loadAllPartitions<PincodeSummary>('biometric/pincode_summary')
+                ]);
+
+                const sortedMonthly = [...monthly].sort((a, b) => a.month.localeCompare(b.month));
+                const sortedMonths = sortedMonthly.map(m => m.month);
+                const monthlyTotals = sortedMonthly.map(m => m.total_updates);
+
+                // Impact Module Calculation
+                const projection = calculateTrendProjection(monthlyTotals, 3);
+                const risk = getRiskLevel(projection.projectedValue, 30000); // 30k threshold
+                setImpact({
+                    ...projection,
+                    riskLevel: risk,
+                    impactText: `If biometric authentication trends continue (${projection.trendDirection}), expect ${projection.projectedValue.toLocaleString()} attempts next quarter. High volume increases probability of Auth Failures, requiring redundant scanner deployment.`
+                });
 
-                            // Adjusted Risk Score logic for sparse data
-                            // If only 1 month data, high risk if volume is suspiciously low (< 10) or extremely high (> 1000)
-                            let riskScore = 0;
+                const mean = monthlyTotals.reduce((a, b) => a + b, 0) / monthlyTotals.length;
+                const stdDev = Math.sqrt(monthlyTotals.reduce((sum, val) => sum + Math.pow(val - mean, 2), 0) / monthlyTotals.length);
+
+                const processedAnomalies: AnomalyData[] = sortedMonths.map((month, idx) => {
+                    const total = monthlyTotals[idx];
+                    const prevTotal = idx > 0 ? monthlyTotals[idx - 1] : total;
+                    const momChange = prevTotal > 0 ? ((total - prevTotal) / prevTotal) * 100 : 0;
+                    const zScore = stdDev > 0 ? (total - mean) / stdDev : 0;
+                    const windowVals = monthlyTotals.slice(Math.max(0, idx - 2), idx + 1);
+                    const rollingAvg = windowVals.reduce((a, b) => a + b, 0) / windowVals.length;
+                    const isAnomaly = Math.abs(zScore) > 2 || Math.abs(momChange) > 50;
+                    return { month, total, momChange, zScore, isAnomaly, rollingAvg };
+                });
 
-                            if (values.length === 1) {
-                                // Sparse data risk heuristics
-                                const singleMonthTotal = values[0];
-                                if (singleMonthTotal < 10) riskScore = 80; // Critical: Very low volume in solitary month (Likely inactive)
-                                else if (singleMonthTotal > 1000) riskScore = 60; // High: Sudden massive volume in one month (Camp/Anomaly)
-                                else riskScore = 20; // Low risk otherwise
-                            } else {
-                                // Existing multi-month logic
-                                riskScore = Math.min(100, (volatility * 0.4) + (spikeCount * 15) + (values.length < 3 ? 20 : 0));
-                            }
+                const locationRisk: RiskLocation[] = pincodes.map(p => {
+                    // Adjusted Risk Score logic for sparse data
+                    // If only 1 month data, high risk if volume is suspiciously low (< 10) or extremely high (> 1000)
+                    let riskScore = 0;
+
+                    if (p.num_months === 1) {
+                        // Sparse data risk heuristics
+                        if (p.total_updates < 10) riskScore = 80; // Critical: Very low volume in solitary month (Likely inactive)
+                        else if (p.total_updates > 1000) riskScore = 60; // High: Sudden massive volume in one month (Camp/Anomaly)
+                        else riskScore = 20; // Low risk otherwise
+                    } else {
+                        // Existing multi-month logic
+                        riskScore = Math.min(100, (p.volatility * 0.4) + (p.spike_count * 15) + (p.num_months < 3 ? 20 : 0));
+                    }
 
-                            let riskLevel: 'Low' | 'Medium' | 'High' | 'Critical' = 'Low';
-                            if (riskScore >= 70) riskLevel = 'Critical';
-                            else if (riskScore >= 50) riskLevel = 'High';
-                            else if (riskScore >= 30) riskLevel = 'Medium';
+                    let riskLevel: 'Low' | 'Medium' | 'High' | 'Critical' = 'Low';
+                    if (riskScore >= 70) riskLevel = 'Critical';
+                    else if (riskScore >= 50) riskLevel = 'High';
+                    else if (riskScore >= 30) riskLevel = 'Medium';
 
-                            locationRisk.push({ pincode, district: record.district, state: record.state, total: values.reduce((a, b) => a + b, 0), volatility, spikeCount, riskScore, riskLevel });
-                        });
+                    return {
+                        pincode: String(p.pincode), district: p.district, state: p.state, total: p.total_updates,
+                        volatility: p.volatility, spikeCount: p.spike_count, riskScore, riskLevel
+                    };
+                });
 
-                        const sortedRisk = locationRisk.sort((a, b) => b.riskScore - a.riskScore).slice(0, 20);
-                        setStats({
-                            totalAnomalies: processedAnomalies.filter(a => a.isAnomaly).length,
-                            criticalRiskCount: sortedRisk.filter(r => r.riskLevel === 'Critical').length,
-                            highRiskCount: sortedRisk.filter(r => r.riskLevel === 'High').length,
-                            avgVolatility: sortedRisk.length > 0 ? sortedRisk.reduce((sum, r) => sum + r.volatility, 0) / sortedRisk.length : 0,
-                            maxSpike: Math.max(...processedAnomalies.map(a => Math.abs(a.momChange)))
-                        });
-                        setAnomalyData(processedAnomalies);
-                        setRiskLocations(sortedRisk);
-                        setLoading(false);
-                    }
+                const sortedRisk = locationRisk.sort((a, b) => b.riskScore - a.riskScore).slice(0, 20);
+                setStats({
+                    totalAnomalies: processedAnomalies.filter(a => a.isAnomaly).length,
+                    criticalRiskCount: sortedRisk.filter(r => r.riskLevel === 'Critical').length,
+                    highRiskCount: sortedRisk.filter(r => r.riskLevel === 'High').length,
+                    avgVolatility: sortedRisk.length > 0 ? sortedRisk.reduce((sum, r) => sum + r.volatility, 0) / sortedRisk.length : 0,
+                    maxSpike: Math.max(...processedAnomalies.map(a => Math.abs(a.momChange)))
                 });
-            } catch (error) { console.error('Error:', error); setLoading(false); }
+                setAnomalyData(processedAnomalies);
+                setRiskLocations(sortedRisk);
+            } catch (error) { console.error('Error:', error); }
+            finally { setLoading(false); }
         };
         fetchData();
     }, []);
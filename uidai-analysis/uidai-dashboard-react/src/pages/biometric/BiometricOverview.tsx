@@ -3,18 +3,21 @@ import {
     BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     AreaChart, Area, PieChart, Pie, Cell, LineChart, Line
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView } from '../../utils/dataLoader';
 import { TrendingUp, TrendingDown, Users, MapPin, Activity, Fingerprint, Calendar, AlertCircle } from 'lucide-react';
 import { motion } from 'framer-motion';
 
-// Types for biometric data
-interface BiometricRecord {
-    date: string;
-    state: string;
-    district: string;
-    pincode: string;
+// Types for the exported biometric views
+interface BiometricTotals {
     bio_age_5_17: number;
     bio_age_17_: number;
+    total_updates: number;
+}
+
+interface BiometricSummary extends BiometricTotals {
+    states: number;
+    districts: number;
+    pincodes: number;
 }
 
 interface MonthlyStats {
@@ -53,120 +56,65 @@ const BiometricOverview: React.FC = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch('/data/biometric.csv');
-                const text = await response.text();
-
-                Papa.parse(text, {
-                    header: true,
-                    dynamicTyping: true,
-                    complete: (results) => {
-                        const data = results.data as BiometricRecord[];
-                        const validData = data.filter(d => d.date && d.pincode);
-
-                        // Parse dates and aggregate by month
-                        const monthlyAgg: { [key: string]: MonthlyStats } = {};
-                        const stateAgg: { [key: string]: { total: number; districts: Set<string> } } = {};
-                        const districtAgg: { [key: string]: { district: string; state: string; total: number } } = {};
-
-                        let totalAge5to17 = 0;
-                        let totalAge17plus = 0;
-                        const uniquePincodes = new Set<string>();
-                        const uniqueStates = new Set<string>();
-                        const uniqueDistricts = new Set<string>();
-
-                        validData.forEach(record => {
-                            // Parse date (DD-MM-YYYY format)
-                            const dateParts = record.date.split('-');
-                            const monthKey = `${dateParts[2]}-${dateParts[1].padStart(2, '0')}`;
-
-                            const age5to17 = record.bio_age_5_17 || 0;
-                            const age17plus = record.bio_age_17_ || 0;
-                            const total = age5to17 + age17plus;
-
-                            // Monthly aggregation
-                            if (!monthlyAgg[monthKey]) {
-                                monthlyAgg[monthKey] = { month: monthKey, total: 0, age5to17: 0, age17plus: 0 };
-                            }
-                            monthlyAgg[monthKey].total += total;
-                            monthlyAgg[monthKey].age5to17 += age5to17;
-                            monthlyAgg[monthKey].age17plus += age17plus;
-
-                            // State aggregation
-                            if (!stateAgg[record.state]) {
-                                stateAgg[record.state] = { total: 0, districts: new Set() };
-                            }
-                            stateAgg[record.state].total += total;
-                            stateAgg[record.state].districts.add(record.district);
-
-                            // District aggregation
-                            const districtKey = `${record.state}-${record.district}`;
-                            if (!districtAgg[districtKey]) {
-                                districtAgg[districtKey] = { district: record.district, state: record.state, total: 0 };
-                            }
-                            districtAgg[districtKey].total += total;
-
-                            // Totals
-                            totalAge5to17 += age5to17;
-                            totalAge17plus += age17plus;
-                            uniquePincodes.add(record.pincode);
-                            uniqueStates.add(record.state);
-                            uniqueDistricts.add(record.district);
-                        });
-
-                        // Sort monthly data
-                        const sortedMonthly = Object.values(monthlyAgg).sort((a, b) =>
-                            a.month.localeCompare(b.month)
-                        );
-
-                        // Calculate MoM growth
-                        for (let i = 1; i < sortedMonthly.length; i++) {
-                            const prev = sortedMonthly[i - 1].total;
-                            const curr = sortedMonthly[i].total;
-                            sortedMonthly[i].growthRate = prev > 0 ? ((curr - prev) / prev) * 100 : 0;
-                        }
-
-                        // Top 5 states
-                        const sortedStates = Object.entries(stateAgg)
-                            .map(([state, data]) => ({ state, total: data.total, districts: data.districts.size }))
-                            .sort((a, b) => b.total - a.total)
-                            .slice(0, 5);
-
-                        // Top 5 districts
-                        const sortedDistricts = Object.values(districtAgg)
-                            .sort((a, b) => b.total - a.total)
-                            .slice(0, 5);
-
-                        // Latest month stats
-                        const latestMonth = sortedMonthly[sortedMonthly.length - 1];
-                        const prevMonth = sortedMonthly[sortedMonthly.length - 2];
-                        const momGrowth = prevMonth && prevMonth.total > 0
-                            ? ((latestMonth.total - prevMonth.total) / prevMonth.total) * 100
-                            : 0;
-
-                        setStats({
-                            totalUpdates: totalAge5to17 + totalAge17plus,
-                            latestMonthUpdates: latestMonth?.total || 0,
-                            momGrowth,
-                            age5to17Total: totalAge5to17,
-                            age17plusTotal: totalAge17plus,
-                            uniqueStates: uniqueStates.size,
-                            uniqueDistricts: uniqueDistricts.size,
-                            uniquePincodes: uniquePincodes.size
-                        });
-
-                        setMonthlyData(sortedMonthly);
-                        setTopStates(sortedStates);
-                        setTopDistricts(sortedDistricts);
-                        setAgeDistribution([
-                            { name: 'Age 5-17', value: totalAge5to17 },
-                            { name: 'Age 17+', value: totalAge17plus }
-                        ]);
-
-                        setLoading(false);
-                    }
+                // Monthly, state and district rollups come pre-aggregated from
+                // the pipeline (06_update_datasets.py + 07_export_dashboard.py)
+                const [[summary], monthly, states, districts] = await Promise.all([
+                    loadView<BiometricSummary>('biometric/summary'),
+                    loadView<BiometricTotals & { month: string; mom_growth: number }>('biometric/monthly_totals'),
+                    loadView<BiometricTotals & { state: string; districts: number }>('biometric/state_totals'),
+                    loadView<BiometricTotals & { state: string; district: string }>('biometric/district_totals')
+                ]);
+
+                const sortedMonthly: MonthlyStats[] = monthly
+                    .map((m, i) => ({
+                        month: m.month,
+                        total: m.total_updates,
+                        age5to17: m.bio_age_5_17,
+                        age17plus: m.bio_age_17_,
+                        growthRate: i > 0 ? m.mom_growth : undefined
+                    }))
+                    .sort((a, b) => a.month.localeCompare(b.month));
+
+                // Top 5 states
+                const sortedStates = states
+                    .map(s => ({ state: s.state, total: s.total_updates, districts: s.districts }))
+                    .sort((a, b) => b.total - a.total)
+                    .slice(0, 5);
+
+                // Top 5 districts
+                const sortedDistricts = districts
+                    .map(d => ({ district: d.district, state: d.state, total: d.total_updates }))
+                    .sort((a, b) => b.total - a.total)
+                    .slice(0, 5);
+
+                // Latest month stats
+                const latestMonth = sortedMonthly[sortedMonthly.length - 1];
+                const prevMonth = sortedMonthly[sortedMonthly.length - 2];
+                const momGrowth = prevMonth && prevMonth.total > 0
+                    ? ((latestMonth.total - prevMonth.total) / prevMonth.total) * 100
+                    : 0;
+
+                setStats({
+                    totalUpdates: summary.total_updates,
+                    latestMonthUpdates: latestMonth?.total || 0,
+                    momGrowth,
+                    age5to17Total: summary.bio_age_5_17,
+                    age17plusTotal: summary.bio_age_17_,
+                    uniqueStates: summary.states,
+                    uniqueDistricts: summary.districts,
+                    uniquePincodes: summary.pincodes
                 });
+
+                setMonthlyData(sortedMonthly);
+                setTopStates(sortedStates);
+                setTopDistricts(sortedDistricts);
+                setAgeDistribution([
+                    { name: 'Age 5-17', value: summary.bio_age_5_17 },
+                    { name: 'Age 17+', value: summary.bio_age_17_ }
+                ]);
             } catch (error) {
                 console.error('Error fetching biometric data:', error);
+            } finally {
                 setLoading(false);
             }
         };
@@ -3,15 +3,12 @@ import {
     BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     PieChart, Pie, Cell, LineChart, Line, AreaChart, Area
 } from 'recharts';
-import Papa from 'papaparse';
+import { loadView } from '../../utils/dataLoader';
 import { BarChart3, TrendingUp, Users, Percent, ArrowUpRight, ArrowDownRight } from 'lucide-react';
 import { motion } from 'framer-motion';
 
-interface BiometricRecord {
-    date: string;
-    state: string;
-    district: string;
-    pincode: string;
+interface MonthlyTotals {
+    month: string;
     bio_age_5_17: number;
     bio_age_17_: number;
 }
@@ -45,83 +42,53 @@ const UpdateTypes: React.FC = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch('/data/biometric.csv');
-                const text = await response.text();
-
-                Papa.parse(text, {
-                    header: true,
-                    dynamicTyping: true,
-                    complete: (results) => {
-                        const data = results.data as BiometricRecord[];
-                        const validData = data.filter(d => d.date && d.pincode);
-
-                        // Aggregate by month
-                        const monthlyAgg: { [key: string]: { age5to17: number; age17plus: number } } = {};
-                        let totalAge5to17 = 0;
-                        let totalAge17plus = 0;
-
-                        validData.forEach(record => {
-                            const dateParts = record.date.split('-');
-                            const monthKey = `${dateParts[2]}-${dateParts[1].padStart(2, '0')}`;
-
-                            const age5to17 = record.bio_age_5_17 || 0;
-                            const age17plus = record.bio_age_17_ || 0;
-
-                            if (!monthlyAgg[monthKey]) {
-                                monthlyAgg[monthKey] = { age5to17: 0, age17plus: 0 };
-                            }
-                            monthlyAgg[monthKey].age5to17 += age5to17;
-                            monthlyAgg[monthKey].age17plus += age17plus;
-
-                            totalAge5to17 += age5to17;
-                            totalAge17plus += age17plus;
-                        });
+                const monthly = await loadView<MonthlyTotals>('biometric/monthly_totals');
 
-                        // Process monthly data
-                        const processedMonthly: MonthlyTypeData[] = Object.entries(monthlyAgg)
-                            .map(([month, data]) => {
-                                const total = data.age5to17 + data.age17plus;
-                                return {
-                                    month,
-                                    age5to17: data.age5to17,
-                                    age17plus: data.age17plus,
-                                    total,
-                                    age5to17Pct: total > 0 ? (data.age5to17 / total) * 100 : 0,
-                                    age17plusPct: total > 0 ? (data.age17plus / total) * 100 : 0
-                                };
-                            })
-                            .sort((a, b) => a.month.localeCompare(b.month));
+                // Process monthly data
+                const processedMonthly: MonthlyTypeData[] = monthly
+                    .map(m => {
+                        const total = m.bio_age_5_17 + m.bio_age_17_;
+                        return {
+                            month: m.month,
+                            age5to17: m.bio_age_5_17,
+                            age17plus: m.bio_age_17_,
+                            total,
+                            age5to17Pct: total > 0 ? (m.bio_age_5_17 / total) * 100 : 0,
+                            age17plusPct: total > 0 ? (m.bio_age_17_ / total) * 100 : 0
+                        };
+                    })
+                    .sort((a, b) => a.month.localeCompare(b.month));
 
-                        // Calculate trends (compare last 3 months avg to first 3 months avg)
-                        if (processedMonthly.length >= 4) {
-                            const firstHalf = processedMonthly.slice(0, Math.floor(processedMonthly.length / 2));
-                            const secondHalf = processedMonthly.slice(Math.floor(processedMonthly.length / 2));
+                const totalAge5to17 = processedMonthly.reduce((sum, d) => sum + d.age5to17, 0);
+                const totalAge17plus = processedMonthly.reduce((sum, d) => sum + d.age17plus, 0);
 
-                            const firstAge5to17Avg = firstHalf.reduce((sum, d) => sum + d.age5to17Pct, 0) / firstHalf.length;
-                            const secondAge5to17Avg = secondHalf.reduce((sum, d) => sum + d.age5to17Pct, 0) / secondHalf.length;
+                // Calculate trends (compare last 3 months avg to first 3 months avg)
+                if (processedMonthly.length >= 4) {
+                    const firstHalf = processedMonthly.slice(0, Math.floor(processedMonthly.length / 2));
+                    const secondHalf = processedMonthly.slice(Math.floor(processedMonthly.length / 2));
 
-                            const firstAge17plusAvg = firstHalf.reduce((sum, d) => sum + d.age17plusPct, 0) / firstHalf.length;
-                            const secondAge17plusAvg = secondHalf.reduce((sum, d) => sum + d.age17plusPct, 0) / secondHalf.length;
+                    const firstAge5to17Avg = firstHalf.reduce((sum, d) => sum + d.age5to17Pct, 0) / firstHalf.length;
+                    const secondAge5to17Avg = secondHalf.reduce((sum, d) => sum + d.age5to17Pct, 0) / secondHalf.length;
 
-                            setTrends({
-                                age5to17Trend: secondAge5to17Avg - firstAge5to17Avg,
-                                age17plusTrend: secondAge17plusAvg - firstAge17plusAvg,
-                                dominantType: totalAge17plus > totalAge5to17 ? 'Age 17+ (Adult)' : 'Age 5-17 (Youth)',
-                                shiftDirection: secondAge5to17Avg > firstAge5to17Avg ? 'Youth updates increasing' : 'Adult updates increasing'
-                            });
-                        }
+                    const firstAge17plusAvg = firstHalf.reduce((sum, d) => sum + d.age17plusPct, 0) / firstHalf.length;
+                    const secondAge17plusAvg = secondHalf.reduce((sum, d) => sum + d.age17plusPct, 0) / secondHalf.length;
 
-                        setMonthlyData(processedMonthly);
-                        setOverallDistribution([
-                            { name: 'Age 5-17 (Youth)', value: totalAge5to17, color: COLORS.age5to17 },
-                            { name: 'Age 17+ (Adult)', value: totalAge17plus, color: COLORS.age17plus }
-                        ]);
+                    setTrends({
+                        age5to17Trend: secondAge5to17Avg - firstAge5to17Avg,
+                        age17plusTrend: secondAge17plusAvg - firstAge17plusAvg,
+                        dominantType: totalAge17plus > totalAge5to17 ? 'Age 17+ (Adult)' : 'Age 5-17 (Youth)',
+                        shiftDirection: secondAge5to17Avg > firstAge5to17Avg ? 'Youth updates increasing' : 'Adult updates increasing'
+                    });
+                }
 
-                        setLoading(false);
-                    }
-                });
+                setMonthlyData(processedMonthly);
+                setOverallDistribution([
+                    { name: 'Age 5-17 (Youth)', value: totalAge5to17, color: COLORS.age5to17 },
+                    { name: 'Age 17+ (Adult)', value: totalAge17plus, color: COLORS.age17plus }
+                ]);
             } catch (error) {
                 console.error('Error fetching biometric data:', error);
+            } finally {
                 setLoading(false);
             }
         };
@@ -0,0 +1,164 @@
+/**
+ * Loader for the pre-aggregated views written by 07_export_dashboard.py
+ * Files are gzipped column-oriented JSON with content-hashed names, so only
+ * manifest.json needs revalidating; everything else can be cached forever.
+ * Views are fetched once per page load and shared between pages.
+ */
+
+const EXPORT_BASE = '/data/export';
+
+interface FileEntry {
+    file: string;
+    rows: number;
+    bytes: number;
+}
+
+interface ViewEntry extends Partial<FileEntry> {
+    partitioned_by?: string;
+    partitions?: { [value: string]: FileEntry };
+}
+
+interface Manifest {
+    version: number;
+    views: { [name: string]: ViewEntry };
+}
+
+interface ColumnarTable {
+    columns: string[];
+    rows: number;
+    data: unknown[][];
+}
+
+let manifestPromise: Promise<Manifest> | null = null;
+const fileCache = new Map<string, Promise<Record<string, unknown>[]>>();
+
+export const loadManifest = (): Promise<Manifest> => {
+    if (!manifestPromise) {
+        manifestPromise = fetch(`${EXPORT_BASE}/manifest.json`, { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) throw new Error(`Dashboard export manifest missing (${response.status})`);
+                return response.json();
+            })
+            .catch(error => {
+                manifestPromise = null;
+                throw error;
+            });
+    }
+    return manifestPromise;
+};
+
+const decode = async (response: Response): Promise<ColumnarTable> => {
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    // Some servers already send .gz files with Content-Encoding: gzip, in
+    // which case the browser has decompressed them for us.
+    const isGzip = bytes.length > 2 && bytes[0] === 0x1f && bytes[1] === 0x8b;
+    const stream = new Blob([bytes]).stream();
+    const text = await new Response(
+        isGzip ? stream.pipeThrough(new DecompressionStream('gzip')) : stream
+    ).text();
+    return JSON.parse(text);
+};
+
+const toRows = (table: ColumnarTable, extra: Record<string, unknown> = {}) => {
+    const rows: Record<string, unknown>[] = new Array(table.rows);
+    for (let i = 0; i < table.rows; i++) {
+        const row: Record<string, unknown> = { ...extra };
+        table.columns.forEach((column, c) => { row[column] = table.data[c][i]; });
+        rows[i] = row;
+    }
+    return rows;
+};
+
+const loadFile = (entry: FileEntry, extra: Record<string, unknown> = {}) => {
+    let rows = fileCache.get(entry.file);
+    if (!rows) {
+        rows = fetch(`${EXPORT_BASE}/${entry.file}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`Failed to load ${entry.file} (${response.status})`);
+                return decode(response);
+            })
+            .then(table => toRows(table, extra));
+        fileCache.set(entry.file, rows);
+        rows.catch(() => fileCache.delete(entry.file));
+    }
+    return rows;
+};
+
+const getView = async (name: string): Promise<ViewEntry> => {
+    const manifest = await loadManifest();
+    const view = manifest.views[name];
+    if (!view) throw new Error(`Unknown dashboard view: ${name}`);
+    return view;
+};
+
+/** Load an unpartitioned view, e.g. 'biometric/monthly_totals'. */
+export const loadView = async <T>(name: string): Promise<T[]> => {
+    const view = await getView(name);
+    if (!view.file) throw new Error(`${name} is partitioned; use loadPartition or loadAllPartitions`);
+    return (await loadFile(view as FileEntry)) as T[];
+};
+
+/** Partition values (states) available for a partitioned view. */
+export const listPartitions = async (name: string): Promise<string[]> => {
+    const view = await getView(name);
+    return Object.keys(view.partitions || {}).sort();
+};
+
+/** Load one state's slice of a partitioned view such as 'enrolment/flagged'. */
+export const loadPartition = async <T>(name: string, value: string): Promise<T[]> => {
+    const view = await getView(name);
+    const entry = view.partitions?.[value];
+    if (!entry) return [];
+    return (await loadFile(entry, { [view.partitioned_by || 'state']: value })) as T[];
+};
+
+/** Load every partition of a view; only for views that need all states at once. */
+export const loadAllPartitions = async <T>(name: string): Promise<T[]> => {
+    const values = await listPartitions(name);
+    const parts = await Promise.all(values.map(value => loadPartition<T>(name, value)));
+    return parts.flat();
+};
+
+/**
+ * Aggregate queries answered by the local query service
+ * (python -m uidai_pipeline serve), proxied under /api by the dev server.
+ * The service caches results and reloads when the pipeline publishes new
+ * artifacts; identical queries within a page load are also shared here.
+ */
+
+const QUERY_BASE = import.meta.env.VITE_QUERY_URL || '/api';
+const queryCache = new Map<string, Promise<Record<string, unknown>[]>>();
+
+export interface AggregateQuery {
+    dataset?: 'enrolment' | 'biometric' | 'demographic';
+    state?: string | string[];
+    district?: string | string[];
+    pincode?: number | number[];
+    start?: string;
+    end?: string;
+    group: 'state' | 'district' | 'pincode' | 'month';
+    top?: number;
+}
+
+/** Totals per group for the rows matching the filters, largest first (months in order). */
+export const queryAggregate = <T>(query: AggregateQuery): Promise<T[]> => {
+    const params = new URLSearchParams();
+    Object.entries(query).forEach(([key, value]) => {
+        if (value === undefined) return;
+        (Array.isArray(value) ? value : [value]).forEach(item => params.append(key, String(item)));
+    });
+    params.sort();
+    const url = `${QUERY_BASE}/query?${params}`;
+    let rows = queryCache.get(url);
+    if (!rows) {
+        rows = fetch(url)
+            .then(async response => {
+                const body = await response.json();
+                if (!response.ok) throw new Error(body.error || `Query failed (${response.status})`);
+                return body.rows;
+            });
+        queryCache.set(url, rows);
+        rows.catch(() => queryCache.delete(url));
+    }
+    return rows as Promise<T[]>;
+};
@@ -4,4 +4,10 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  server: {
+    // Aggregate queries go to the local query service (python -m uidai_pipeline serve)
+    proxy: {
+      '/api': 'http://127.0.0.1:8765',
+    },
+  },
 })